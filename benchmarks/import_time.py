@@ -0,0 +1,88 @@
+"""
+Track the time it takes to `import nwbwidgets` across releases.
+
+Runs `python -X importtime -c "import nwbwidgets"` in fresh interpreters, reports the median cumulative import time
+and the slowest modules, and optionally appends the result to a JSON-lines history file:
+
+    python benchmarks/import_time.py --repeat 5 --record benchmarks/import_time.jsonl
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+
+def parse_importtime(stderr: str):
+    """Parse the output of `-X importtime`
+
+    Parameters
+    ----------
+    stderr: str
+
+    Returns
+    -------
+    dict
+        module name -> (self time in us, cumulative time in us)
+    """
+    times = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(package='nwbwidgets'):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + package],
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return parse_importtime(proc.stderr)
+
+
+def get_version(package='nwbwidgets'):
+    try:
+        from importlib.metadata import version
+        return version(package)
+    except Exception:
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--package', default='nwbwidgets')
+    parser.add_argument('--repeat', type=int, default=5, help='number of fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest modules to list')
+    parser.add_argument('--record', help='JSON-lines file the result is appended to')
+    args = parser.parse_args()
+
+    runs = [measure(args.package) for _ in range(args.repeat)]
+    totals = [run[args.package][1] for run in runs]
+    median_total = statistics.median(totals)
+
+    # modules with the largest self time, from the last run
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+
+    print('import {}: median {:.3f} s over {} runs'.format(args.package, median_total / 1e6, args.repeat))
+    print('{:>12} {:>12}  module'.format('self (ms)', 'cumul (ms)'))
+    for name, (self_us, cumulative_us) in slowest:
+        print('{:12.1f} {:12.1f}  {}'.format(self_us / 1e3, cumulative_us / 1e3, name))
+
+    if args.record:
+        record = dict(
+            package=args.package,
+            version=get_version(args.package),
+            date=datetime.now().isoformat(timespec='seconds'),
+            python=platform.python_version(),
+            median_us=median_total,
+            runs_us=totals,
+            loaded_modules=len(runs[-1]),
+        )
+        with open(args.record, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Measure what it costs to send a window of samples to a plotly FigureWidget.
+
+Sets the y values of a Scatter trace from a Python list, as the widgets used to, and from a numpy array passed through
+`nwbwidgets.utils.plotly.as_typed_array`, and reports the time to validate and encode the comm message and the size of
+its JSON part and of its binary buffers:
+
+    python benchmarks/plotly_transfer.py --sizes 10000 100000 1000000 --record benchmarks/plotly_transfer.jsonl
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+
+import numpy as np
+import plotly.graph_objects as go
+from ipywidgets.widgets.widget import _remove_buffers
+from plotly.serializers import _py_to_js
+
+from nwbwidgets.utils.plotly import as_typed_array
+
+
+def encode(fig):
+    """The state of the `_data` trait of a FigureWidget as the comm sends it: (JSON text, binary buffers)"""
+    state = {'_data': _py_to_js(fig._data, None)}
+    state, _, buffers = _remove_buffers(state)
+    return json.dumps(state), buffers
+
+
+def measure(y, as_list, repeat=5):
+    """Median seconds to set and encode the y values of a trace, and the bytes of the message"""
+    fig = go.FigureWidget(data=go.Scatter(x=as_typed_array(np.arange(len(y), dtype=float)), y=[]))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig.data[0].y = list(y) if as_list else as_typed_array(y)
+        text, buffers = encode(fig)
+        times.append(time.perf_counter() - start)
+    return dict(seconds=statistics.median(times), json_bytes=len(text),
+                buffer_bytes=sum(memoryview(buffer).nbytes for buffer in buffers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dtype', default='float32', help='dtype of the samples')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--record', help='JSON-lines file the results are appended to')
+    args = parser.parse_args()
+
+    print('{:>10} {:>8} {:>12} {:>14} {:>14}'.format('samples', 'input', 'time (ms)', 'json (kB)', 'buffers (kB)'))
+    results = []
+    for size in args.sizes:
+        y = np.random.randn(size).astype(args.dtype)
+        for as_list in (True, False):
+            result = dict(samples=size, input='list' if as_list else 'array', **measure(y, as_list, args.repeat))
+            results.append(result)
+            print('{samples:10d} {input:>8} {0:12.1f} {1:14.1f} {2:14.1f}'.format(
+                result['seconds'] * 1e3, result['json_bytes'] / 1e3, result['buffer_bytes'] / 1e3, **result))
+
+    if args.record:
+        record = dict(date=datetime.now().isoformat(timespec='seconds'), python=platform.python_version(),
+                      dtype=args.dtype, results=results)
+        with open(args.record, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
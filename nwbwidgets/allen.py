@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from typing import Iterable
 
 import ipywidgets as widgets
@@ -100,7 +101,10 @@ def allen_show_electrodes(node: DynamicTable):
 
 
 def load_allen_widgets():
-    default_neurodata_vis_spec[Units]['Session Raster'] = AllenRasterWidget
-    default_neurodata_vis_spec[Units]['Grouped PSTH'] = AllenPSTHWidget
-    default_neurodata_vis_spec[Units]['Raster Grid'] = AllenRasterGridWidget
+    units_spec = OrderedDict(default_neurodata_vis_spec[Units])
+    units_spec.update({
+        'Session Raster': AllenRasterWidget,
+        'Grouped PSTH': AllenPSTHWidget,
+        'Raster Grid': AllenRasterGridWidget})
+    default_neurodata_vis_spec.register(Units, units_spec)
     #default_neurodata_vis_spec[DynamicTable] = allen_show_dynamic_table
@@ -1,17 +1,31 @@
+import contextvars
+import html
+import threading
+import traceback
+from collections import OrderedDict
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from typing import Union
 
 import h5py
-import ipysheet
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from IPython import display
-from ipywidgets import widgets
+from ipywidgets import widgets, ValueWidget
 from matplotlib.pyplot import Figure
 from nwbwidgets import view
 from pynwb import ProcessingModule
 from pynwb.core import NWBDataInterface
+from traitlets import Int, validate
+
+from .utils.content_index import get_content_index
+from .utils.dynamictable import column_kind, read_rows, sort_rows, format_hover_column, join_hover_columns
+from .utils.profiling import profile, node_label
+from .utils.render_cache import RenderCache
+from .utils.vis_spec import resolve_spec
+from .utils.widgets import estimate_widget_size, close_widget_tree
 
 GroupingWidget = Union[widgets.Accordion, widgets.Tab]
 
@@ -29,10 +43,78 @@ def show_fields(node, **kwargs) -> widgets.Widget:
 
 
 def render_dataframe(df):
-    out1 = widgets.Output()
-    with out1:
-        display.display(df.to_dataframe())
-    return out1
+    return DynamicTableViewer(df)
+
+
+class DynamicTableViewer(widgets.VBox):
+    """Paged view of a DynamicTable that only reads the rows of the current page
+
+    Ragged columns (e.g. spike_times) and multi-dimensional columns (e.g. waveforms) are summarized by their length or
+    shape and dtype, regions and references by the row or container they point to. Enter a row to expand its full
+    values. Sorting reads only the column that is sorted by.
+    """
+
+    def __init__(self, dynamic_table, page_size: int = 50):
+        """
+        Parameters
+        ----------
+        dynamic_table: DynamicTable
+        page_size: int, optional
+        """
+        super().__init__()
+        self.dynamic_table = dynamic_table
+        self.kinds = {name: column_kind(dynamic_table, name) for name in dynamic_table.colnames}
+        self.order = None  # row order, None for the order of the table
+        n_rows = len(dynamic_table)
+
+        sortable = [name for name, kind in self.kinds.items() if kind in ('scalar', 'region')]
+        self.sort_by = widgets.Dropdown(options=['(row order)'] + sortable, description='sort by')
+        self.descending = widgets.Checkbox(value=False, description='descending', indent=False)
+        self.pager = PageController(n_rows, page_size)
+        self.table_html = widgets.HTML()
+        self.expand_row = widgets.BoundedIntText(value=0, min=0, max=max(n_rows - 1, 0), description='expand row',
+                                                 layout=widgets.Layout(width='200px'))
+        self.expand_button = widgets.Button(description='expand', layout=widgets.Layout(width='80px'))
+        self.expanded = widgets.HTML()
+
+        self.sort_by.observe(self.on_sort, names='value')
+        self.descending.observe(self.on_sort, names='value')
+        self.pager.observe(self.show_page, names='value')
+        self.expand_button.on_click(self.expand)
+
+        controls = widgets.HBox([self.sort_by, self.descending, self.pager])
+        self.children = [controls, self.table_html, widgets.HBox([self.expand_row, self.expand_button]),
+                         self.expanded]
+        self.show_page()
+
+    def on_sort(self, change):
+        if self.sort_by.value == '(row order)':
+            self.order = None if not self.descending.value else np.arange(len(self.dynamic_table))[::-1]
+        else:
+            self.order = sort_rows(self.dynamic_table, self.sort_by.value, self.descending.value)
+        if self.pager.value:
+            self.pager.value = 0
+        else:
+            self.show_page()
+
+    def show_page(self, change=None):
+        if self.order is None:
+            rows = np.arange(self.pager.start, self.pager.stop)
+        else:
+            rows = self.order[self.pager.start:self.pager.stop]
+        self.table_html.value = read_rows(self.dynamic_table, rows).to_html()
+
+    def expand(self, button=None):
+        row = self.expand_row.value
+        items = []
+        for name in self.dynamic_table.colnames:
+            value = self.dynamic_table[name][row]
+            if isinstance(value, (list, tuple)):
+                value = np.asarray(value)
+            if isinstance(value, np.ndarray):
+                value = np.array2string(value, threshold=1000)
+            items.append('<b>{}</b>: <pre>{}</pre>'.format(name, html.escape(str(value))))
+        self.expanded.value = ''.join(items)
 
 
 def show_neurodata_base(node: NWBDataInterface, neurodata_vis_spec: dict) -> widgets.Widget:
@@ -45,6 +127,7 @@ def show_neurodata_base(node: NWBDataInterface, neurodata_vis_spec: dict) -> wid
     info = []  # string data type, exposed as a Text widget
     neuro_data = []  # more complex data types, also with children
     labels = []
+    index = get_content_index(node)
     for key, value in node.fields.items():
         if isinstance(value, (str, datetime)):
             lbl_key = widgets.Label(key + ':', layout=field_lay)
@@ -65,20 +148,260 @@ def show_neurodata_base(node: NWBDataInterface, neurodata_vis_spec: dict) -> wid
                 lbl_names = widgets.Label(value, layout=field_lay)
             hbox_exp = widgets.HBox(children=[lbl_experimenter, lbl_names])
             info.append(hbox_exp)
-        elif (isinstance(value, Iterable) and len(value)) or value:
-            neuro_data.append(view.nwb2widget(value, neurodata_vis_spec=neurodata_vis_spec))
-            labels.append(key)
-    accordion = widgets.Accordion(children=neuro_data, selected_index=None)
-    for i, label in enumerate(labels):
-        if hasattr(node.fields[label], 'description') and node.fields[label].description:
-            accordion.set_title(i, label + ': ' + node.fields[label].description)
         else:
-            accordion.set_title(i, label)
+            summary = None if index is None else index.summarize(value)
+            if summary is not None:
+                if summary['n_objects']:
+                    neuro_data.append(value)
+                    labels.append('{} ({})'.format(field_label(key, value), index.size_label(summary)))
+            elif (isinstance(value, Iterable) and len(value)) or value:
+                neuro_data.append(value)
+                labels.append(field_label(key, value))
+    func_ = partial(view.nwb2widget, neurodata_vis_spec=neurodata_vis_spec)
+    accordion = lazy_show_over_data(neuro_data, func_, labels=labels, style=widgets.Accordion)
     return widgets.VBox(info + [accordion])
 
 
-def dict2accordion(d: dict, neurodata_vis_spec: dict, **pass_kwargs) -> widgets.Accordion:
-    children = [widgets.HTML('Rendering...') for _ in d]
+def field_label(key, value) -> str:
+    """Accordion label of a field of a container, with its description if it has one"""
+    if hasattr(value, 'description') and value.description:
+        return key + ': ' + value.description
+    return key
+
+
+# Children of lazy grouping widgets are built on this executor so that building a heavy visualization does not block
+# the kernel. Set to None to build them synchronously in the `selected_index` observer.
+render_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='nwbwidgets-render')
+_swap_lock = threading.Lock()
+
+# Widgets rendered by nwb2widget for objects read from a file, reused when the same object is rendered again. Set to
+# None to always rebuild them.
+render_cache = RenderCache()
+
+
+class Placeholder(widgets.HTML):
+    """Stands in for a lazy child that has not been built yet"""
+
+
+def placeholder() -> widgets.HTML:
+    return Placeholder('Rendering...')
+
+
+def is_placeholder(child) -> bool:
+    return isinstance(child, Placeholder)
+
+
+def close_unshared(widget):
+    """Close a widget tree, except the widgets held by `render_cache`, which may be displayed elsewhere or returned by
+    a later `nwb2widget`"""
+    close_widget_tree(widget, keep=None if render_cache is None else render_cache.holds)
+
+
+class PrefetchPolicy:
+    """Which children of a lazy grouping widget to build speculatively, and how many of them to keep.
+
+    After the selected child is built, the children that are most likely to be opened next are built in the background
+    and kept aside until they are selected. Prefetched children that fall out of the neighbourhood of the selection or
+    exceed the memory ceiling are discarded without ever being shown.
+    """
+
+    def __init__(self, n_adjacent=1, max_prefetched=4, max_bytes=100e6, rank=None):
+        """
+        Parameters
+        ----------
+        n_adjacent: int, optional
+            number of children to prefetch on each side of the selected child. The next child is prefetched first.
+        max_prefetched: int, optional
+            maximum number of prefetched children kept at the same time
+        max_bytes: float, optional
+            maximum estimated memory of the prefetched children kept at the same time
+        rank: function, optional
+            takes the selected index and the number of children and returns the indices to prefetch, most likely first.
+            Overrides `n_adjacent`.
+        """
+        self.n_adjacent = n_adjacent
+        self.max_prefetched = max_prefetched
+        self.max_bytes = max_bytes
+        self.rank = rank
+
+    def candidates(self, index, n_children):
+        if self.rank is not None:
+            indices = self.rank(index, n_children)
+        else:
+            indices = [i for distance in range(1, self.n_adjacent + 1) for i in (index + distance, index - distance)]
+        return [i for i in indices if 0 <= i < n_children and i != index][:self.max_prefetched]
+
+
+# Used by lazy grouping widgets that are not given a prefetch policy. None disables prefetching.
+default_prefetch_policy = None
+
+
+class LazyChildren:
+    """Builds the children of a Tab or Accordion on demand
+
+    The child is built when it is selected, on `render_executor`, and swapped in when it is ready. Selecting another
+    child cancels builds that have not started yet. Builds that are already running cannot be interrupted; their
+    result is still swapped in (or kept as prefetched) when they finish.
+    """
+
+    def __init__(self, grouping: GroupingWidget, children: list, make_child, prefetch: PrefetchPolicy = None):
+        """
+        Parameters
+        ----------
+        grouping: ipywidgets.Tab or ipywidgets.Accordion
+        children: list of widgets
+            current children (placeholders for the ones that are not built). Modified in place.
+        make_child: function
+            takes the index of a child and returns its widget
+        prefetch: PrefetchPolicy, optional
+            default is `default_prefetch_policy`
+        """
+        self.grouping = grouping
+        self.children = children
+        self.make_child = make_child
+        self.prefetch = default_prefetch_policy if prefetch is None else prefetch
+        self.pending = dict()  # index -> future of a child being built
+        self.prefetched = dict()  # index -> (widget, estimated bytes) of children built but not shown yet
+        self._tried = set()  # indices prefetched since the selection changed, kept or not
+
+        grouping.observe(self.on_selected_index, names='selected_index')
+        self.render(grouping.selected_index)
+
+    def on_selected_index(self, change):
+        self.render(change.new)
+
+    def render(self, index):
+        """Show the child at `index`, building it if needed. Returns the future of the build, if it is pending"""
+        with _swap_lock:
+            for i, future in list(self.pending.items()):
+                if i != index and future.cancel():
+                    del self.pending[i]
+            self._tried.clear()
+            if self.prefetch is not None and index is not None:
+                keep = self.prefetch.candidates(index, len(self.children))
+                for i in [i for i in self.prefetched if i not in keep and i != index]:
+                    self.discard(i)
+
+        if index is None or not is_placeholder(self.children[index]):
+            return
+        if index in self.pending:
+            return self.pending[index]
+
+        if index in self.prefetched:
+            with _swap_lock:
+                child, _ = self.prefetched.pop(index)
+                self.swap_in(index, child)
+                if not self.pending:
+                    self.prefetch_next()
+            return
+
+        if render_executor is None:
+            self.children[index] = self.make_child(index)
+            self.grouping.children = self.children
+            return
+
+        return self.submit(index, speculative=False)
+
+    def build(self, index):
+        try:
+            return self.make_child(index)
+        except Exception:
+            return widgets.HTML('<pre>{}</pre>'.format(html.escape(traceback.format_exc())))
+
+    def submit(self, index, speculative):
+        with _swap_lock:
+            return self._submit(index, speculative)
+
+    def _submit(self, index, speculative):
+        def task():
+            child = self.build(index)
+            with _swap_lock:
+                # a prefetch that was selected while it was being built is shown right away
+                if self.grouping.selected_index == index or not speculative:
+                    self.swap_in(index, child)
+                else:
+                    self.keep_prefetched(index, child)
+                # speculative builds only start once no other build is running, so that they never hold up the
+                # child that the user selected
+                if not any(i != index for i in self.pending):
+                    self.prefetch_next()
+                self.pending.pop(index, None)
+
+        # run in a copy of the current context so that outputs are routed to the cell that displays the widget
+        future = self.pending[index] = render_executor.submit(contextvars.copy_context().run, task)
+        return future
+
+    def swap_in(self, index, child):
+        self.children[index] = child
+        self.grouping.children = self.children
+
+    def prefetch_next(self):
+        """Start building the most likely child to be selected next, once the selected child is built. Call with
+        `_swap_lock` held."""
+        selected = self.grouping.selected_index
+        if self.prefetch is None or render_executor is None or selected is None or \
+                is_placeholder(self.children[selected]):
+            return
+        for i in self.prefetch.candidates(selected, len(self.children)):
+            if i not in self.pending and i not in self.prefetched and i not in self._tried and \
+                    is_placeholder(self.children[i]):
+                self._tried.add(i)
+                self._submit(i, speculative=True)
+                return
+
+    def keep_prefetched(self, index, child) -> bool:
+        """Store a prefetched child, discarding the least likely ones above the ceiling. Returns whether it was kept"""
+        self.prefetched[index] = (child, estimate_widget_size(child))
+        selected = self.grouping.selected_index
+        likely = [] if selected is None else self.prefetch.candidates(selected, len(self.children))
+
+        def unlikeliness(i):
+            return likely.index(i) if i in likely else len(likely) + abs(i - (selected or 0))
+
+        while self.prefetched and (
+                len(self.prefetched) > self.prefetch.max_prefetched or
+                sum(nbytes for _, nbytes in self.prefetched.values()) > self.prefetch.max_bytes):
+            self.discard(max(self.prefetched, key=unlikeliness))
+        return index in self.prefetched
+
+    def discard(self, index):
+        child, _ = self.prefetched.pop(index)
+        close_unshared(child)
+
+
+def lazy_children(grouping: GroupingWidget, children: list, make_child, prefetch: PrefetchPolicy = None) \
+        -> GroupingWidget:
+    """Build the children of a Tab or Accordion on demand. See `LazyChildren`.
+
+    Parameters
+    ----------
+    grouping: ipywidgets.Tab or ipywidgets.Accordion
+    children: list of widgets
+    make_child: function
+        takes the index of a child and returns its widget
+    prefetch: PrefetchPolicy, optional
+
+    Returns
+    -------
+    ipywidgets.Tab or ipywidgets.Accordion
+        `grouping`, with a `lazy_children` attribute holding the LazyChildren object
+
+    """
+    grouping.lazy_children = LazyChildren(grouping, children, make_child, prefetch)
+    return grouping
+
+
+# dicts with more entries than this are shown one page at a time, with a search box. See `PagedAccordion`.
+accordion_page_size = 50
+
+
+def dict2accordion(d: dict, neurodata_vis_spec: dict, prefetch: PrefetchPolicy = None,
+                   **pass_kwargs) -> widgets.Widget:
+    if accordion_page_size is not None and len(d) > accordion_page_size:
+        make_child = partial(nwb2widget, neurodata_vis_spec=neurodata_vis_spec, **pass_kwargs)
+        return PagedAccordion(d, make_child, page_size=accordion_page_size, prefetch=prefetch)
+
+    children = [placeholder() for _ in d]
     accordion = widgets.Accordion(children=children, selected_index=None)
     for i, label in enumerate(d):
         if hasattr(d[label], 'description') and d[label].description:
@@ -87,18 +410,144 @@ def dict2accordion(d: dict, neurodata_vis_spec: dict, **pass_kwargs) -> widgets.
             accordion.set_title(i, label)
         accordion.set_title(i, label)
 
-    def on_selected_index(change):
-        if change.new is not None and isinstance(change.owner.children[change.new], widgets.HTML):
-            children[change.new] = nwb2widget(list(d.values())[change.new], neurodata_vis_spec=neurodata_vis_spec,
-                                              **pass_kwargs)
-            change.owner.children = children
+    values = list(d.values())
+
+    def make_child(index):
+        return nwb2widget(values[index], neurodata_vis_spec=neurodata_vis_spec, **pass_kwargs)
+
+    return lazy_children(accordion, children, make_child, prefetch)
+
+
+class PageController(widgets.HBox, ValueWidget):
+    """Previous and next buttons over the pages of a list of items. `value` is the index of the current page."""
+
+    value = Int(0)
+
+    def __init__(self, n_items: int, page_size: int = 50, **kwargs):
+        self.n_items = n_items
+        self.page_size = page_size
+        self.prev_button = widgets.Button(description='◀', layout=widgets.Layout(width='40px'))
+        self.next_button = widgets.Button(description='▶', layout=widgets.Layout(width='40px'))
+        self.label = widgets.Label()
+        super().__init__(children=[self.prev_button, self.label, self.next_button], **kwargs)
+
+        self.prev_button.on_click(lambda _: setattr(self, 'value', self.value - 1))
+        self.next_button.on_click(lambda _: setattr(self, 'value', self.value + 1))
+        self.observe(self.update, names='value')
+        self.update()
+
+    @property
+    def n_pages(self) -> int:
+        return max(1, -(-self.n_items // self.page_size))
+
+    @validate('value')
+    def _valid_value(self, proposal):
+        return min(max(proposal['value'], 0), self.n_pages - 1)
+
+    @property
+    def start(self) -> int:
+        return self.value * self.page_size
+
+    @property
+    def stop(self) -> int:
+        return min(self.start + self.page_size, self.n_items)
+
+    def set_n_items(self, n_items: int):
+        """Change the number of items and go back to the first page"""
+        self.n_items = n_items
+        if self.value:
+            self.value = 0
+        else:
+            self.update()
+
+    def update(self, change=None):
+        if self.n_items:
+            self.label.value = '{}-{} of {}'.format(self.start + 1, self.stop, self.n_items)
+        else:
+            self.label.value = 'no matches'
+        self.prev_button.disabled = self.value == 0
+        self.next_button.disabled = self.value == self.n_pages - 1
 
-    accordion.observe(on_selected_index, names='selected_index')
 
-    return accordion
+class PagedAccordion(widgets.VBox):
+    """Accordion over a large dict that only instantiates the entries of the current page
 
+    Only the placeholders and titles of one page exist at a time, so browsing a dict of thousands of objects costs the
+    same as browsing a small one. Entries are filtered incrementally with the search box: every word of the query has
+    to appear in the label or in the type name of the entry (case insensitive).
+    """
 
-def lazy_tabs(in_dict: dict, node, style: GroupingWidget = widgets.Tab) -> GroupingWidget:
+    def __init__(self, d: dict, make_child, page_size: int = 50, prefetch: PrefetchPolicy = None):
+        """
+        Parameters
+        ----------
+        d: dict
+            keys are labels
+        make_child: function
+            takes a value of `d` and returns its widget
+        page_size: int, optional
+        prefetch: PrefetchPolicy, optional
+        """
+        super().__init__()
+        self.labels = list(d)
+        self.values = list(d.values())
+        self.make_child = make_child
+        self.prefetch = prefetch
+        self.search_keys = ['{} {}'.format(label, type(value).__name__).lower() for label, value in d.items()]
+        self.matches = list(range(len(self.labels)))
+        self.accordion = None
+
+        self.search = widgets.Text(placeholder='search by name or type', continuous_update=True,
+                                   layout=widgets.Layout(width='250px'))
+        self.pager = PageController(len(self.matches), page_size)
+        self.controls = widgets.HBox([self.search, self.pager])
+
+        self.search.observe(self.on_search, names='value')
+        self.pager.observe(self.show_page, names='value')
+        self.show_page()
+
+    def on_search(self, change):
+        words = change.new.lower().split()
+        self.matches = [i for i, key in enumerate(self.search_keys) if all(word in key for word in words)]
+        on_first_page = self.pager.value == 0
+        self.pager.set_n_items(len(self.matches))  # going back to the first page shows it
+        if on_first_page:
+            self.show_page()
+
+    def show_page(self, change=None):
+        indices = self.matches[self.pager.start:self.pager.stop]
+        if self.accordion is not None:
+            self.close_page()
+
+        children = [placeholder() for _ in indices]
+        accordion = widgets.Accordion(children=children, selected_index=None)
+        for i, index in enumerate(indices):
+            accordion.set_title(i, self.labels[index])
+
+        def make_child(i):
+            return self.make_child(self.values[indices[i]])
+
+        self.accordion = lazy_children(accordion, children, make_child, self.prefetch)
+        self.children = [self.controls, self.accordion]
+
+    def close_page(self):
+        """Cancel the pending builds of the current page and close its placeholders and prefetched entries. Entries that
+        were shown, and prefetched entries held by `render_cache`, are left open since they may be displayed elsewhere
+        or returned by a later `nwb2widget`."""
+        lazy = self.accordion.lazy_children
+        with _swap_lock:
+            for future in lazy.pending.values():
+                future.cancel()
+            for i in list(lazy.prefetched):
+                lazy.discard(i)
+        for child in lazy.children:
+            if is_placeholder(child):
+                child.close()
+        self.accordion.close()
+
+
+def lazy_tabs(in_dict: dict, node, style: GroupingWidget = widgets.Tab, prefetch: PrefetchPolicy = None) \
+        -> GroupingWidget:
     """Creates a lazy tab object where multiple visualizations can be used for a single node and are generated on the
     fly
 
@@ -110,6 +559,8 @@ def lazy_tabs(in_dict: dict, node, style: GroupingWidget = widgets.Tab) -> Group
         instance of neurodata type to visualize
     style: ipywidgets.Tab or ipywidgets.Accordion, optional
         which way to present the data
+    prefetch: PrefetchPolicy, optional
+        speculatively build the tabs that are likely to be opened next
 
     Returns
     -------
@@ -118,25 +569,20 @@ def lazy_tabs(in_dict: dict, node, style: GroupingWidget = widgets.Tab) -> Group
     """
     tabs_spec = list(in_dict.items())
 
-    children = [tabs_spec[0][1](node)] + [widgets.HTML('Rendering...')
-                                          for _ in range(len(tabs_spec) - 1)]
+    children = [placeholder() for _ in tabs_spec]
     tab = style(children=children)
     [tab.set_title(i, label) for i, (label, _) in enumerate(tabs_spec)]
 
-    def on_selected_index(change):
-        if isinstance(change.owner.children[change.new], widgets.HTML):
-            children[change.new] = vis2widget(tabs_spec[change.new][1](node))
-            change.owner.children = children
-
-    tab.observe(on_selected_index, names='selected_index')
+    def make_child(index):
+        return vis2widget(tabs_spec[index][1](node))
 
-    return tab
+    return lazy_children(tab, children, make_child, prefetch)
 
 
 class LazyTab(widgets.Tab):
     """A lazy tab object where multiple visualizations can be used for a single node and are generated on the fly"""
 
-    def __init__(self, func_dict, data):
+    def __init__(self, func_dict, data, prefetch: PrefetchPolicy = None):
         """
         Parameters
         ----------
@@ -144,24 +590,25 @@ class LazyTab(widgets.Tab):
             keys are labels for tabs and values are functions
         data: NWBDataInterface
             instance of neurodata type to visualize
+        prefetch: PrefetchPolicy, optional
+            speculatively build the tabs that are likely to be opened next
         """
 
         tabs_spec = list(func_dict.items())
-        children = [tabs_spec[0][1](data)] + [widgets.HTML('Rendering...') for _ in range(len(tabs_spec) - 1)]
+        children = [placeholder() for _ in tabs_spec]
 
         super().__init__(children=children)
 
         [self.set_title(i, label) for i, (label, _) in enumerate(tabs_spec)]
 
-        def on_selected_index(change):
-            if isinstance(change.owner.children[change.new], widgets.HTML):
-                children[change.new] = vis2widget(tabs_spec[change.new][1](data))
-                change.owner.children = children
+        def make_child(index):
+            return vis2widget(tabs_spec[index][1](data))
 
-        self.observe(on_selected_index, names='selected_index')
+        lazy_children(self, children, make_child, prefetch)
 
 
-def lazy_show_over_data(list_, func_, labels=None, style: GroupingWidget = widgets.Tab) -> GroupingWidget:
+def lazy_show_over_data(list_, func_, labels=None, style: GroupingWidget = widgets.Tab,
+                        prefetch: PrefetchPolicy = None) -> GroupingWidget:
     """
     Apply same function to list of data in lazy tabs or lazy accordion
     Parameters
@@ -170,6 +617,8 @@ def lazy_show_over_data(list_, func_, labels=None, style: GroupingWidget = widge
     func_
     labels: list of str
     style: widgets.Tab or widgets.Accordion
+    prefetch: PrefetchPolicy, optional
+        speculatively build the entries that are likely to be opened next
 
     Returns
     -------
@@ -177,48 +626,56 @@ def lazy_show_over_data(list_, func_, labels=None, style: GroupingWidget = widge
         subtype Tab or Accordion
 
     """
-    children = [vis2widget(func_(list_[0]))] + [widgets.HTML('Rendering...') for _ in range(len(list_) - 1)]
+    children = [placeholder() for _ in range(len(list_))]
     out = style(children=children)
     if labels is not None:
         [out.set_title(i, label) for i, label in enumerate(labels)]
 
-    def on_selected_index(change):
-        if change.new is not None and isinstance(change.owner.children[change.new], widgets.HTML):
-            children[change.new] = vis2widget(func_(list_[change.new]))
-            change.owner.children = children
+    def make_child(index):
+        return vis2widget(func_(list_[index]))
 
-    out.observe(on_selected_index, names='selected_index')
-
-    return out
+    return lazy_children(out, children, make_child, prefetch)
 
 
 def nwb2widget(node, neurodata_vis_spec: dict, **pass_kwargs) -> widgets.Widget:
-    for ndtype in type(node).__mro__:
-        if ndtype in neurodata_vis_spec:
-            spec = neurodata_vis_spec[ndtype]
-            if isinstance(spec, dict):
-                return lazy_tabs(spec, node)
-            elif callable(spec):
-                return vis2widget(spec(node, neurodata_vis_spec=neurodata_vis_spec, **pass_kwargs))
-    out1 = widgets.Output()
-    with out1:
-        print(node)
-    return out1
+    with profile(node_label(node), 'nwb2widget', node):
+        spec = resolve_spec(neurodata_vis_spec, type(node))
+        # extra kwargs change what is rendered, so only plain renders are cached
+        use_cache = render_cache is not None and spec is not None and not pass_kwargs
+        if use_cache:
+            out = render_cache.get(node, spec, neurodata_vis_spec)
+            if out is not None:
+                return out
+        if isinstance(spec, dict):
+            out = lazy_tabs(spec, node)
+        elif callable(spec):
+            out = vis2widget(spec(node, neurodata_vis_spec=neurodata_vis_spec, **pass_kwargs))
+        else:
+            out = None
+        if out is not None:
+            if use_cache:
+                render_cache.put(node, spec, out, neurodata_vis_spec)
+            return out
+        out1 = widgets.Output()
+        with out1:
+            print(node)
+        return out1
 
 
 def vis2widget(vis) -> widgets.Widget:
-    if isinstance(vis, widgets.Widget):
-        out = vis
-    elif isinstance(vis, plt.Figure):
-        out = fig2widget(vis)
-    elif isinstance(vis, plt.Axes):
-        out = fig2widget(vis.get_figure())
-    else:
-        raise ValueError('unsupported vis type {}'.format(type(vis)))
+    with profile(type(vis).__name__, 'vis2widget', vis):
+        if isinstance(vis, widgets.Widget):
+            out = vis
+        elif isinstance(vis, plt.Figure):
+            out = fig2widget(vis)
+        elif isinstance(vis, plt.Axes):
+            out = fig2widget(vis.get_figure())
+        else:
+            raise ValueError('unsupported vis type {}'.format(type(vis)))
 
-    out.add_class("custom_theme")
+        out.add_class("custom_theme")
 
-    return out
+        return out
 
 
 def fig2widget(fig: Figure, **kwargs) -> widgets.Widget:
@@ -270,27 +727,143 @@ def df2accordion(df: pd.DataFrame, by, func, style: GroupingWidget = widgets.Acc
 def show_dset(dset: h5py.Dataset, **kwargs):
     return widgets.VBox(children=[
         show_dict(dict(dset.attrs)),
-        dataset_to_sheet(dset)
+        DatasetViewer(dset)
     ])
 
 
-def dataset_to_sheet(dset: h5py.Dataset):
-    if dset.ndim == 1:
-        nrows = len(dset)
+class DatasetViewer(widgets.VBox):
+    """Window over an h5py dataset, zarr array or numpy array that only reads the visible rows and columns
 
-        sheet = ipysheet.easy.sheet(rows=nrows, columns=1, column_headers=False)
-        for row in range(nrows):
-            ipysheet.easy.cell(row, 0, dset[row], read_only=True)
-    elif dset.ndim == 2:
-        nrows, ncols = dset.shape
+    Datasets with more than two dimensions are shown as a 2-D slice: pick the axes shown as rows and columns, and the
+    index along each of the other axes. After a window is shown, the next window in the scrolling direction is read in
+    the background on `render_executor`, so scrolling through a dataset costs one window read per step, whatever the
+    size of the dataset.
+    """
 
-        sheet = ipysheet.easy.sheet(rows=nrows, columns=ncols, column_headers=False)
-        for row, col in zip(range(nrows), range(ncols)):
-            ipysheet.easy.cell(row, col, dset[row, col], read_only=True)
-    else:
-        # do not know how to render datasets that have 3 or more dimensions
-        return widgets.HTML(print(dset))
-    return sheet
+    max_windows = 8  # number of windows kept in memory
+
+    def __init__(self, dset, n_rows: int = 20, n_cols: int = 10):
+        """
+        Parameters
+        ----------
+        dset: h5py.Dataset, zarr.Array or numpy.ndarray
+        n_rows: int, optional
+            number of rows in the window
+        n_cols: int, optional
+            number of columns in the window
+        """
+        super().__init__()
+        self.dset = dset
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.windows = OrderedDict()  # selection key -> values, LRU
+        self._lock = threading.Lock()
+        self._direction = 1
+        self.prefetching = None  # future of the window being read in the background
+        self.table_html = widgets.HTML()
+
+        shape = dset.shape
+        if not len(shape):
+            self.table_html.value = '<pre>{}</pre>'.format(html.escape(str(dset[()])))
+            self.children = [self.table_html]
+            return
+
+        axes = list(range(len(shape)))
+        self.row_axis = widgets.Dropdown(options=axes, value=0, description='row axis',
+                                         layout=widgets.Layout(width='150px'))
+        self.col_axis = widgets.Dropdown(options=[None] + axes, value=1 if len(shape) > 1 else None,
+                                         description='column axis', layout=widgets.Layout(width='180px'))
+        self.row_start = widgets.IntSlider(min=0, description='first row', continuous_update=False)
+        self.col_start = widgets.IntSlider(min=0, description='first column', continuous_update=False)
+        self.indices = [widgets.BoundedIntText(value=0, min=0, max=max(n - 1, 0), description='axis {}'.format(i),
+                                               layout=widgets.Layout(width='150px'))
+                        for i, n in enumerate(shape)]
+
+        self.row_axis.observe(self.on_row_axis, names='value')
+        self.col_axis.observe(self.on_col_axis, names='value')
+        self.row_start.observe(self.on_scroll, names='value')
+        self.col_start.observe(self.show_window, names='value')
+        for index in self.indices:
+            index.observe(self.show_window, names='value')
+
+        controls = [widgets.HBox([self.row_start, self.col_start])]
+        if len(shape) > 1:
+            controls.insert(0, widgets.HBox([self.row_axis, self.col_axis] + self.indices))
+        self.children = controls + [self.table_html]
+        self.update_controls()
+
+    def on_row_axis(self, change):
+        if change.new == self.col_axis.value:
+            self.col_axis.value = change.old
+        self.update_controls()
+
+    def on_col_axis(self, change):
+        if change.new == self.row_axis.value:
+            self.row_axis.value = change.old if change.old is not None else \
+                next(axis for axis in range(len(self.dset.shape)) if axis != change.new)
+        self.update_controls()
+
+    def on_scroll(self, change):
+        self._direction = 1 if change.new >= change.old else -1
+        self.show_window()
+
+    def update_controls(self):
+        shape = self.dset.shape
+        row_axis, col_axis = self.row_axis.value, self.col_axis.value
+        self.row_start.max = max(shape[row_axis] - self.n_rows, 0)
+        self.row_start.step = max(self.n_rows // 2, 1)
+        self.col_start.max = 0 if col_axis is None else max(shape[col_axis] - self.n_cols, 0)
+        self.col_start.step = max(self.n_cols // 2, 1)
+        self.col_start.layout.display = 'none' if col_axis is None or self.col_start.max == 0 else None
+        for axis, index in enumerate(self.indices):
+            index.layout.display = 'none' if axis in (row_axis, col_axis) else None
+        self.show_window()
+
+    def selection(self, row_start=None) -> tuple:
+        row_start = self.row_start.value if row_start is None else row_start
+        selection = [index.value for index in self.indices]
+        selection[self.row_axis.value] = slice(row_start, row_start + self.n_rows)
+        if self.col_axis.value is not None:
+            selection[self.col_axis.value] = slice(self.col_start.value, self.col_start.value + self.n_cols)
+        return tuple(selection)
+
+    def read(self, selection) -> np.ndarray:
+        key = tuple((item.start, item.stop) if isinstance(item, slice) else item for item in selection)
+        with self._lock:
+            if key in self.windows:
+                self.windows.move_to_end(key)
+                return self.windows[key]
+        values = np.asarray(self.dset[selection])
+        with self._lock:
+            self.windows[key] = values
+            while len(self.windows) > self.max_windows:
+                self.windows.popitem(last=False)
+        return values
+
+    def show_window(self, change=None):
+        values = self.read(self.selection())
+        if self.col_axis.value is not None and self.row_axis.value > self.col_axis.value:
+            values = values.T
+        if values.dtype.kind == 'S':
+            values = values.astype(str)
+        elif values.dtype == object:
+            values = np.array([x.decode() if isinstance(x, bytes) else x for x in values.ravel()],
+                              dtype=object).reshape(values.shape)
+        rows = range(self.row_start.value, self.row_start.value + len(values))
+        if values.ndim == 1:
+            df = pd.DataFrame({'value': list(values)}, index=rows)
+        else:
+            df = pd.DataFrame(list(values), index=rows,
+                              columns=range(self.col_start.value, self.col_start.value + values.shape[1]))
+        self.table_html.value = df.to_html()
+        self.prefetch()
+
+    def prefetch(self):
+        if render_executor is None:
+            return
+        row_start = self.row_start.value + self._direction * self.n_rows
+        if 0 <= row_start < self.dset.shape[self.row_axis.value]:
+            self.prefetching = render_executor.submit(self.read, self.selection(row_start))
 
 
 def show_dict(in_dict) -> widgets.Widget:
@@ -306,16 +879,5 @@ def show_dict(in_dict) -> widgets.Widget:
 
 
 def df_to_hover_text(df: pd.DataFrame):
-    return [row_to_hover_text(row) for _, row in df.iterrows()]
-
-
-def row_to_hover_text(row):
-    text_rows = []
-    for key, val in list(row.to_dict().items()):
-        if isinstance(val, (int, float)) and abs(val) > 1e5:
-            text_rows.append('{}: {:.2e}'.format(key, val))
-        elif isinstance(val, (int, str)):
-            text_rows.append('{}: {}'.format(key, val))
-        elif isinstance(val, float):
-            text_rows.append('{}: {:.3f}'.format(key, val))
-    return '<br>'.join(text_rows)
+    columns = [format_hover_column(str(name), df[name].to_numpy()) for name in df.columns]
+    return join_hover_columns(columns, len(df))
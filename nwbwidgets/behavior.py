@@ -6,6 +6,7 @@ from nwbwidgets import view
 from plotly import graph_objects as go
 from pynwb.behavior import Position, SpatialSeries, BehavioralEvents
 
+from .utils.plotly import as_typed_array
 from .utils.timeseries import get_timeseries_tt, get_timeseries_in_units
 
 
@@ -104,7 +105,7 @@ def plotly_show_spatial_trace(node):
     fig = go.FigureWidget()
 
     if len(data.shape) == 1:
-        fig.add_trace(go.Scatter(x=tt, y=data))
+        fig.add_trace(go.Scatter(x=as_typed_array(tt), y=as_typed_array(data)))
         fig.update_xaxes(title_text='time (s)')
         if unit:
             fig.update_yaxes(title_text='x ({})'.format(unit))
@@ -112,7 +113,7 @@ def plotly_show_spatial_trace(node):
             fig.update_yaxes(title_text='x')
 
     elif data.shape[1] == 2:
-        fig.add_trace(go.Scatter(x=data[:, 0], y=data[:, 1]))
+        fig.add_trace(go.Scatter(x=as_typed_array(data[:, 0]), y=as_typed_array(data[:, 1])))
         if unit:
             fig.update_xaxes(title_text='x ({})'.format(unit))
             fig.update_yaxes(title_text='y ({})'.format(unit))
@@ -123,7 +124,7 @@ def plotly_show_spatial_trace(node):
 
     elif data.shape[1] == 3:
         fig.add_trace(go.Scatter3d(
-            x=data[:, 0], y=data[:, 1], z=data[:, 2]
+            x=as_typed_array(data[:, 0]), y=as_typed_array(data[:, 1]), z=as_typed_array(data[:, 2])
         ))
 
         if unit:
@@ -1,3 +1,3 @@
 from .time_window_controllers import StartAndDurationController, RangeController
 from .group_and_sort_controllers import GroupAndSortController
-from .misc import ProgressBar, make_trial_event_controller
+from .misc import ProgressBar, LoadingStatus, make_trial_event_controller
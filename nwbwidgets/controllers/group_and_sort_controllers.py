@@ -260,7 +260,7 @@ class GroupAndSortController(AbstractGroupAndSortController):
         if by is None:
             return None
         elif by in self.dynamic_table:
-            return self.dynamic_table[by][:][units_select]
+            return np.asarray(self.dynamic_table[by][:])[units_select]
         else:
             raise ValueError('column {} not in DynamicTable {}'.format(by, self.dynamic_table))
 
@@ -270,11 +270,12 @@ class GroupAndSortController(AbstractGroupAndSortController):
                           isinstance(self.units[x][0], str)]
         return [x for x in candidate_cols if len(robust_unique(self.units[x][:])) > 1]
 
-    def group_and_sort(self):
+    def sorted_items(self):
+        """Order, group indices and labels of all the selected items, before the window is applied"""
         if self.group_vals is None and self.order_vals is None:
             self.order_vals = np.arange(self.nitems).astype('int')
 
-        order, group_inds, labels = group_and_sort(
+        return group_and_sort(
             group_vals=self.group_vals,
             group_select=self.group_select,
             discard_rows=self.discard_rows,
@@ -282,6 +283,14 @@ class GroupAndSortController(AbstractGroupAndSortController):
             limit=self.limit
         )
 
+    def window_order(self, window):
+        """Order of the items a window would show, e.g. to read them ahead of time"""
+        order, group_inds, labels = self.sorted_items()
+        return order[window[0]:window[1]]
+
+    def group_and_sort(self):
+        order, group_inds, labels = self.sorted_items()
+
         if hasattr(self.range_controller, 'slider'):
             self.range_controller.slider.max = len(order)
 
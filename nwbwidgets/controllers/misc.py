@@ -1,7 +1,14 @@
+import threading
+import time
+from functools import partial
+
 import numpy as np
 from ipywidgets import widgets, Layout
 from tqdm.notebook import tqdm as tqdm_notebook
 
+from ..utils.cancellation import current_token
+from ..utils.widgets import load_async
+
 
 class ProgressBar(tqdm_notebook):
 
@@ -10,6 +17,88 @@ class ProgressBar(tqdm_notebook):
         self.container.children[0].layout = Layout(width='80%')
 
 
+LOADING_CLASS = 'nwbwidgets-loading'
+
+
+class LoadingStatus(widgets.HBox):
+    """Progress of the data that views are loading, with a button that cancels it
+
+    While data loads, the views are greyed out and keep showing their previous figure. The progress reported by the
+    reader with `report_progress` is shown in a `ProgressBar`. Progress arrives on the thread that reads, so the
+    progress bar is created, updated and closed under a lock, and only for the load that is current.
+    """
+
+    def __init__(self, views=None, min_interval=.1):
+        """
+        Parameters
+        ----------
+        views: list of widgets, optional
+            greyed out while loading
+        min_interval: float, optional
+            seconds between updates of the progress bar
+        """
+        self.views = [] if views is None else list(views)
+        self.min_interval = min_interval
+        self.token = None
+        self.progress_bar = None
+        self._last_refresh = 0.
+        self._lock = threading.Lock()
+        self.style = widgets.HTML('<style>.{} {{opacity: .4; pointer-events: none}}</style>'.format(LOADING_CLASS))
+        self.cancel_button = widgets.Button(description='cancel', icon='stop', layout=Layout(width='auto'))
+        self.cancel_button.on_click(self.cancel)
+        super().__init__(children=[self.style], layout=Layout(width='100%'))
+
+    async def load(self, func, *args, **kwargs):
+        """`load_async` with the views greyed out and the progress shown"""
+        token = current_token()
+        self.start(token)
+        try:
+            return await load_async(func, *args, **kwargs)
+        finally:
+            self.stop(token)
+
+    def start(self, token):
+        with self._lock:
+            self.token = token
+        if token is not None:
+            token.on_progress = partial(self.show_progress, token)
+        for view in self.views:
+            view.add_class(LOADING_CLASS)
+
+    def show_progress(self, token, done, total):
+        """Called from the thread that reads"""
+        now = time.perf_counter()
+        with self._lock:
+            if token is not self.token or done < total and now - self._last_refresh < self.min_interval:
+                return
+            self._last_refresh = now
+            if self.progress_bar is None:
+                self.progress_bar = ProgressBar(total=total, desc='loading', leave=False, display=False)
+                self.children = [self.style, self.progress_bar.container, self.cancel_button]
+            self.progress_bar.total = total
+            self.progress_bar.n = done
+            self.progress_bar.refresh()
+
+    def stop(self, token=None):
+        """End the display of a load, unless a later one has started"""
+        with self._lock:
+            if token is not self.token:
+                return
+            self.token = None
+            if self.progress_bar is not None:
+                self.progress_bar.close()
+                self.progress_bar = None
+            self.children = [self.style]
+        for view in self.views:
+            view.remove_class(LOADING_CLASS)
+
+    def cancel(self, button=None):
+        """Stop the current load. The views keep their previous figure."""
+        if self.token is not None:
+            self.token.cancel()
+        self.stop(self.token)
+
+
 def make_trial_event_controller(trials, layout=None):
     trial_events = ['start_time']
     if not np.all(np.isnan(trials['stop_time'].data)):
@@ -9,6 +9,7 @@ import pynwb
 
 from .base import fig2widget, nwb2widget, lazy_tabs, render_dataframe
 from .timeseries import BaseGroupedTraceWidget
+from .utils.dynamictable import dynamic_table_hover_text
 
 
 def show_lfp(ndobj: LFP, neurodata_vis_spec: dict):
@@ -39,14 +40,7 @@ class ElectrodeGroupsWidget(ValueWidget, widgets.HBox):
         ugroups, group_pos, counts = np.unique(group_names, return_inverse=True, return_counts=True)
         elec_pos = np.hstack(np.arange(count) for count in counts)
 
-        hovertext = []
-        df = nwbobj.to_dataframe()
-        for i, row in df.iterrows():
-            hovertext.append('')
-            for key, val in list(row.to_dict().items()):
-                if key == 'group':
-                    continue
-                hovertext[-1] += '{}: {}<br>'.format(key, val)
+        hovertext = dynamic_table_hover_text(nwbobj, exclude=('group',))
 
         self.fig = go.FigureWidget()
         self.fig.add_trace(
@@ -0,0 +1,317 @@
+"""
+Render views of NWB files to static HTML or PNG files without a notebook frontend.
+
+    python -m nwbwidgets.export session1.nwb session2.nwb -o reports --format png --workers 4 --max-memory 4GB
+
+Each file is processed in a fresh process, up to `--workers` at a time, so that memory does not accumulate over a
+night of recordings and a crash only loses the file that caused it. Each process can be given a memory ceiling (Unix
+only).
+"""
+import argparse
+import base64
+import html
+import io
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+# Views that produce matplotlib or plotly figures. Keys and values are dotted paths so that this dict can be sent to
+# worker processes and filtered by type name without importing anything.
+default_export_spec = {
+    'pynwb.TimeSeries': 'nwbwidgets.export.plot_timeseries_overview',
+    'pynwb.misc.Units': {
+        'show_session_raster': 'nwbwidgets.misc.show_session_raster',
+        'plot_trials_psth': 'nwbwidgets.export.plot_trials_psth',
+    },
+    'pynwb.ophys.PlaneSegmentation': 'nwbwidgets.ophys.show_plane_segmentation_2d',
+    'pynwb.behavior.SpatialSeries': 'nwbwidgets.behavior.show_spatial_series',
+    'pynwb.image.GrayscaleImage': 'nwbwidgets.image.show_grayscale_image',
+    'pynwb.image.RGBImage': 'nwbwidgets.image.show_rbga_image',
+    'pynwb.image.RGBAImage': 'nwbwidgets.image.show_rbga_image',
+}
+
+
+def plot_timeseries_overview(time_series, duration=10., max_traces=32):
+    """Plot the first seconds of a 1-D or 2-D TimeSeries. Returns None for other shapes (e.g. image series)."""
+    from .timeseries import plot_traces, show_timeseries_mpl
+    from .utils.timeseries import get_timeseries_tt
+
+    ndim = len(time_series.data.shape)
+    if ndim not in (1, 2) or not time_series.data.shape[0]:
+        return None
+    t0 = get_timeseries_tt(time_series, 0, 1)[0]
+    time_window = [t0, t0 + duration]
+    if ndim == 1:
+        return show_timeseries_mpl(time_series, time_window=time_window, title=time_series.name)
+    return plot_traces(time_series, time_window=time_window,
+                       trace_window=[0, min(time_series.data.shape[1], max_traces)], title=time_series.name)
+
+
+def plot_trials_psth(units, unit_index=0, before=0.5, after=2.):
+    """Raster and PSTH of one unit aligned to the start of the trials. Returns None if the file has no trials."""
+    import numpy as np
+    from .misc import trials_psth
+
+    nwbfile = units.get_ancestor('NWBFile')
+    trials = None if nwbfile is None else nwbfile.trials
+    if trials is None or not len(trials) or unit_index >= len(units):
+        return None
+    return trials_psth(units, unit_index, before=before, after=after, order=np.arange(len(trials)), trials=trials)
+
+
+def select_spec(type_names, spec=None) -> dict:
+    """Subset of an export spec, e.g. select_spec(['Units', 'PlaneSegmentation'])
+
+    Parameters
+    ----------
+    type_names: iterable of str
+        class names or dotted paths of the types to keep
+    spec: dict, optional
+        default is `default_export_spec`
+
+    Returns
+    -------
+    dict
+    """
+    spec = default_export_spec if spec is None else spec
+    type_names = set(type_names)
+
+    def name_of(neurodata_type):
+        return neurodata_type if isinstance(neurodata_type, str) else \
+            neurodata_type.__module__ + '.' + neurodata_type.__name__
+
+    out = {key: value for key, value in spec.items()
+           if name_of(key) in type_names or name_of(key).rpartition('.')[2] in type_names}
+    missing = type_names - {name_of(key) for key in out} - {name_of(key).rpartition('.')[2] for key in out}
+    if missing:
+        raise ValueError('no view for {}'.format(', '.join(sorted(missing))))
+    return out
+
+
+def object_path(container) -> str:
+    names = []
+    while container.parent is not None:
+        names.append(container.name)
+        container = container.parent
+    return '/'.join(names[::-1])
+
+
+def get_figure(vis):
+    """The matplotlib or plotly figure of a view result, or None"""
+    import matplotlib.pyplot as plt
+    import plotly.graph_objects as go
+
+    if isinstance(vis, (plt.Figure, go.Figure, go.FigureWidget)):
+        return vis
+    if isinstance(vis, plt.Axes):
+        return vis.get_figure()
+    # widgets such as PlaneSegmentation2DWidget keep their figure in `fig`
+    fig = getattr(vis, 'fig', None)
+    if fig is not None and fig is not vis:
+        return get_figure(fig)
+
+
+def save_figure(fig, path_stem, fmt='html', dpi=100) -> str:
+    """Save a matplotlib or plotly figure as a static file
+
+    Parameters
+    ----------
+    fig: matplotlib.pyplot.Figure or plotly.graph_objects.Figure
+    path_stem: str
+        path without extension
+    fmt: {'html', 'png'}
+    dpi: int, optional
+        resolution of matplotlib figures
+
+    Returns
+    -------
+    str
+        path of the file written
+    """
+    import matplotlib.pyplot as plt
+
+    path = '{}.{}'.format(path_stem, fmt)
+    if isinstance(fig, plt.Figure):
+        if fmt == 'png':
+            fig.savefig(path, dpi=dpi, bbox_inches='tight')
+        else:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+            with open(path, 'w') as f:
+                f.write('<html><body><img src="data:image/png;base64,{}"></body></html>'.format(
+                    base64.b64encode(buffer.getvalue()).decode()))
+        plt.close(fig)
+    elif fmt == 'png':
+        fig.write_image(path)  # requires kaleido
+    else:
+        fig.write_html(path, include_plotlyjs='cdn')
+    return path
+
+
+def export_file(path, output_dir, spec=None, fmt='html', dpi=100) -> list:
+    """Render the views of every matching object of an NWB file to static files
+
+    Files are written to `output_dir/<file name>/`, together with an index.html that links them.
+
+    Parameters
+    ----------
+    path: str
+        NWB file
+    output_dir: str
+    spec: dict, optional
+        neurodata type -> view function, or dict of label -> view function. Types and functions may be dotted paths.
+        Default is `default_export_spec`.
+    fmt: {'html', 'png'}
+    dpi: int, optional
+
+    Returns
+    -------
+    list of dict
+        one record per view with the keys file, object, view, output, error and seconds
+    """
+    import matplotlib.pyplot as plt
+    from pynwb import NWBHDF5IO
+    from .utils.vis_spec import VisSpecRegistry
+
+    registry = VisSpecRegistry(default_export_spec if spec is None else spec)
+    file_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(file_dir, exist_ok=True)
+    records = []
+    with NWBHDF5IO(path, 'r', load_namespaces=True) as nwb_io:
+        nwbfile = nwb_io.read()
+        for container in list(nwbfile.objects.values()):
+            view_spec = registry.resolve(type(container))
+            if view_spec is None:
+                continue
+            views = view_spec.items() if isinstance(view_spec, dict) else [(view_spec.__name__, view_spec)]
+            for label, func in views:
+                name = object_path(container)
+                record = dict(file=path, object=name, view=label, output=None, error=None)
+                start = time.perf_counter()
+                try:
+                    fig = get_figure(func(container))
+                    if fig is not None:
+                        stem = os.path.join(file_dir, re.sub(r'[^\w.-]', '_', '{}.{}'.format(name, label)))
+                        record['output'] = save_figure(fig, stem, fmt, dpi)
+                except Exception:
+                    record['error'] = traceback.format_exc()
+                finally:
+                    plt.close('all')
+                record['seconds'] = time.perf_counter() - start
+                if record['output'] is not None or record['error'] is not None:
+                    records.append(record)
+    write_index(file_dir, path, records)
+    return records
+
+
+def write_index(file_dir, path, records):
+    items = []
+    for record in records:
+        title = html.escape('{} ({})'.format(record['object'], record['view']))
+        if record['error'] is not None:
+            items.append('<h3>{}</h3><pre>{}</pre>'.format(title, html.escape(record['error'])))
+        elif record['output'].endswith('.png'):
+            items.append('<h3>{}</h3><img src="{}">'.format(title, os.path.basename(record['output'])))
+        else:
+            items.append('<h3><a href="{}">{}</a></h3>'.format(os.path.basename(record['output']), title))
+    with open(os.path.join(file_dir, 'index.html'), 'w') as f:
+        f.write('<html><head><title>{0}</title></head><body><h1>{0}</h1>{1}</body></html>'.format(
+            html.escape(os.path.basename(path)), '\n'.join(items)))
+
+
+def _init_worker(max_memory):
+    import matplotlib
+    matplotlib.use('Agg')
+    if max_memory is not None:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (int(max_memory), int(max_memory)))
+
+
+def _export_in_process(path, output_dir, spec, fmt, dpi, max_memory) -> list:
+    """`export_file` in a new process, which is not reused for other files"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn'), initializer=_init_worker,
+                             initargs=(max_memory,)) as pool:
+        try:
+            return pool.submit(export_file, path, output_dir, spec, fmt, dpi).result()
+        except BrokenProcessPool:
+            error = 'worker crashed (out of memory?)'
+        except Exception:
+            error = traceback.format_exc()
+    return [dict(file=path, object=None, view=None, output=None, error=error, seconds=None)]
+
+
+def export(paths, output_dir, spec=None, fmt='html', n_workers=None, max_memory=None, dpi=100) -> list:
+    """Render the views of many NWB files in parallel
+
+    Parameters
+    ----------
+    paths: list of str
+    output_dir: str
+    spec: dict, optional
+        see `export_file`. Functions must be importable by the worker processes (module-level or dotted paths).
+    fmt: {'html', 'png'}
+    n_workers: int, optional
+        default is the number of CPUs
+    max_memory: float, optional
+        address space limit of each worker in bytes. A file that exceeds it is reported as failed. Unix only, other
+        platforms raise ValueError.
+    dpi: int, optional
+
+    Returns
+    -------
+    list of dict
+        records of `export_file` for all files. Files that could not be processed have a single record with
+        object None.
+    """
+    if max_memory is not None:
+        try:
+            import resource
+        except ImportError:
+            raise ValueError('max_memory is only supported on Unix')
+
+    # threads only wait for the processes, each of which renders one file
+    records = []
+    with ThreadPoolExecutor(max_workers=n_workers or os.cpu_count()) as threads:
+        futures = [threads.submit(_export_in_process, path, output_dir, spec, fmt, dpi, max_memory)
+                   for path in paths]
+        for future in as_completed(futures):
+            records.extend(future.result())
+    return records
+
+
+def parse_size(size: str) -> float:
+    """'4GB' -> 4e9"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kMGT]?)B?\s*', size, flags=re.IGNORECASE)
+    if match is None:
+        raise ValueError('invalid size: {}'.format(size))
+    return float(match.group(1)) * 1000 ** ' KMGT'.index((match.group(2) or ' ').upper())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render views of NWB files to static HTML or PNG files.')
+    parser.add_argument('paths', nargs='+', help='NWB files')
+    parser.add_argument('-o', '--output-dir', default='nwbwidgets_export')
+    parser.add_argument('--format', choices=('html', 'png'), default='html')
+    parser.add_argument('--types', nargs='+', help='only export these neurodata types, e.g. Units TimeSeries')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--max-memory', type=parse_size, default=None, help='memory limit per worker, e.g. 4GB')
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    spec = None if args.types is None else select_spec(args.types)
+    records = export(args.paths, args.output_dir, spec=spec, fmt=args.format, n_workers=args.workers,
+                     max_memory=args.max_memory, dpi=args.dpi)
+    failed = [record for record in records if record['error'] is not None]
+    print('{} views written to {}, {} failed'.format(len(records) - len(failed), args.output_dir, len(failed)))
+    for record in failed:
+        print('{} {} {}:\n{}'.format(record['file'], record['object'], record['view'], record['error']))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
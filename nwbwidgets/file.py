@@ -6,7 +6,8 @@ from ipywidgets import widgets
 from nwbwidgets import view
 from pynwb.file import NWBFile
 
-from .base import lazy_show_over_data
+from .base import lazy_show_over_data, field_label
+from .utils.content_index import get_content_index
 
 
 def show_nwbfile(nwbfile: NWBFile, neurodata_vis_spec: dict) -> widgets.Widget:
@@ -19,6 +20,8 @@ def show_nwbfile(nwbfile: NWBFile, neurodata_vis_spec: dict) -> widgets.Widget:
     info = []  # string data type, exposed as a Text widget
     neuro_data = []  # more complex data types, also with children
     labels = []
+    # for files read from disk, empty fields and labels come from the content index instead of the objects
+    index = get_content_index(nwbfile)
     for key, value in nwbfile.fields.items():
         if isinstance(value, (str, datetime)):
             lbl_key = widgets.Label(key + ':', layout=field_lay)
@@ -46,12 +49,15 @@ def show_nwbfile(nwbfile: NWBFile, neurodata_vis_spec: dict) -> widgets.Widget:
                 lbl_names = widgets.Label(value, layout=field_lay)
             hbox_exp = widgets.HBox(children=[lbl_experimenter, lbl_names])
             info.append(hbox_exp)
-        elif (isinstance(value, Iterable) and len(value)) or value:
-            neuro_data.append(value)
-            if hasattr(nwbfile.fields[key], 'description') and nwbfile.fields[key].description:
-                labels.append(key + ': ' + nwbfile.fields[key].description)
-            else:
-                labels.append(key)
+        else:
+            summary = None if index is None else index.summarize(value)
+            if summary is not None:
+                if summary['n_objects']:
+                    neuro_data.append(value)
+                    labels.append('{} ({})'.format(field_label(key, value), index.size_label(summary)))
+            elif (isinstance(value, Iterable) and len(value)) or value:
+                neuro_data.append(value)
+                labels.append(field_label(key, value))
     func_ = partial(view.nwb2widget, neurodata_vis_spec=neurodata_vis_spec)
     accordion = lazy_show_over_data(neuro_data, func_, labels=labels, style=widgets.Accordion)
 
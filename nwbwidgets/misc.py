@@ -1,3 +1,5 @@
+from functools import partial
+
 import matplotlib.pyplot as plt
 import numpy as np
 import plotly.graph_objects as go
@@ -9,13 +11,15 @@ from matplotlib.patches import Rectangle
 from pynwb.misc import AnnotationSeries, Units, DecompositionSeries
 
 from .analysis.spikes import compute_smoothed_firing_rate
-from .controllers import make_trial_event_controller, GroupAndSortController, StartAndDurationController, ProgressBar
+from .controllers import make_trial_event_controller, GroupAndSortController, StartAndDurationController, ProgressBar, \
+    RangeController
 from .utils.dynamictable import infer_categorical_columns
 from .utils.mpl import create_big_ax
-from .utils.plotly import event_group
+from .utils.plotly import event_group, as_typed_array, SegmentedTraces
+from .utils.prefetch import WindowPrefetcher, window_cache
 from .utils.units import get_spike_times, get_max_spike_time, get_min_spike_time, align_by_time_intervals, \
-    get_unobserved_intervals
-from .utils.widgets import interactive_output
+    get_unobserved_intervals, spike_times_request
+from .utils.widgets import interactive_output, update_scheduler
 
 color_wheel = plt.rcParams['axes.prop_cycle'].by_key()['color']
 
@@ -60,14 +64,15 @@ def show_session_raster(units: Units, time_window=None, units_window=None, show_
     if order is None:
         order = np.arange(len(units), dtype='int')
 
-    if progress_bar:
+    key, load = spike_times_request(units, order, time_window)
+    if progress_bar and key not in window_cache:
         this_iter = ProgressBar(order, desc='reading spike data', leave=False)
         progress_bar = this_iter.container
+        data = []
+        for unit in this_iter:
+            data.append(get_spike_times(units, unit, time_window))
     else:
-        this_iter = order
-    data = []
-    for unit in this_iter:
-        data.append(get_spike_times(units, unit, time_window))
+        data = window_cache.get(key, load)
 
     if show_obs_intervals:
         unobserved_intervals_list = get_unobserved_intervals(units, time_window, order)
@@ -82,6 +87,27 @@ def show_session_raster(units: Units, time_window=None, units_window=None, show_
     return ax
 
 
+def make_raster_prefetchers(units: Units, time_window_controller, gas: GroupAndSortController, request=None) -> list:
+    """Read the spike times that paging in time or through the units leads to in the background
+
+    Parameters
+    ----------
+    units: pynwb.misc.Units
+    time_window_controller: StartAndDurationController
+    gas: GroupAndSortController
+    request: callable, optional
+        (order, time_window) -> (key, load) or a list of them. Default is `spike_times_request` of the whole window.
+    """
+    if request is None:
+        request = partial(spike_times_request, units)
+    prefetchers = [WindowPrefetcher(
+        time_window_controller, lambda time_window: request(gas.value['order'], time_window))]
+    if isinstance(gas.range_controller, RangeController):
+        prefetchers.append(WindowPrefetcher(
+            gas.range_controller, lambda window: request(gas.window_order(window), time_window_controller.value)))
+    return prefetchers
+
+
 class RasterWidget(widgets.HBox):
     def __init__(self, units: Units,
                  foreign_time_window_controller: StartAndDurationController = None,
@@ -113,6 +139,7 @@ class RasterWidget(widgets.HBox):
         )
 
         out_fig = interactive_output(show_session_raster, self.controls)
+        self.prefetchers = make_raster_prefetchers(self.units, self.time_window_controller, self.gas)
 
         if foreign_time_window_controller:
             right_panel = widgets.VBox(
@@ -698,7 +725,15 @@ class RasterWidgetPlotly(widgets.HBox):
             self.fig.update_layout(margin=dict(l=20, r=20, t=30, b=20))
         else:
             self.fig = fig
-        show_session_raster_plotly(self.units, self.fig, self.time_window_controller.value, **self.gas.value)
+
+        # the spikes of each group are drawn in time segments, so that moving the time window adds and removes
+        # segments, and regrouping the same units restyles the traces that are drawn
+        self.segments = SegmentedTraces(self.fig, self.make_segment)
+        self.groups = None
+        self.rows = None
+        self.marker = None
+        self.legend_uids = []
+        self.update_fig(None)
 
         # set children
         if foreign_time_window_controller:
@@ -729,19 +764,102 @@ class RasterWidgetPlotly(widgets.HBox):
 
         self.layout = Layout(width="100%")
 
-        self.time_window_controller.observe(self.update_fig, 'value')
-        self.gas.observe(self.update_fig, 'value')
+        self.time_window_controller.observe(self.request_update, 'value')
+        self.gas.observe(self.request_update, 'value')
         self.show_legend_cb.observe(self.toggle_legend, 'value')
+        self.prefetchers = make_raster_prefetchers(self.units, self.time_window_controller, self.gas,
+                                                   self.segment_requests)
 
     def toggle_legend(self, change):
         self.fig.update_layout(showlegend=self.show_legend_cb.value)
 
+    def request_update(self, change):
+        update_scheduler.request(self, partial(self.update_fig, change))
+
     def update_fig(self, change):
+        self.show_groups(**self.gas.value)
         time_window = self.time_window_controller.value
-        gas_kwargs = self.gas.value
-        with self.fig.batch_update():
-            self.fig.data = None
-            show_session_raster_plotly(self.units, self.fig, time_window, **gas_kwargs)
+        self.segments.show(*time_window)
+        self.fig.update_layout(xaxis=dict(range=list(time_window)))
+
+    def segment_requests(self, order, time_window) -> list:
+        """Spike time requests of the segments that a window of units is drawn with, for prefetching"""
+        shown = np.sort(order)
+        return [spike_times_request(self.units, shown, window) for window in self.segments.windows(*time_window)]
+
+    def group_style(self, group) -> dict:
+        color = group['color']
+        return dict(name=group['label'], legendgroup=str(group['label']),
+                    marker=dict(color=color, line_color=color, **self.marker))
+
+    def show_groups(self, order=None, group_inds=None, labels=None, **kwargs):
+        """Lay out units in rows, grouped as `show_session_raster_plotly` does
+
+        If the groups hold the same units as before, the traces that are drawn are restyled and their rows moved;
+        otherwise they are drawn again.
+        """
+        if order is None:
+            order = np.arange(len(self.units), dtype='int')
+        order = np.asarray(order)
+        if group_inds is None:
+            groups = [dict(units=order, label=None, color='Black')]
+        else:
+            group_inds = np.asarray(group_inds)
+            groups = [dict(units=order[group_inds == ui], label=labels[ui], color=color_wheel[ui % len(color_wheel)])
+                      for ui in np.unique(group_inds)]
+        rows = np.zeros(len(self.units), dtype=np.float32)
+        rows[np.concatenate([group['units'] for group in groups])] = np.arange(len(order))
+
+        same_units = self.groups is not None and len(groups) == len(self.groups) and all(
+            np.array_equal(np.sort(new['units']), np.sort(old['units'])) for new, old in zip(groups, self.groups))
+        old_rows = self.rows
+        self.groups = groups
+        self.rows = rows
+        if len(order) <= 100:
+            self.marker = dict(symbol='line-ns', line_width=2)
+        else:
+            self.marker = dict(symbol='circle', line_width=1)
+
+        if same_units:
+            with self.fig.batch_update():
+                for trace, (igroup, unit_ids) in self.segments.drawn():
+                    trace.update(**self.group_style(groups[igroup]))
+                    if not np.array_equal(rows[unit_ids], old_rows[unit_ids]):
+                        trace.y = rows[unit_ids]
+                legend = {trace.uid: trace for trace in self.fig.data}
+                for uid, group in zip(self.legend_uids, [group for group in groups if group['label'] is not None]):
+                    legend[uid].update(**self.group_style(group))
+        else:
+            self.fig.data = [trace for trace in self.fig.data if trace.uid not in self.legend_uids]
+            self.segments.redraw()
+            legend_traces = [go.Scatter(x=[], y=[], mode='markers', showlegend=True, **self.group_style(group))
+                             for group in groups if group['label'] is not None]
+            n_before = len(self.fig.data)
+            self.fig.add_traces(legend_traces)
+            self.legend_uids = [trace.uid for trace in self.fig.data[n_before:]]
+
+        self.fig.update_yaxes(tickvals=[], ticktext=[])
+        if len(order) <= 40:
+            self.fig.update_yaxes(tickvals=np.arange(len(order)), ticktext=[str(i) for i in order])
+        self.fig.update_layout(
+            title='units',
+            xaxis_title="time (s)",
+            legend=dict(x=1., y=0, traceorder='reversed'),
+            yaxis=dict(range=[-.5, len(order) + .5]))
+
+    def make_segment(self, start, stop) -> list:
+        shown = np.sort(np.concatenate([group['units'] for group in self.groups]))
+        spikes = window_cache.get(*spike_times_request(self.units, shown, [start, stop]))
+        traces = []
+        for igroup, group in enumerate(self.groups):
+            group_spikes = [spikes[i] for i in np.searchsorted(shown, group['units'])]
+            if not sum(len(unit_spikes) for unit_spikes in group_spikes):
+                continue
+            unit_ids = np.repeat(group['units'], [len(unit_spikes) for unit_spikes in group_spikes])
+            trace = go.Scatter(x=as_typed_array(np.concatenate(group_spikes)), y=self.rows[unit_ids],
+                               mode='markers', showlegend=False, **self.group_style(group))
+            traces.append((trace, (igroup, unit_ids)))
+        return traces
 
 
 def show_session_raster_plotly(units: Units, fig, time_window=None, order=None, progress_bar=None, **kwargs):
@@ -772,14 +890,15 @@ def show_session_raster_plotly(units: Units, fig, time_window=None, order=None,
     if order is None:
         order = np.arange(len(units), dtype='int')
 
-    if progress_bar:
+    key, load = spike_times_request(units, order, time_window)
+    if progress_bar and key not in window_cache:
         this_iter = ProgressBar(order, desc='reading spike data', leave=False)
         progress_bar = this_iter.container
+        data = []
+        for unit in this_iter:
+            data.append(get_spike_times(units, unit, time_window))
     else:
-        this_iter = order
-    data = []
-    for unit in this_iter:
-        data.append(get_spike_times(units, unit, time_window))
+        data = window_cache.get(key, load)
 
     # if show_obs_intervals:
     #    unobserved_intervals_list = get_unobserved_intervals(units, time_window, order)
@@ -8,11 +8,11 @@ from pynwb.ophys import RoiResponseSeries, DfOverF, PlaneSegmentation, TwoPhoton
 from skimage import measure
 from tifffile import imread, TiffFile
 
+from .base import nwb2widget
 from .timeseries import BaseGroupedTraceWidget
 from .utils.cmaps import linear_transfer_function
-from .utils.dynamictable import infer_categorical_columns
+from .utils.dynamictable import infer_categorical_columns, dynamic_table_hover_text
 from .utils.functional import MemoizeMutable
-from .base import df_to_hover_text
 
 color_wheel = ['red', 'blue', 'green', 'black', 'magenta', 'yellow']
 
@@ -77,8 +77,10 @@ class TwoPhotonSeriesWidget(widgets.VBox):
 
 def show_df_over_f(df_over_f: DfOverF, neurodata_vis_spec: dict):
     if len(df_over_f.roi_response_series) == 1:
-        title, input = list(df_over_f.roi_response_series.items())[0]
-        return neurodata_vis_spec[RoiResponseSeries](input, neurodata_vis_spec, title=title)
+        # the series is shown with its own spec (tabs of traces and a trial average), which has no title. The name
+        # that was passed as `title` before was never shown: BaseGroupedTraceWidget ignores extra kwargs.
+        input = list(df_over_f.roi_response_series.values())[0]
+        return nwb2widget(input, neurodata_vis_spec)
     else:
         return neurodata_vis_spec[NWBDataInterface](df_over_f, neurodata_vis_spec)
 
@@ -143,22 +145,22 @@ def show_plane_segmentation_2d(plane_seg: PlaneSegmentation, color_wheel=color_w
         layout_kwargs.update(title=color_by)
 
     data = plane_seg['image_mask'].data
-    nUnits = data.shape[0]
+    nUnits = len(data)
     if fig is None:
         fig = go.FigureWidget()
 
     aux_leg = []
-    all_hover = df_to_hover_text(plane_seg.to_dataframe())
+    all_hover = dynamic_table_hover_text(plane_seg)
 
     for i in range(nUnits):
-        if plane_seg[color_by][i] not in aux_leg:
-            show_leg = True
-            aux_leg.append(plane_seg[color_by][i])
-        else:
-            show_leg = False
         kwargs = dict()
 
         if color_by:
+            if plane_seg[color_by][i] not in aux_leg:
+                show_leg = True
+                aux_leg.append(plane_seg[color_by][i])
+            else:
+                show_leg = False
             c = color_wheel[np.where(cats == plane_seg[color_by][i])[0][0]]
             kwargs.update(line_color=c,
                           name=str(plane_seg[color_by][i]),
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+from dateutil.tz import tzlocal
+from pynwb import NWBFile, NWBHDF5IO
+
+
+@pytest.fixture
+def new_nwbfile():
+    """Factory of empty NWBFiles, to which each test adds the containers it needs"""
+    def new(identifier='NWBTEST'):
+        return NWBFile(session_description='session', identifier=identifier,
+                       session_start_time=datetime(2020, 1, 1, tzinfo=tzlocal()))
+
+    return new
+
+
+@pytest.fixture
+def write_nwbfile(tmp_path):
+    """Write an NWBFile to a file in tmp_path and return its path"""
+    def write(nwbfile, name='session.nwb'):
+        path = str(tmp_path / name)
+        with NWBHDF5IO(path, 'w') as io:
+            io.write(nwbfile)
+        return path
+
+    return write
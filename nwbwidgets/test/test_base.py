@@ -1,6 +1,9 @@
+import threading
 import unittest
+from concurrent.futures import wait
 from datetime import datetime
 
+import h5py
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -8,7 +11,8 @@ import pytest
 from dateutil.tz import tzlocal
 from ipywidgets import widgets
 from nwbwidgets.base import show_neurodata_base, processing_module, nwb2widget, show_text_fields, \
-    fig2widget, vis2widget, show_fields, df2accordion, lazy_show_over_data
+    fig2widget, vis2widget, show_fields, df2accordion, lazy_show_over_data, lazy_tabs, PrefetchPolicy, dict2accordion, \
+    PagedAccordion, DynamicTableViewer, DatasetViewer, show_dset, is_placeholder
 from nwbwidgets.view import default_neurodata_vis_spec
 from nwbwidgets.view import show_dynamic_table
 from pynwb import NWBFile
@@ -150,3 +154,179 @@ def test_lazy_show_over_data():
         return fig
 
     assert isinstance(lazy_show_over_data(list_=list_, func_=func_fig), widgets.Widget)
+
+
+def test_lazy_show_over_data_background():
+    list_ = [1, 2, 3]
+    release = threading.Event()
+
+    def func_widget(data):
+        release.wait(5)
+        return widgets.Label(str(data))
+
+    tab = lazy_show_over_data(list_=list_, func_=func_widget)
+    assert is_placeholder(tab.children[0])  # while the first tab is built
+    futures = [tab.lazy_children.pending[0]]
+    tab.selected_index = 1
+    futures.append(tab.lazy_children.pending[1])
+    tab.selected_index = 2
+    futures.append(tab.lazy_children.pending[2])
+    release.set()
+    wait(futures, timeout=5)
+
+    assert tab.children[2].value == '3'
+    if futures[1].cancelled():  # before a worker started it
+        assert is_placeholder(tab.children[1])
+    else:
+        assert tab.children[1].value == '2'
+
+
+def test_html_child_is_not_rebuilt():
+    calls = []
+
+    def func_html(data):
+        calls.append(data)
+        return widgets.HTML(str(data))
+
+    tab = lazy_show_over_data(list_=[1, 2], func_=func_html)
+    wait_for_renders(tab)
+    tab.selected_index = 1
+    wait_for_renders(tab)
+    tab.selected_index = 0
+    wait_for_renders(tab)
+    assert calls == [1, 2]
+
+
+def test_lazy_tabs_error():
+    def func_error(node):
+        raise RuntimeError('broken visualization')
+
+    tab = lazy_tabs(dict(error=func_error), None)
+    wait(list(tab.lazy_children.pending.values()), timeout=5)
+    assert 'broken visualization' in tab.children[0].value
+
+
+def wait_for_renders(grouping):
+    while grouping.lazy_children.pending:
+        wait(list(grouping.lazy_children.pending.values()), timeout=5)
+
+
+class TestPrefetch:
+    def test_prefetch_adjacent(self):
+        tab = lazy_show_over_data(list_=[0, 1, 2, 3, 4], func_=lambda x: widgets.Label(str(x)),
+                                  prefetch=PrefetchPolicy(n_adjacent=1))
+        wait_for_renders(tab)
+        assert list(tab.lazy_children.prefetched) == [1]
+        assert isinstance(tab.children[1], widgets.HTML)  # prefetched children are not shown until selected
+
+        tab.selected_index = 1
+        assert tab.children[1].value == '1'
+        wait_for_renders(tab)
+        assert sorted(tab.lazy_children.prefetched) == [2]
+
+        tab.selected_index = 4  # prefetched children that are no longer adjacent are discarded
+        wait_for_renders(tab)
+        assert sorted(tab.lazy_children.prefetched) == [3]
+
+    def test_prefetch_memory_ceiling(self):
+        tab = lazy_show_over_data(list_=[0, 1, 2], func_=lambda x: widgets.HTML('x' * 1000),
+                                  prefetch=PrefetchPolicy(n_adjacent=2, max_bytes=500))
+        wait_for_renders(tab)
+        assert not tab.lazy_children.prefetched
+
+    def test_prefetch_rank(self):
+        tab = lazy_show_over_data(list_=[0, 1, 2, 3], func_=lambda x: widgets.Label(str(x)),
+                                  prefetch=PrefetchPolicy(rank=lambda index, n: [n - 1]))
+        wait_for_renders(tab)
+        assert list(tab.lazy_children.prefetched) == [3]
+
+
+def test_paged_accordion():
+    d = {'ts{}'.format(i): TimeSeries(name='ts{}'.format(i), data=[1., 2.], unit='m', rate=1.) for i in range(120)}
+    d['position'] = Position(name='position')
+    accordion = dict2accordion(d, default_neurodata_vis_spec)
+    assert isinstance(accordion, PagedAccordion)
+    assert len(accordion.accordion.children) == 50
+    assert accordion.pager.label.value == '1-50 of 121'
+
+    accordion.pager.next_button.click()
+    accordion.pager.next_button.click()
+    assert accordion.accordion.get_title(0) == 'ts100'
+    assert len(accordion.accordion.children) == 21
+    assert accordion.pager.next_button.disabled
+
+    accordion.search.value = 'ts11'
+    assert accordion.pager.value == 0
+    assert accordion.pager.label.value == '1-11 of 11'
+    accordion.search.value = 'POSITION'
+    accordion.accordion.selected_index = 0
+    wait_for_renders(accordion.accordion)
+    assert not isinstance(accordion.accordion.children[0], widgets.HTML)
+    accordion.search.value = 'nothing'
+    assert accordion.pager.label.value == 'no matches'
+
+
+class TestDynamicTableViewer:
+    def setup_method(self):
+        nwbfile = NWBFile(session_description='session', identifier='NWBDT',
+                          session_start_time=datetime(2020, 1, 1, tzinfo=tzlocal()))
+        nwbfile.add_unit_column('quality', 'sorting quality')
+        for i in range(120):
+            nwbfile.add_unit(spike_times=np.arange(i % 7 + 1.), waveform_mean=np.ones((3, 2)), quality=float(i % 10))
+        self.units = nwbfile.units
+
+    def test_page(self):
+        viewer = DynamicTableViewer(self.units)
+        assert viewer.pager.label.value == '1-50 of 120'
+        assert viewer.table_html.value.count('<tr>') == 51
+        assert '[7 x float64]' in viewer.table_html.value
+        assert '[3 x 2 float64]' in viewer.table_html.value
+        assert list(viewer.sort_by.options) == ['(row order)', 'quality']
+
+    def test_sort(self):
+        viewer = DynamicTableViewer(self.units, page_size=10)
+        viewer.pager.value = 2
+        viewer.sort_by.value = 'quality'
+        viewer.descending.value = True
+        assert viewer.pager.value == 0
+        assert (np.asarray(self.units['quality'].data)[viewer.order[:10]] == 9.).all()
+        assert viewer.table_html.value.count('<td>9.0</td>') == 10
+
+    def test_expand(self):
+        viewer = DynamicTableViewer(self.units)
+        viewer.expand_row.value = 3
+        viewer.expand_button.click()
+        assert '[0. 1. 2. 3.]' in viewer.expanded.value
+
+
+class TestDatasetViewer:
+    def test_1d(self, tmp_path):
+        with h5py.File(str(tmp_path / 'dset.h5'), 'w') as f:
+            dset = f.create_dataset('data', data=np.arange(1000000))
+            viewer = show_dset(dset).children[1]
+            assert viewer.table_html.value.count('<tr>') == 20
+            viewer.row_start.value = 500000
+            assert '<td>500019</td>' in viewer.table_html.value
+            viewer.prefetching.result()
+            assert ((500020, 500040),) in viewer.windows
+
+    def test_2d(self):
+        viewer = DatasetViewer(np.arange(100).reshape(10, 10), n_rows=3, n_cols=3)
+        assert '<td>11</td>' in viewer.table_html.value
+        assert '<td>9</td>' not in viewer.table_html.value  # not the diagonal only, and only the window
+
+    def test_nd(self):
+        data = np.arange(24).reshape(2, 3, 4)
+        viewer = DatasetViewer(data)
+        viewer.indices[2].value = 3
+        viewer.col_axis.value = 2  # now shows data[:, 0, :]
+        assert viewer.indices[1].layout.display is None
+        assert viewer.indices[2].layout.display == 'none'
+        viewer.row_axis.value = 2  # swaps the axes, shows data[:, 0, :].T
+        assert viewer.col_axis.value == 0
+        assert '<td>12</td>' in viewer.table_html.value
+        viewer.indices[1].value = 2
+        assert '<td>23</td>' in viewer.table_html.value
+
+    def test_scalar(self):
+        assert DatasetViewer(np.array(5.)).table_html.value == '<pre>5.0</pre>'
@@ -0,0 +1,114 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from nwbwidgets.export import export, export_file, select_spec, parse_size, main, default_export_spec, get_figure, \
+    save_figure
+from nwbwidgets.utils.vis_spec import VisSpecRegistry, import_object
+from pynwb import NWBHDF5IO, TimeSeries
+from pynwb.base import Images
+from pynwb.behavior import SpatialSeries
+from pynwb.image import GrayscaleImage, RGBImage, RGBAImage
+from pynwb.ophys import ImageSegmentation, OpticalChannel
+
+
+@pytest.fixture
+def nwbfile_path(new_nwbfile, write_nwbfile):
+    nwbfile = new_nwbfile('NWBEX')
+    nwbfile.add_acquisition(TimeSeries(name='raw', data=np.random.rand(1000, 4), unit='V', rate=100.))
+    nwbfile.add_acquisition(TimeSeries(name='speed', data=np.random.rand(1000), unit='m/s', rate=100.))
+    nwbfile.add_acquisition(TimeSeries(name='frames', data=np.random.rand(3, 4, 4), unit='a.u.', rate=1.))
+    module = nwbfile.create_processing_module(name='behavior', description='behavior')
+    module.add(SpatialSeries(name='position', data=np.random.rand(100, 2), reference_frame='origin', rate=10.))
+    nwbfile.add_acquisition(Images(name='images', images=[
+        GrayscaleImage(name='gray', data=np.random.rand(5, 5)),
+        RGBImage(name='rgb', data=np.random.rand(5, 5, 3)),
+        RGBAImage(name='rgba', data=np.random.rand(5, 5, 4))]))
+    return write_nwbfile(nwbfile, 'session.nwb')
+
+
+@pytest.fixture
+def tables_nwbfile(new_nwbfile):
+    """In memory, since DynamicTables cannot be written with the h5py of some environments"""
+    nwbfile = new_nwbfile('NWBEX')
+    for i in range(3):
+        nwbfile.add_unit(spike_times=np.sort(np.random.rand(50)) * 10.)
+    for start in range(5):
+        nwbfile.add_trial(start_time=float(start), stop_time=start + .5)
+
+    device = nwbfile.create_device('microscope')
+    imaging_plane = nwbfile.create_imaging_plane(
+        name='plane', optical_channel=OpticalChannel('channel', 'channel', 500.), description='plane', device=device,
+        excitation_lambda=600., imaging_rate=30., indicator='GFP', location='V1')
+    ophys = nwbfile.create_processing_module(name='ophys', description='ophys')
+    plane_segmentation = ImageSegmentation().create_plane_segmentation('rois', imaging_plane, 'rois')
+    ophys.add(plane_segmentation.parent)
+    for i in range(2):
+        image_mask = np.zeros((5, 5))
+        image_mask[i:i + 2, i:i + 2] = 1.
+        plane_segmentation.add_roi(image_mask=image_mask)
+    return nwbfile
+
+
+def test_export_file(nwbfile_path, tmp_path):
+    output_dir = str(tmp_path / 'out')
+    records = export_file(nwbfile_path, output_dir, fmt='png')
+    assert sorted((record['object'], record['view']) for record in records) == [
+        ('behavior/position', 'show_spatial_series'),
+        ('images/gray', 'show_grayscale_image'),
+        ('images/rgb', 'show_rbga_image'),
+        ('images/rgba', 'show_rbga_image'),
+        ('raw', 'plot_timeseries_overview'),
+        ('speed', 'plot_timeseries_overview')]
+    assert all(record['error'] is None for record in records)
+    assert all(os.path.exists(record['output']) for record in records)
+    assert os.path.exists(os.path.join(output_dir, 'session', 'index.html'))
+
+
+@pytest.mark.parametrize('type_name', sorted(default_export_spec))
+def test_export_views(nwbfile_path, tables_nwbfile, tmp_path, type_name):
+    """Every view of the default spec renders a figure that can be saved"""
+    registry = VisSpecRegistry(default_export_spec)
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        containers = list(io.read().objects.values()) + list(tables_nwbfile.objects.values())
+        neurodata_type = import_object(type_name)
+        containers = [container for container in containers if type(container) is neurodata_type]
+        assert containers
+        view_spec = registry[neurodata_type]
+        views = view_spec.items() if isinstance(view_spec, dict) else [(view_spec.__name__, view_spec)]
+        for label, func in views:
+            fig = get_figure(func(containers[0]))
+            assert fig is not None
+            assert os.path.exists(save_figure(fig, str(tmp_path / label)))
+
+
+def test_export_pool(nwbfile_path, tmp_path):
+    missing = str(tmp_path / 'missing.nwb')
+    records = export([nwbfile_path, missing], str(tmp_path / 'out'), spec=select_spec(['SpatialSeries']),
+                     n_workers=2)
+    by_file = {record['file']: record for record in records}
+    assert by_file[nwbfile_path]['output'].endswith('position.show_spatial_series.html')
+    assert by_file[missing]['error'] is not None
+
+
+def test_export_max_memory_without_resource(nwbfile_path, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    with pytest.raises(ValueError):
+        export([nwbfile_path], str(tmp_path / 'out'), max_memory=4e9)
+
+
+def test_select_spec():
+    assert list(select_spec(['Units', 'pynwb.TimeSeries'])) == ['pynwb.TimeSeries', 'pynwb.misc.Units']
+    with pytest.raises(ValueError):
+        select_spec(['NotAType'])
+
+
+def test_parse_size():
+    assert parse_size('4GB') == 4e9
+    assert parse_size('512 mb') == 512e6
+    assert parse_size('1000') == 1000
+
+
+def test_main(nwbfile_path, tmp_path):
+    assert main([nwbfile_path, '-o', str(tmp_path / 'out'), '--types', 'SpatialSeries', '--workers', '1']) == 0
@@ -6,7 +6,7 @@ import numpy as np
 from dateutil.tz import tzlocal
 from ipywidgets import widgets
 from nwbwidgets.misc import show_psth_raster, PSTHWidget, show_decomposition_traces, show_decomposition_series, \
-    RasterWidget, \
+    RasterWidget, RasterWidgetPlotly, \
     show_session_raster, show_annotations, RasterGridWidget, raster_grid
 from pynwb import NWBFile
 from pynwb.misc import DecompositionSeries, AnnotationSeries
@@ -59,6 +59,21 @@ class ShowPSTHTestCase(unittest.TestCase):
     def test_raster_widget(self):
         assert isinstance(RasterWidget(self.nwbfile.units), widgets.Widget)
 
+    def test_raster_widget_plotly(self):
+        widget = RasterWidgetPlotly(self.nwbfile.units)
+        widget.time_window_controller.value = (20, 25)
+        assert sorted(np.concatenate([trace.x for trace in widget.fig.data])) == [25., 26.]  # whole segments
+        x = widget.fig.data[0].x
+
+        # regrouping the same units restyles the drawn traces
+        widget.gas.value = dict(order=np.array([2, 1, 0]), group_inds=None, labels=None)
+        assert widget.fig.data[0].x is x
+        assert list(widget.fig.data[0].y) == [1., 1.]
+
+        widget.gas.value = dict(order=np.array([0, 1, 2]), group_inds=np.array([0, 1, 0]),
+                                labels=np.array(['CA1', 'CA3']))
+        assert [trace.name for trace in widget.fig.data] == ['CA3', 'CA1', 'CA3']
+
     def test_show_session_raster(self):
         assert isinstance(show_session_raster(self.nwbfile.units), plt.Axes)
 
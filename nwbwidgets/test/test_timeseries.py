@@ -2,10 +2,13 @@ import unittest
 
 import matplotlib.pyplot as plt
 import numpy as np
+import plotly.graph_objects as go
 from ipywidgets import widgets
 from nwbwidgets.timeseries import (BaseGroupedTraceWidget, show_ts_fields, show_timeseries, plot_traces,
-                                   show_indexed_timeseries_mpl)
+                                   show_indexed_timeseries_mpl, plot_grouped_traces_plotly,
+                                   SeparateTracesPlotlyWidget, TrialAverageWidget, plot_trial_average)
 from pynwb import TimeSeries
+from pynwb.epoch import TimeIntervals
 
 
 def test_timeseries_widget():
@@ -46,3 +49,74 @@ class PlotTracesTestCase(unittest.TestCase):
     def test_plot_traces_fix(self):
         ts = TimeSeries(name='test_timeseries', data=self.data.T, unit='m', starting_time=0.0, rate=20.0)
         plot_traces(ts)
+
+        # time on the second axis
+        ts = TimeSeries(name='test_timeseries', data=self.data.T, unit='m', timestamps=np.arange(160) / 20.,
+                        conversion=2.)
+        fig = plot_traces(ts, trace_window=[0, 3])
+        np.testing.assert_allclose(fig.axes[0].lines[0].get_ydata(), self.data[:, 0] * 2., rtol=1e-6)
+
+
+def test_plot_grouped_traces_plotly_single_trace():
+    ts = TimeSeries(name='ts', data=np.random.rand(1000, 100), unit='V', rate=100.)
+    group_inds = np.arange(100) % 2
+    fig = plot_grouped_traces_plotly(ts, [0, 5], np.arange(100), group_inds=group_inds, labels=np.array(['a', 'b']))
+    assert len(fig.data) == 2
+    assert all(isinstance(trace, go.Scattergl) for trace in fig.data)
+    assert [trace.name for trace in fig.data] == ['b', 'a']
+    assert np.isnan(fig.data[0].y).sum() == 49
+
+    fig = plot_grouped_traces_plotly(ts, [0, 5], np.arange(10))
+    assert len(fig.data) == 10
+
+
+def test_separate_traces_plotly_shift():
+    ts = TimeSeries(name='ts', data=np.random.rand(100000, 3), unit='m', rate=1000.)
+    widget = SeparateTracesPlotlyWidget(ts)
+    uids = {trace.uid for trace in widget.out_fig.data}
+    widget.time_window_controller.value = (1.5, 6.5)
+    new = [trace for trace in widget.out_fig.data if trace.uid not in uids]
+    assert len(new) == 3  # one segment of each column
+    assert widget.out_fig.layout.xaxis.range == (1.5, 6.5)
+    np.testing.assert_allclose(new[0].y, ts.data[6144:8193, 0])
+
+
+def test_separate_traces_plotly_end():
+    ts = TimeSeries(name='ts', data=np.random.rand(10000, 3), unit='m', rate=1000.)
+    widget = SeparateTracesPlotlyWidget(ts)
+    widget.time_window_controller.value = (8.5, 10.)
+    assert widget.out_fig.data
+    for trace in widget.out_fig.data:
+        assert len(trace.x) == len(trace.y)
+        assert trace.x[-1] <= 9.999
+    assert max(trace.x[-1] for trace in widget.out_fig.data) == 9.999
+
+
+def test_trial_average(monkeypatch):
+    figures = []
+
+    def record_plot_trial_average(**kwargs):
+        figures.append(plot_trial_average(**kwargs))
+
+    monkeypatch.setattr('nwbwidgets.timeseries.plot_trial_average', record_plot_trial_average)
+    ts = TimeSeries(name='ts', data=np.random.rand(10000, 3), unit='V', rate=100.)
+    trials = TimeIntervals(name='trials')
+    trials.add_column(name='stim', description='stimulus')
+    for i in range(40):
+        trials.add_interval(start_time=i * 2., stop_time=i * 2. + 1., stim='ab'[i % 2])
+
+    widget = TrialAverageWidget(ts, trials)
+    widget.gas.group_dd.value = 'stim'
+    lines = figures[-1].axes[1].lines
+    assert [line.get_label() for line in lines[:2]] == ['a', 'b']
+    # the event is the 50th sample of the window of .5 s before and 1 s after it
+    np.testing.assert_allclose(lines[0].get_ydata()[50], ts.data[::400, 0][:20].mean())
+    np.testing.assert_allclose(lines[1].get_ydata()[50], ts.data[200::400, 0][:20].mean())
+
+    widget.controls['channel'].value = 2
+    lines = figures[-1].axes[1].lines
+    np.testing.assert_allclose(lines[1].get_ydata()[50], ts.data[200::400, 2][:20].mean())
+
+    fig = plot_trial_average(ts, trials, channel=1, before=.2, after=.5, order=np.arange(0, 40, 2),
+                             group_inds=np.zeros(20, dtype=int), labels=['a'])
+    np.testing.assert_allclose(fig.axes[1].lines[0].get_ydata()[20], ts.data[::400, 1][:20].mean())
@@ -0,0 +1,41 @@
+import numpy as np
+from nwbwidgets.timeseries import _prep_timeseries
+from nwbwidgets.utils import channel_stats
+from nwbwidgets.utils.channel_stats import compute_channel_stats, get_channel_stats
+from pynwb import TimeSeries
+
+
+def make_timeseries():
+    data = np.random.RandomState(0).randn(50_000, 3) * [1., 10., 100.] + [0., 5., -5.]
+    data[100:200, 0] = np.nan
+    return TimeSeries(name='ts', data=data, unit='V', rate=1000., conversion=2.)
+
+
+def test_compute_channel_stats(monkeypatch):
+    monkeypatch.setattr(channel_stats, 'block_bytes', 24 * 999)
+    ts = make_timeseries()
+    data = ts.data * 2.
+    stats = compute_channel_stats(ts)
+    assert stats.complete
+    np.testing.assert_array_equal(stats.count, [49_900, 50_000, 50_000])
+    np.testing.assert_allclose(stats.mean, np.nanmean(data, axis=0))
+    np.testing.assert_allclose(stats.std, np.nanstd(data, axis=0))
+    np.testing.assert_allclose(stats.min, np.nanmin(data, axis=0))
+    np.testing.assert_allclose(stats.max, np.nanmax(data, axis=0))
+    assert np.all(np.abs(stats.quantile(.5) - np.nanmedian(data, axis=0)) < .1 * np.nanstd(data, axis=0))
+
+
+def test_get_channel_stats_background():
+    ts = make_timeseries()
+    stats = get_channel_stats(ts, background=True)
+    stats.future.result()
+    assert stats.complete
+    assert get_channel_stats(ts) is stats
+
+
+def test_stable_offsets():
+    ts = make_timeseries()
+    _, _, offsets = _prep_timeseries(ts, [0., 1.], [0, 1, 2])
+    _, _, other_offsets = _prep_timeseries(ts, [20., 20.1], [0, 1, 2])
+    np.testing.assert_array_equal(offsets, other_offsets)
+    np.testing.assert_allclose(offsets[1], np.median(np.nanstd(ts.data, axis=0)) * 2 * 20, rtol=1e-6)
@@ -0,0 +1,80 @@
+import h5py
+import numpy as np
+import pytest
+from hdmf.backends.hdf5 import H5DataIO
+from nwbwidgets.base import show_neurodata_base
+from nwbwidgets.file import show_nwbfile
+from nwbwidgets.utils.content_index import get_content_index, format_bytes
+from nwbwidgets.utils.io_accounting import IOAccounting
+from nwbwidgets.view import default_neurodata_vis_spec
+from pynwb import NWBHDF5IO, TimeSeries
+
+
+@pytest.fixture
+def nwbfile_path(new_nwbfile, write_nwbfile):
+    nwbfile = new_nwbfile('NWBCI')
+    nwbfile.add_acquisition(TimeSeries(name='raw', data=H5DataIO(np.zeros((1000, 4)), chunks=(100, 4),
+                                                                 compression='gzip'), unit='V', rate=10.))
+    nwbfile.add_acquisition(TimeSeries(name='speed', data=np.arange(100.), unit='m/s', rate=10.,
+                                       description='running speed'))
+    return write_nwbfile(nwbfile, 'content_index.nwb')
+
+
+def test_content_index(nwbfile_path):
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        index = get_content_index(nwbfile)
+        assert get_content_index(nwbfile.acquisition['raw']) is index
+
+        raw = index.table.loc['/acquisition/raw/data']
+        assert raw['shape'] == (1000, 4)
+        assert raw['dtype'] == 'float64'
+        assert raw['chunks'] == (100, 4)
+        assert raw['compression'] == 'gzip'
+        assert 0 < raw['storage_size'] < 32000  # compressed
+
+        assert index.path_of(nwbfile.acquisition['speed']) == '/acquisition/speed'
+        assert list(index.children('/acquisition').index) == ['/acquisition/raw', '/acquisition/speed']
+        summary = index.summarize(nwbfile.acquisition)
+        assert summary['n_objects'] == 2
+        assert summary['total_size'] == index.table.loc['/acquisition', 'total_size']
+        assert index.summarize(nwbfile.processing)['n_objects'] == 0
+        assert index.size_label(index.summarize(nwbfile.acquisition['speed'])) == '808 B'
+        assert index.size_label(summary).startswith('2 objects, ')
+
+
+def test_show_nwbfile_does_not_read_data(nwbfile_path):
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        accounting = IOAccounting().track(nwbfile)
+        widget = show_nwbfile(nwbfile, default_neurodata_vis_spec)
+        accordion = widget.children[-1]
+        assert accordion.get_title(0).startswith('acquisition (2 objects, ')
+        show_neurodata_base(nwbfile.acquisition['speed'], default_neurodata_vis_spec)
+        assert accounting.totals['reads'] == 0
+        accounting.untrack()
+
+
+def test_reuses_open_file(nwbfile_path, monkeypatch):
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        opened = []
+        init = h5py.File.__init__
+
+        def record_open(self, name, *args, **kwargs):
+            if isinstance(name, str):
+                opened.append(name)
+            init(self, name, *args, **kwargs)
+
+        monkeypatch.setattr(h5py.File, '__init__', record_open)
+        assert get_content_index(nwbfile) is not None
+        assert not opened
+
+
+def test_in_memory_file(new_nwbfile):
+    assert get_content_index(new_nwbfile()) is None
+
+
+def test_format_bytes():
+    assert format_bytes(808) == '808 B'
+    assert format_bytes(3.2e9) == '3.2 GB'
@@ -1,6 +1,8 @@
+import h5py
 import numpy as np
-from hdmf.common.table import VectorData
-from nwbwidgets.utils.dynamictable import infer_categorical_columns
+from hdmf.common.table import VectorData, VectorIndex
+from nwbwidgets.utils.dynamictable import infer_categorical_columns, take_rows, ragged_lengths, read_rows, \
+    column_kind, sort_rows, format_hover_column, dynamic_table_hover_text
 from nwbwidgets.utils.testing import dicts_exact_equal
 from pynwb.core import DynamicTable
 
@@ -18,3 +20,69 @@ def test_infer_categorical_columns():
 
     assert dicts_exact_equal(infer_categorical_columns(dynamic_table), {'Data1': np.array([1, 2, 3]),
                                                                         'Data2': np.array([2, 3, 4])})
+
+
+def test_take_rows(tmp_path):
+    with h5py.File(str(tmp_path / 'take_rows.h5'), 'w') as f:
+        dataset = f.create_dataset('data', data=np.arange(10) * 10)
+        np.testing.assert_array_equal(take_rows(dataset, [2, 3, 4]), [20, 30, 40])
+        np.testing.assert_array_equal(take_rows(dataset, [7, 1, 4]), [70, 10, 40])
+        assert len(take_rows(dataset, [])) == 0
+    np.testing.assert_array_equal(take_rows(['a', 'b', 'c'], [2, 0]), ['c', 'a'])
+
+
+def test_read_rows():
+    spike_times = VectorData('spike_times', 'spike times', data=[0., 1., 2., 3., 4., 5.])
+    spike_times_index = VectorIndex('spike_times_index', data=[1, 3, 6], target=spike_times)
+    quality = VectorData('quality', 'quality', data=[.5, .7, .9])
+    dynamic_table = DynamicTable(name='units', description='units',
+                                 columns=[quality, spike_times_index, spike_times],
+                                 colnames=['quality', 'spike_times'])
+
+    assert column_kind(dynamic_table, 'spike_times') == 'ragged'
+    assert column_kind(dynamic_table, 'quality') == 'scalar'
+    np.testing.assert_array_equal(ragged_lengths(dynamic_table['spike_times'], [2, 0]), [3, 1])
+    df = read_rows(dynamic_table, [2, 0])
+    assert list(df.index) == [2, 0]
+    assert list(df['quality']) == [.9, .5]
+    assert list(df['spike_times']) == ['[3 x float64]', '[1 x float64]']
+    np.testing.assert_array_equal(sort_rows(dynamic_table, 'quality', descending=True), [2, 1, 0])
+
+
+def test_read_rows_references(new_nwbfile):
+    nwbfile = new_nwbfile('NWBDT')
+    device = nwbfile.create_device('device')
+    group = nwbfile.create_electrode_group('shank0', 'shank', 'CA1', device)
+    for _ in range(3):
+        nwbfile.add_electrode(x=1., y=1., z=1., imp=np.nan, location='CA1', filtering='none', group=group)
+    dynamic_table = DynamicTable(name='table', description='table')
+    dynamic_table.add_column('electrode', 'electrode', table=nwbfile.electrodes)
+    for electrode in (2, 0):
+        dynamic_table.add_row(electrode=electrode)
+
+    assert column_kind(nwbfile.electrodes, 'group') == 'reference'
+    assert column_kind(dynamic_table, 'electrode') == 'region'
+    assert list(read_rows(nwbfile.electrodes, [1])['group']) == ['shank0']
+    assert list(read_rows(dynamic_table, [1, 0])['electrode']) == ['electrodes[0]', 'electrodes[2]']
+
+
+def test_format_hover_column():
+    np.testing.assert_array_equal(format_hover_column('a', np.array([1.5, 2e6])), ['a: 1.500', 'a: 2.00e+06'])
+    np.testing.assert_array_equal(format_hover_column('b', np.array([1, 2000000])), ['b: 1', 'b: 2.00e+06'])
+    np.testing.assert_array_equal(format_hover_column('c', np.array([b'x', b'y'])), ['c: x', 'c: y'])
+    assert format_hover_column('d', np.array([None, 'x'], dtype=object)) is None
+    assert format_hover_column('e', np.ones((2, 3))) is None
+
+
+def test_dynamic_table_hover_text():
+    image_mask = VectorData('image_mask', 'masks', data=np.ones((3, 4, 4)))
+    quality = VectorData('quality', 'quality', data=[.5, .7, 2e6])
+    location = VectorData('location', 'location', data=['CA1', 'CA3', 'CA1'])
+    dynamic_table = DynamicTable(name='rois', description='rois', columns=[image_mask, quality, location],
+                                 colnames=['image_mask', 'quality', 'location'])
+
+    hover_text = dynamic_table_hover_text(dynamic_table)
+    assert hover_text == ['quality: 0.500<br>location: CA1', 'quality: 0.700<br>location: CA3',
+                          'quality: 2.00e+06<br>location: CA1']
+    assert dynamic_table_hover_text(dynamic_table) is hover_text
+    assert dynamic_table_hover_text(dynamic_table, exclude=('location',))[0] == 'quality: 0.500'
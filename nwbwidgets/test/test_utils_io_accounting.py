@@ -0,0 +1,69 @@
+import h5py
+import numpy as np
+import pytest
+from hdmf.backends.hdf5 import H5DataIO
+from ipywidgets import widgets
+from nwbwidgets.utils.io_accounting import IOAccounting, count_chunks
+from nwbwidgets.utils.timeseries import timeseries_time_to_ind
+from pynwb import NWBHDF5IO, TimeSeries
+
+
+@pytest.fixture
+def nwbfile_path(new_nwbfile, write_nwbfile):
+    nwbfile = new_nwbfile('NWBIO')
+    nwbfile.add_acquisition(TimeSeries(name='raw', data=H5DataIO(np.arange(1024.), chunks=(100,)), unit='V',
+                                       timestamps=H5DataIO(np.arange(1024.) / 10, chunks=(100,))))
+    return write_nwbfile(nwbfile, 'io_accounting.nwb')
+
+
+def test_count_chunks():
+    assert count_chunks((1000,), None, slice(None)) is None
+    assert count_chunks((1000,), (100,), slice(None)) == 10
+    assert count_chunks((1000,), (100,), slice(95, 105)) == 2
+    assert count_chunks((1000,), (100,), 5) == 1
+    assert count_chunks((1000, 8), (100, 4), (slice(0, 150), [0, 7])) == 4
+    assert count_chunks((1000, 8), (100, 4), (Ellipsis, 0)) == 10
+    assert count_chunks((1000,), (100,), slice(10, 10)) == 0
+
+
+def test_track_reads(nwbfile_path):
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        accounting = IOAccounting().track(nwbfile)
+        timeseries = nwbfile.acquisition['raw']
+        assert isinstance(timeseries.timestamps, h5py.Dataset)
+
+        timeseries_time_to_ind(timeseries, 50.)
+        # one strided read and the last timestamp to build the time index, then one chunk per lookup
+        assert accounting.totals['reads'] == 3
+        assert accounting.totals['elements'] == 11 + 1 + 99
+        df = accounting.to_dataframe()
+        assert set(df['caller']) == {'nwbwidgets.utils.timeseries.__init__', 'nwbwidgets.utils.timeseries._block'}
+        assert set(df['dataset']) == {'/acquisition/raw/timestamps'}
+
+        accounting.reset()
+        timeseries_time_to_ind(timeseries, 50.05)
+        timeseries_time_to_ind(timeseries, 80.)
+        assert accounting.totals['reads'] == 1
+
+        accounting.reset()
+        timeseries.data[:150]
+        np.asarray(timeseries.data)
+        assert accounting.totals == dict(reads=2, elements=1174, bytes=1174 * 8, chunks=2 + 11)
+
+        accounting.untrack()
+        assert type(timeseries.data) is h5py.Dataset
+
+
+def test_attribute_to_widget(nwbfile_path):
+    class ReadingWidget(widgets.HTML):
+        def __init__(self, timeseries):
+            super().__init__()
+            self.value = str(timeseries.data[:10])
+
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        accounting = IOAccounting().track(nwbfile)
+        ReadingWidget(nwbfile.acquisition['raw'])
+        assert accounting.to_dataframe().loc[0, 'widget'] == 'ReadingWidget'
+        accounting.untrack()
@@ -0,0 +1,51 @@
+import numpy as np
+import plotly.graph_objects as go
+from nwbwidgets.utils.plotly import as_typed_array, event_group, nan_join, SegmentedTraces
+from plotly.serializers import _py_to_js
+
+
+def test_as_typed_array():
+    data = np.arange(10, dtype=np.float32)
+    assert as_typed_array(data) is data
+    assert as_typed_array(np.arange(10)).dtype == np.float64
+    assert as_typed_array(np.ones(3, dtype=np.float16)).dtype == np.float32
+    assert as_typed_array([True, False]).dtype == np.uint8
+
+
+def test_nan_join():
+    x, y = nan_join(np.arange(3), np.arange(6).reshape(2, 3))
+    np.testing.assert_array_equal(x, [0, 1, 2, np.nan, 0, 1, 2])
+    np.testing.assert_array_equal(y, [0, 1, 2, np.nan, 3, 4, 5])
+
+
+def test_event_group_binary():
+    fig = event_group([np.array([.1, .2]), np.array([]), np.array([.3])], offset=2)
+    assert len(fig.data) == 2
+    np.testing.assert_array_equal(fig.data[1].y, [4.])
+    serialized = _py_to_js(fig._data, None)
+    assert all(isinstance(trace[axis], dict) and 'buffer' in trace[axis] for trace in serialized for axis in 'xy')
+
+
+def test_segmented_traces():
+    fig = go.FigureWidget()
+    made = []
+
+    def make_segment(start, stop):
+        made.append((start, stop))
+        return [(go.Scatter(x=np.arange(start, stop), y=np.zeros(int(stop - start))), start)]
+
+    segments = SegmentedTraces(fig, make_segment, min_size=1)
+    segments.show(0, 100)
+    assert segments.size == 32
+    assert made == [(0, 32), (32, 64), (64, 96), (96, 128)]
+
+    segments.show(10, 110)
+    assert len(made) == 4
+    segments.show(40, 140)
+    assert made[4:] == [(128, 160)]
+    assert sorted(info for _, info in segments.drawn()) == [32, 64, 96, 128]
+    assert len(fig.data) == 4
+
+    segments.show(0, 10)
+    assert segments.size == 4
+    assert [trace.x[0] for trace in fig.data] == [0, 4, 8]
@@ -0,0 +1,98 @@
+import threading
+
+import numpy as np
+import pytest
+from nwbwidgets.controllers import StartAndDurationController
+from nwbwidgets.timeseries import BaseGroupedTraceWidget, time_window_request
+from nwbwidgets.utils.cancellation import check_cancelled
+from nwbwidgets.utils.prefetch import WindowCache, WindowPrefetcher, neighbor_windows, window_cache
+from pynwb import TimeSeries
+
+
+def test_neighbor_windows():
+    assert neighbor_windows((2, 4), 0, 10) == [(4, 6), (0, 2)]
+    assert neighbor_windows((0, 4), 0, 10) == [(4, 8)]
+    assert neighbor_windows((5, 9), 0, 10) == [(6, 10), (1, 5)]
+    assert neighbor_windows((6, 10), 0, 10) == [(2, 6)]
+
+
+def test_window_cache():
+    cache = WindowCache(max_bytes=2000)
+    calls = []
+
+    def load(key):
+        calls.append(key)
+        return np.full(100, key * 2.)  # 800 bytes
+
+    assert cache.get(1, lambda: load(1))[0] == 2
+    assert cache.get(1, lambda: load(1))[0] == 2
+    cache.prefetch(2, lambda: load(2))
+    assert cache.get(2, lambda: load(2))[0] == 4
+    assert calls == [1, 2]
+    assert cache.nbytes == 1600
+
+    cache.get(3, lambda: load(3))
+    assert 1 not in cache and 3 in cache
+    assert cache.nbytes == 1600
+
+    def fail():
+        raise ValueError
+
+    cache.prefetch(4, fail)
+    with pytest.raises(ValueError):
+        cache.get(4, fail)
+    assert cache.get(4, lambda: load(4))[0] == 8
+
+    # a large read evicts the entries before it, but stays cached itself
+    cache.get(5, lambda: np.zeros(1000))
+    assert 5 in cache and 4 not in cache
+    assert cache.nbytes == 8000
+
+
+def test_prefetcher():
+    controller = StartAndDurationController(tmin=0, tmax=100)
+    cache = WindowCache()
+    requested = []
+
+    def request(window):
+        requested.append(tuple(window))
+        return tuple(window), lambda: window
+
+    WindowPrefetcher(controller, request, cache)
+    assert (5, 10) in cache and (0, 5) not in cache
+    controller.move_up(None)
+    assert (10, 15) in cache and (0, 5) in cache
+    assert (10, 15) in requested
+
+
+def test_grouped_traces_prefetch():
+    ts = TimeSeries(name='ts', data=np.random.rand(10_000, 8), unit='V', rate=100.)
+    widget = BaseGroupedTraceWidget(ts)
+    next_window = (widget.time_window_controller.value[1], widget.time_window_controller.value[1] + 5)
+    key, load = time_window_request(ts, next_window, np.arange(8))
+    assert key in window_cache
+    window_cache._futures[key].result()
+
+
+def test_prefetcher_cancels_stale_reads():
+    controller = StartAndDurationController(tmin=0, tmax=100)
+    cache = WindowCache()
+    release = threading.Event()
+    finished = []
+
+    def request(window):
+        def load():
+            release.wait(5)
+            check_cancelled()
+            finished.append(tuple(window))
+            return tuple(window)
+        return tuple(window), load
+
+    WindowPrefetcher(controller, request, cache)  # starts reading (5, 10)
+    for _ in range(4):
+        controller.move_up(None)
+    release.set()
+    assert cache.get((25, 30), lambda: None) == (25, 30)
+    assert cache.get((15, 20), lambda: 'read again') == (15, 20)
+    # the shown window and its neighbours are read. (5, 10) stopped at check_cancelled, the others never started.
+    assert sorted(finished) == [(15, 20), (20, 25), (25, 30)]
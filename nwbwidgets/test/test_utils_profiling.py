@@ -0,0 +1,78 @@
+import json
+
+import h5py
+import numpy as np
+import pytest
+from ipywidgets import widgets
+from nwbwidgets import base
+from nwbwidgets.utils import profiling
+from nwbwidgets.utils.profiling import RenderProfiler
+from nwbwidgets.utils.widgets import interactive_output
+from nwbwidgets.view import default_neurodata_vis_spec
+from pynwb import NWBHDF5IO, TimeSeries
+
+
+@pytest.fixture
+def nwbfile_path(new_nwbfile, write_nwbfile):
+    nwbfile = new_nwbfile('NWBP')
+    nwbfile.add_acquisition(TimeSeries(name='raw', data=np.arange(1000.), unit='V', rate=10.))
+    return write_nwbfile(nwbfile, 'profiling.nwb')
+
+
+def test_profile_nwb2widget(nwbfile_path):
+    base.render_cache.clear()
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        with RenderProfiler() as profiler:
+            base.nwb2widget(nwbfile.acquisition['raw'].data, default_neurodata_vis_spec)
+    assert profiling.active_profiler is None
+    assert h5py.Dataset.__getitem__ is profiler._original_getitem
+
+    df = profiler.to_dataframe()
+    assert list(df['kind']) == ['vis2widget', 'nwb2widget']
+    node = df.iloc[1]
+    assert node['name'] == 'Dataset /acquisition/raw/data'
+    assert node['n_reads'] >= 1
+    assert node['bytes_read'] == 20 * 8  # one window of the dataset
+    assert node['peak_alloc'] > 0
+    assert node['self_time'] <= node['wall_time']
+
+
+def test_profile_plotter():
+    def plotter(value):
+        pass
+
+    slider = widgets.IntSlider()
+    with RenderProfiler(trace_memory=False) as profiler:
+        interactive_output(plotter, dict(value=slider))
+        slider.value = 3
+    df = profiler.to_dataframe()
+    assert list(df['name']) == ['plotter', 'plotter']
+    assert df['peak_alloc'].isnull().all()
+
+
+def test_exports(tmp_path):
+    profiler = RenderProfiler(trace_memory=False)
+    with profiler:
+        stats = profiler.stats_widget()
+        with profiling.profile('outer', 'nwb2widget'):
+            with profiling.profile('inner', 'vis2widget'):
+                widgets.HTML('hi')
+    assert '2 nodes' in stats.value
+
+    trace = profiler.to_chrome_trace(str(tmp_path / 'trace.json'))
+    assert [event['name'] for event in trace['traceEvents']] == ['outer', 'inner']
+    with open(str(tmp_path / 'trace.json')) as f:
+        assert json.load(f) == json.loads(json.dumps(trace))
+
+    speedscope = profiler.to_speedscope()
+    events = speedscope['profiles'][0]['events']
+    frames = [frame['name'] for frame in speedscope['shared']['frames']]
+    assert [(event['type'], frames[event['frame']]) for event in events] == \
+        [('O', 'outer'), ('O', 'inner'), ('C', 'inner'), ('C', 'outer')]
+
+
+def test_one_profiler_at_a_time():
+    with RenderProfiler(trace_memory=False):
+        with pytest.raises(RuntimeError):
+            RenderProfiler().enable()
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from nwbwidgets.timeseries import SingleTracePlotlyWidget
+from nwbwidgets.utils.pyramid import MinMaxPyramid, get_timeseries_envelope
+from pynwb import TimeSeries
+
+
+class Unreadable:
+    """Array-like with the shape of the data that fails on read"""
+
+    def __init__(self, data):
+        self.shape = data.shape
+        self.dtype = data.dtype
+
+    def __getitem__(self, item):
+        raise AssertionError('read raw data')
+
+
+@pytest.fixture
+def data():
+    return np.random.RandomState(0).randn(100_000, 3)
+
+
+def check_envelope(data, index, values, bin_size):
+    for i in range(0, len(index), 2):
+        start = index[i]
+        np.testing.assert_array_equal(values[i], data[start:start + bin_size].min(axis=0))
+        np.testing.assert_array_equal(values[i + 1], data[start:start + bin_size].max(axis=0))
+
+
+def test_read_envelope(data):
+    pyramid = MinMaxPyramid(data, block_size=4096)
+    assert pyramid.bins == [16, 64, 256, 1024, 4096]
+
+    index, values = pyramid.read(1000, 90_000, n_columns=100)
+    assert pyramid.level_for(89_000, 100) == 256
+    assert index[0] <= 1000 and index[-1] < 90_000 + 256
+    assert 200 <= len(values) <= 2 * 4 * 100
+    check_envelope(data, index, values, 256)
+
+
+def test_read_raw(data):
+    pyramid = MinMaxPyramid(data)
+    index, values = pyramid.read(10, 1000, n_columns=100)
+    np.testing.assert_array_equal(index, np.arange(10, 1000))
+    np.testing.assert_array_equal(values, data[10:1000])
+    assert not pyramid._blocks
+
+
+def test_lazy_blocks(data):
+    pyramid = MinMaxPyramid(data, block_size=4096, max_blocks=2)
+    pyramid.read(0, 10_000, n_columns=100)
+    assert sorted(pyramid._blocks) == [0, 1, 2]
+
+    pyramid.read(50_000, 70_000, n_columns=1000)
+    assert len(pyramid._recent) == 2
+    assert all(levels[0] is None for i, levels in pyramid._blocks.items() if i not in pyramid._recent)
+
+    # dropped levels are rebuilt
+    index, values = pyramid.read(0, 10_000, n_columns=500)
+    check_envelope(data, index, values, 16)
+
+
+def test_sidecar(data, tmp_path):
+    path = str(tmp_path / 'pyramid.h5')
+    pyramid = MinMaxPyramid(data, block_size=4096, sidecar=path)
+    expected = pyramid.read(0, 100_000, n_columns=100)
+    pyramid.close()
+
+    pyramid = MinMaxPyramid(Unreadable(data), block_size=4096, sidecar=path)
+    index, values = pyramid.read(0, 100_000, n_columns=100)
+    np.testing.assert_array_equal(index, expected[0])
+    np.testing.assert_array_equal(values, expected[1])
+    pyramid.close()
+
+
+def test_get_timeseries_envelope(data):
+    ts = TimeSeries(name='ts', data=data, unit='V', rate=100., starting_time=5., conversion=-2.)
+    tt, values, unit = get_timeseries_envelope(ts, 0, 50_000, columns=[2, 0], n_columns=100)
+    assert unit == 'V'
+    assert values.shape[1] == 2
+    assert tt[0] == 5. and tt[1] == 5. + 128 / 100.
+    np.testing.assert_array_equal(values[1::2].min(axis=0), -2 * data[:50_000, [2, 0]].max(axis=0))
+
+    ts = TimeSeries(name='ts', data=data[:, 0], unit='V', timestamps=np.arange(100_000) / 10.)
+    tt, values, unit = get_timeseries_envelope(ts, 0, 100_000, n_columns=100)
+    tt_rate, values_rate, unit = get_timeseries_envelope(
+        TimeSeries(name='ts', data=data[:, 0], unit='V', rate=10.), 0, 100_000, n_columns=100)
+    np.testing.assert_allclose(tt, tt_rate)
+    np.testing.assert_array_equal(values, values_rate)
+
+
+def test_single_trace_zoom():
+    ts = TimeSeries(name='ts', data=np.random.randn(1_000_000), unit='V', rate=1000.)
+    widget = SingleTracePlotlyWidget(ts)
+    widget.time_window_controller.value = (0., 1000.)
+    assert len(widget.out_fig.data[0].y) <= 8000
+
+    widget.out_fig.layout.xaxis.range = (100., 101.)
+    assert len(widget.out_fig.data[0].y) == 1000
+    np.testing.assert_array_equal(widget.out_fig.data[0].y, ts.data[100_000:101_000])
@@ -0,0 +1,55 @@
+import h5py
+import numpy as np
+import pytest
+from nwbwidgets.utils.io_accounting import IOAccounting
+from nwbwidgets.utils.read_plan import plan_column_read, read_columns, plan_row_reads
+
+
+def test_plan_column_read():
+    # neighbouring channels in one chunk column: a single block read
+    plan = plan_column_read((10_000, 64), (1000, 16), 2, 0, 5000, [3, 5, 6, 10])
+    assert plan['strategy'] == 'block'
+    assert plan['ranges'] == [(3, 11)]
+
+    # channels scattered over the chunk columns: read each chunk column they are in once
+    plan = plan_column_read((10_000, 256), (10_000, 16), 2, 0, 10_000, [0, 2, 4, 100, 250])
+    assert plan['strategy'] == 'chunks'
+    assert plan['ranges'] == [(0, 16), (96, 112), (240, 256)]
+    assert plan['bytes'] == 3 * 10_000 * 16 * 2
+
+    # contiguous dataset: read the requested runs of channels only
+    plan = plan_column_read((10_000, 1000), None, 2, 0, 10_000, np.r_[0:100, 900:1000])
+    assert plan['strategy'] == 'runs'
+    assert plan['ranges'] == [(0, 100), (900, 1000)]
+
+
+@pytest.mark.parametrize('chunks', [None, (100, 4), (1000, 32)])
+def test_read_columns(tmp_path, chunks):
+    data = np.arange(1000 * 32).reshape(1000, 32)
+    columns = [30, 2, 3, 17, 2]
+    with h5py.File(str(tmp_path / 'data.h5'), 'w') as f:
+        dataset = f.create_dataset('data', data=data, chunks=chunks)
+        np.testing.assert_array_equal(read_columns(dataset, 150, 420, columns), data[150:420, columns])
+        np.testing.assert_array_equal(read_columns(dataset, 150, None, [5]), data[150:, [5]])
+    np.testing.assert_array_equal(read_columns(data, 0, 10, columns), data[:10, columns])
+
+
+def test_read_columns_chunk_reads(tmp_path):
+    data = np.random.rand(1000, 64)
+    with h5py.File(str(tmp_path / 'data.h5'), 'w') as f:
+        dataset = f.create_dataset('data', data=data, chunks=(1000, 8))
+        accounting = IOAccounting().track(dataset)
+        read_columns(dataset, 0, 1000, [1, 3, 5, 60, 61])
+        assert accounting.totals['reads'] == 2
+        assert accounting.totals['chunks'] == 2
+        accounting.untrack()
+
+
+def test_plan_row_reads():
+    # trials 1 and 2 overlap, trial 0 is close enough to share their read, trial 3 is far and trial 4 out of range
+    reads = plan_row_reads([110, 0, 50, 100000, -500], 100, 200000, row_bytes=8)
+    assert [(start, stop, list(trials)) for start, stop, trials in reads] == [
+        (0, 210, [1, 2, 0]), (100000, 100100, [3])]
+
+    reads = plan_row_reads([0, 50, 110], 100, 200000, row_bytes=8, max_bytes=8 * 150)
+    assert [(start, stop, list(trials)) for start, stop, trials in reads] == [(0, 150, [0, 1]), (110, 210, [2])]
@@ -0,0 +1,119 @@
+from concurrent.futures import wait
+from functools import partial
+
+import numpy as np
+import pytest
+from ipywidgets import widgets
+from nwbwidgets import base
+from nwbwidgets.utils.render_cache import RenderCache, get_node_key
+from nwbwidgets.view import default_neurodata_vis_spec
+from pynwb import NWBHDF5IO, TimeSeries
+
+
+@pytest.fixture
+def nwbfile_path(new_nwbfile, write_nwbfile):
+    nwbfile = new_nwbfile('NWBRC')
+    module = nwbfile.create_processing_module(name='behavior', description='behavior')
+    module.add(TimeSeries(name='speed', data=np.arange(10.), unit='m/s', rate=10.))
+    nwbfile.add_acquisition(TimeSeries(name='raw', data=np.arange(10.), unit='V', rate=10.))
+    return write_nwbfile(nwbfile, 'render_cache.nwb')
+
+
+def test_get_node_key(nwbfile_path):
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        module_key = get_node_key(nwbfile.processing['behavior'])
+        raw_key = get_node_key(nwbfile.acquisition['raw'])
+        assert module_key[0] == raw_key[0]  # same file
+        assert module_key[1] != raw_key[1]
+    assert get_node_key(TimeSeries(name='raw', data=[1.], unit='V', rate=1.)) is None
+
+
+def test_nwb2widget_reuses_widget(nwbfile_path):
+    base.render_cache.clear()
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        module = nwbfile.processing['behavior']
+        first = base.nwb2widget(module, default_neurodata_vis_spec)
+        assert base.nwb2widget(module, default_neurodata_vis_spec) is first
+
+        # rendering with extra arguments is not cached
+        assert base.nwb2widget(nwbfile.processing, default_neurodata_vis_spec, prefetch=None) is not \
+            base.nwb2widget(nwbfile.processing, default_neurodata_vis_spec, prefetch=None)
+
+
+def test_closed_widgets_are_not_returned(nwbfile_path):
+    cache = RenderCache()
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        ts = io.read().acquisition['raw']
+        widget = widgets.HTML('raw')
+        cache.put(ts, 'spec', widget)
+        assert cache.get(ts, 'spec') is widget
+        assert cache.get(ts, 'other spec') is None
+        widget.close()
+        assert cache.get(ts, 'spec') is None
+
+
+def test_lru_eviction_by_size(nwbfile_path):
+    cache = RenderCache(max_bytes=3000)
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        raw, speed = nwbfile.acquisition['raw'], nwbfile.processing['behavior']['speed']
+        cache.put(raw, 'spec', widgets.HTML('x' * 1000))
+        cache.put(speed, 'spec', widgets.HTML('y' * 1000))
+        assert len(cache) == 1
+        assert cache.get(raw, 'spec') is None
+        assert cache.get(speed, 'spec') is not None
+
+
+def show_name(node, **kwargs):
+    return widgets.HTML(node.name)
+
+
+def test_discarded_prefetch_keeps_cached_widget(nwbfile_path):
+    base.render_cache.clear()
+    spec = {TimeSeries: show_name}
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        raw, speed = nwbfile.acquisition['raw'], nwbfile.processing['behavior']['speed']
+        shown = base.nwb2widget(speed, spec)  # displayed in another cell
+        tab = base.lazy_show_over_data([raw, speed], partial(base.nwb2widget, neurodata_vis_spec=spec),
+                                       prefetch=base.PrefetchPolicy(n_adjacent=1))
+        while tab.lazy_children.pending:
+            wait(list(tab.lazy_children.pending.values()), timeout=5)
+        assert tab.lazy_children.prefetched[1][0] is shown
+        tab.lazy_children.discard(1)
+        assert shown.comm is not None
+
+
+def test_cache_is_per_registry(nwbfile_path):
+    base.render_cache.clear()
+    other_spec = default_neurodata_vis_spec.copy()
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        first = base.nwb2widget(nwbfile, default_neurodata_vis_spec)
+        second = base.nwb2widget(nwbfile, other_spec)
+        assert second is not first  # same top-level function, but its children come from another registry
+        assert base.nwb2widget(nwbfile, other_spec) is second
+
+        other_spec.register(TimeSeries, show_name)
+        assert base.nwb2widget(nwbfile, other_spec) is not second
+
+
+def test_paged_accordion_keeps_cached_widgets(nwbfile_path, monkeypatch):
+    monkeypatch.setattr(base, 'accordion_page_size', 2)
+    base.render_cache.clear()
+    spec = {TimeSeries: show_name}
+    with NWBHDF5IO(nwbfile_path, 'r') as io:
+        nwbfile = io.read()
+        raw, speed = nwbfile.acquisition['raw'], nwbfile.processing['behavior']['speed']
+        d = dict(raw=raw, speed=speed, behavior=nwbfile.processing['behavior'])
+        accordion = base.dict2accordion(d, spec, prefetch=base.PrefetchPolicy(n_adjacent=1))
+        accordion.accordion.selected_index = 0
+        lazy = accordion.accordion.lazy_children
+        while lazy.pending:
+            wait(list(lazy.pending.values()), timeout=5)
+        prefetched = lazy.prefetched[1][0]
+        accordion.pager.value = 1  # leaving the page discards the prefetched entry
+        assert prefetched.comm is not None
+        assert base.nwb2widget(speed, spec) is prefetched
@@ -1,14 +1,19 @@
 import unittest
+from bisect import bisect
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import h5py
 import numpy as np
 from dateutil.tz import tzlocal
 from nwbwidgets.utils.timeseries import (
     get_timeseries_tt, get_timeseries_maxt, get_timeseries_mint, get_timeseries_in_units, timeseries_time_to_ind,
-    align_by_times, align_by_trials, align_by_time_intervals
+    align_by_times, align_by_trials, align_by_time_intervals, TimeIndex, convert_to_units, align_samples,
+    get_time_index
 )
 from pynwb import NWBFile
 from pynwb import TimeSeries
+from pynwb.ecephys import ElectricalSeries
 from pynwb.epoch import TimeIntervals
 
 
@@ -45,6 +50,35 @@ def test_get_timeseries_in_units():
     assert (data == [100, 110, 120, 130, 140, 150, 160, 170, 180, 190])
 
 
+def test_get_timeseries_in_units_dtype():
+    data = np.arange(-50, 50, dtype='int16').reshape(25, 4)
+    ts = TimeSeries(name='test_timeseries', data=data, unit='V', rate=1., conversion=1e-6)
+    out, unit = get_timeseries_in_units(ts, 5, 10, columns=[3, 1])
+    assert unit == 'V'
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, data[5:10, [3, 1]] * 1e-6, rtol=1e-6)
+
+    out, unit = get_timeseries_in_units(ts, 5, 10, dtype=np.float64)
+    assert out.dtype == np.float64
+    assert get_timeseries_in_units(TimeSeries(name='test_timeseries', data=data * 1., unit='V', rate=1.))[0].dtype \
+        == np.float64
+
+
+def test_convert_to_units_channel_conversion():
+    nwbfile = NWBFile(session_description='session', identifier='NWB123',
+                      session_start_time=datetime(2017, 4, 3, 11, tzinfo=tzlocal()))
+    device = nwbfile.create_device(name='device')
+    group = nwbfile.create_electrode_group(name='group', description='group', location='location', device=device)
+    for _ in range(3):
+        nwbfile.add_electrode(x=1.0, y=2.0, z=3.0, imp=1., location='CA1', filtering='none', group=group)
+    data = np.ones((10, 3), dtype='int16')
+    electrical_series = ElectricalSeries(name='ephys', data=data, rate=1., conversion=2.,
+                                         channel_conversion=[1., 10., 100.],
+                                         electrodes=nwbfile.create_electrode_table_region([0, 1, 2], 'all'))
+    out, unit = convert_to_units(electrical_series, data[:2, [2, 0]], columns=[2, 0])
+    np.testing.assert_array_equal(out, [[200., 2.], [200., 2.]])
+
+
 def test_align_by_trials():
     start_time = datetime(2017, 4, 3, 11, tzinfo=tzlocal())
     create_date = datetime(2017, 4, 15, 12, tzinfo=tzlocal())
@@ -98,3 +132,90 @@ class TimeSeriesTimeStampTestCase(unittest.TestCase):
         intervals = TimeIntervals(name='Time Intervals')
         np.testing.assert_array_equal(align_by_time_intervals(
             timeseries=self.ts, intervals=intervals, stop_label=None), np.array([]))
+
+
+def test_time_index_irregular(tmp_path):
+    timestamps = np.cumsum(np.random.RandomState(0).exponential(size=10_000))
+    with h5py.File(str(tmp_path / 'timestamps.h5'), 'w') as f:
+        dataset = f.create_dataset('timestamps', data=timestamps, chunks=(256,))
+        time_index = TimeIndex(dataset)
+        assert time_index.stride == 256
+        assert not len(time_index.segments)
+        for time in [-1., timestamps[0], timestamps[300], 1234.5, timestamps[-1], timestamps[-1] + 1]:
+            assert time_index.time_to_index(time) == bisect(timestamps, time)
+        assert time_index.time_to_index(1234.5, ind_min=5000) == 5000
+        np.testing.assert_array_equal(time_index.times(100, 2000), timestamps[100:2000])
+        np.testing.assert_array_equal(time_index.times_at([0, 5, 5, 9999]), timestamps[[0, 5, 5, 9999]])
+
+
+def test_time_index_regular_segments():
+    # regular at 1 kHz with jitter, and a pause of 10 s in the middle
+    tt = np.arange(20_000) / 1000. + np.random.RandomState(0).uniform(0, 1e-6, 20_000)
+    tt[10_000:] += 10.
+    time_index = TimeIndex(tt, stride=1000)
+    np.testing.assert_array_equal(time_index.segments[:, :2], [[0, 10_000 - 1000], [10_000, 19_999]])
+    np.testing.assert_allclose(time_index.segments[:, 3], 1000.)
+
+    np.testing.assert_allclose(time_index.typical_rate, 1000.)
+
+    # a sample off the line between two sampled timestamps is read as it is
+    tt[12_345] += 5e-4
+    np.testing.assert_array_equal(time_index.times(12_000, 13_000), tt[12_000:13_000])
+    np.testing.assert_array_equal(time_index.times(9_500, 10_500), tt[9_500:10_500])
+    np.testing.assert_array_equal(time_index.times_at([0, 9_500, 12_345, 15_000]), tt[[0, 9_500, 12_345, 15_000]])
+
+
+def test_get_time_index_from_threads():
+    ts = TimeSeries(name='ts', data=np.arange(100_000.), unit='m', timestamps=np.arange(100_000) / 1000.)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        time_indices = list(executor.map(lambda _: get_time_index(ts), range(8)))
+        indices = list(executor.map(get_time_index(ts).time_to_index, np.random.RandomState(0).uniform(0, 100, 200)))
+    assert all(time_index is time_indices[0] for time_index in time_indices)
+    assert indices == [bisect(ts.timestamps, time) for time in np.random.RandomState(0).uniform(0, 100, 200)]
+
+
+def test_time_index_rate():
+    time_index = TimeIndex(rate=10., starting_time=2., n=100)
+    assert time_index.time_to_index(3.) == 10
+    assert time_index.time_to_index(3.01) == 11
+    np.testing.assert_allclose(time_index.times(5, 8), [2.5, 2.6, 2.7])
+
+
+def test_align_samples(tmp_path):
+    rng = np.random.RandomState(0)
+    data = rng.randint(-100, 100, size=(5000, 4)).astype('int16')
+    times = np.array([.05, 1., 2.0041, 2.01, 49.95])
+    with h5py.File(str(tmp_path / 'data.h5'), 'w') as f:
+        dataset = f.create_dataset('data', data=data, chunks=(256, 2))
+        for ts in (TimeSeries(name='rate', data=dataset, unit='V', rate=100., conversion=2.),
+                   TimeSeries(name='timestamps', data=dataset, unit='V', timestamps=np.arange(5000) / 100.,
+                              conversion=2.)):
+            out, tt, unit = align_samples(ts, times, before=.1, after=.2, columns=[3, 1])
+            assert out.shape == (5, 30, 2)
+            assert unit == 'V'
+            np.testing.assert_allclose(tt, np.arange(-10, 20) / 100.)
+            for trial, time in enumerate(times):
+                event = timeseries_time_to_ind(ts, time)
+                rows = np.arange(event - 10, event + 20)
+                inside = (rows >= 0) & (rows < 5000)
+                np.testing.assert_array_equal(out[trial][inside], data[rows[inside]][:, [3, 1]] * 2.)
+                assert np.isnan(out[trial][~inside]).all()
+
+            # every 4th sample, with the event sample kept
+            out, tt, _ = align_samples(ts, times, before=.1, after=.2, step=4)
+            np.testing.assert_allclose(tt, np.arange(-8, 20, 4) / 100.)
+            event = timeseries_time_to_ind(ts, times[1])
+            np.testing.assert_array_equal(out[1], data[event - 8:event + 20:4] * 2.)
+
+
+def test_time_index_times_to_indices():
+    timestamps = np.cumsum(np.random.RandomState(0).exponential(size=10_000))
+    time_index = TimeIndex(timestamps, stride=64)
+    times = np.random.RandomState(1).uniform(-5, timestamps[-1] + 5, 500)
+    np.testing.assert_array_equal(time_index.times_to_indices(times), [bisect(timestamps, t) for t in times])
+
+
+def test_align_by_times_ragged():
+    ts = TimeSeries(name='ts', data=np.arange(10), unit='m', rate=1.)
+    out = align_by_times(ts, [0, 2], [3, 6])
+    assert [list(x) for x in out] == [[0, 1, 2], [2, 3, 4, 5]]
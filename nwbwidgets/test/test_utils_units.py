@@ -3,7 +3,7 @@ from datetime import datetime
 
 import numpy as np
 from dateutil.tz import tzlocal
-from nwbwidgets.utils.units import get_min_spike_time, align_by_trials, align_by_time_intervals
+from nwbwidgets.utils.units import get_min_spike_time, align_by_trials, align_by_time_intervals, spike_times_request
 from pynwb import NWBFile
 from pynwb.epoch import TimeIntervals
 
@@ -38,6 +38,13 @@ class ShowPSTHTestCase(unittest.TestCase):
     def test_get_min_spike_time(self):
         assert (get_min_spike_time(self.nwbfile.units) == 1.2)
 
+    def test_spike_times_request_after_add_unit(self):
+        units = self.nwbfile.units
+        key, _ = spike_times_request(units, [0, 1], [0., 10.])
+        units.add_unit(id=4, spike_times=[5.], obs_intervals=[[1, 10]], location='CA1', quality=0.5)
+        new_key, _ = spike_times_request(units, [0, 1], [0., 10.])
+        assert new_key != key
+
     def test_align_by_trials(self):
         compare_to_at = [np.array([2.2, 3.0, 25.0, 26.0]), np.array([-0.8, 0., 22., 23.]),
                          np.array([-3.8, -3., 19., 20.])]
@@ -0,0 +1,108 @@
+import subprocess
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from hdmf.common import DynamicTable
+from nwbwidgets.utils.vis_spec import VisSpecRegistry, resolve_spec
+from nwbwidgets.view import default_neurodata_vis_spec
+from pynwb import TimeSeries
+from pynwb.behavior import SpatialSeries
+from pynwb.core import NWBDataInterface
+from pynwb.ecephys import LFP
+
+
+def show_a(node, **kwargs):
+    return 'a'
+
+
+def show_b(node, **kwargs):
+    return 'b'
+
+
+def test_resolve_most_specific():
+    registry = VisSpecRegistry({TimeSeries: show_a, NWBDataInterface: show_b})
+    assert registry.resolve(SpatialSeries) is show_a
+    assert registry.resolve(LFP) is show_b
+    assert registry.resolve(int) is None
+
+
+def test_resolve_invalidated_on_register():
+    registry = VisSpecRegistry({TimeSeries: show_a})
+    assert registry.resolve(SpatialSeries) is show_a
+    registry[SpatialSeries] = show_b
+    assert registry.resolve(SpatialSeries) is show_b
+    del registry[SpatialSeries]
+    assert registry.resolve(SpatialSeries) is show_a
+
+
+def test_priority_overrides_mro():
+    registry = VisSpecRegistry({SpatialSeries: show_a})
+    registry.register(NWBDataInterface, show_b, priority=1)
+    assert registry.resolve(SpatialSeries) is show_b
+    assert registry.copy().resolve(SpatialSeries) is show_b
+
+
+def test_register_invalid_spec():
+    with pytest.raises(TypeError):
+        VisSpecRegistry({TimeSeries: 42})
+
+
+def test_resolve_spec_plain_dict():
+    spec = {TimeSeries: OrderedDict(a=show_a)}
+    assert resolve_spec(spec, SpatialSeries) is spec[TimeSeries]
+    assert resolve_spec(spec, DynamicTable) is None
+
+
+def test_default_vis_spec_is_registry():
+    assert isinstance(default_neurodata_vis_spec, VisSpecRegistry)
+    assert default_neurodata_vis_spec.resolve(SpatialSeries) is default_neurodata_vis_spec[SpatialSeries]
+
+
+def test_dotted_path_spec():
+    registry = VisSpecRegistry({
+        'pynwb.TimeSeries': 'nwbwidgets.test.test_utils_vis_spec.show_a',
+        'not_an_imported_package.SomeType': 'not_an_imported_package.show'})
+    assert registry.resolve(SpatialSeries) is show_a
+    assert registry[TimeSeries] is show_a
+    assert 'not_an_imported_package.SomeType' in registry
+    assert registry.resolve(LFP) is None
+
+
+def test_dotted_path_tabs():
+    registry = VisSpecRegistry({'pynwb.TimeSeries': OrderedDict(
+        a='nwbwidgets.test.test_utils_vis_spec.show_a', b=show_b)})
+    assert registry.resolve(TimeSeries) == OrderedDict(a=show_a, b=show_b)
+
+
+def test_copy_does_not_import():
+    registry = VisSpecRegistry({'not_an_imported_package.SomeType': 'not_an_imported_package.show'})
+    assert 'not_an_imported_package.SomeType' in registry.copy()
+
+
+def test_import_is_lazy():
+    code = ('import sys, nwbwidgets; '
+            'print(any(m in sys.modules for m in ("scipy.signal", "ipyvolume", "skimage", "tifffile", "zarr", '
+            '"ndx_icephys_meta", "nwbwidgets.ophys", "nwbwidgets.misc")))')
+    assert subprocess.check_output([sys.executable, '-c', code]).decode().strip() == 'False'
+
+
+def test_iter_yields_dotted_paths():
+    registry = VisSpecRegistry({
+        'pynwb.TimeSeries': show_a,
+        DynamicTable: show_b,
+        'not_an_imported_package.SomeType': 'not_an_imported_package.show'})
+    names = ['pynwb.TimeSeries', 'hdmf.common.table.DynamicTable', 'not_an_imported_package.SomeType']
+    assert list(registry) == names
+    registry.resolve(SpatialSeries)  # imports the pynwb key
+    assert list(registry) == names
+    assert registry['pynwb.TimeSeries'] is registry[TimeSeries] is show_a
+    assert len(registry) == 3
+
+
+def test_concurrent_resolve():
+    registry = default_neurodata_vis_spec.copy()
+    with ThreadPoolExecutor(8) as executor:
+        specs = list(executor.map(registry.resolve, [SpatialSeries, LFP, DynamicTable, TimeSeries] * 50))
+    assert specs[:4] * 50 == specs
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from functools import partial
+
+from ipywidgets import IntSlider
+
+from nwbwidgets.controllers import LoadingStatus
+from nwbwidgets.controllers.misc import LOADING_CLASS
+from nwbwidgets.utils.cancellation import CancelToken, check_cancelled, report_progress
+from nwbwidgets.utils.widgets import UpdateScheduler, interactive_output, load_async
+
+
+def test_update_scheduler_coalesces():
+    scheduler = UpdateScheduler(delay=.01)
+    target = object()
+    calls = []
+
+    async def clicks():
+        tokens = [scheduler.request(target, lambda i=i: calls.append(i)) for i in range(5)]
+        await asyncio.sleep(.1)
+        return tokens
+
+    tokens = asyncio.run(clicks())
+    assert calls == [4]
+    assert [token.cancelled for token in tokens] == [True] * 4 + [False]
+
+
+def test_update_scheduler_without_loop():
+    scheduler = UpdateScheduler()
+    calls = []
+    scheduler.request(object(), lambda: calls.append(1))
+    assert calls == [1]
+
+
+def test_cancelled_update():
+    scheduler = UpdateScheduler()
+    target = object()
+    steps = []
+
+    def update():
+        steps.append('start')
+        # a request made while an update runs supersedes it
+        scheduler.request(target, lambda: steps.append('latest'))
+        check_cancelled()
+        steps.append('stale')
+
+    scheduler.request(target, update)
+    assert steps == ['start', 'latest']
+    check_cancelled()  # no token outside of updates
+
+
+def test_interactive_output_loads_off_the_loop():
+    slider = IntSlider(0)
+    status = LoadingStatus()
+    events = []
+
+    def load(value):
+        events.append(('load', value, LOADING_CLASS in out._dom_classes))
+
+    def f(value):
+        events.append(('draw', value))
+
+    out = interactive_output(f, dict(value=slider), load=load, status=status)
+
+    async def change():
+        slider.value = 1
+        slider.value = 2
+        await asyncio.sleep(.2)
+
+    asyncio.run(change())
+    # the previous figure is greyed out while the last value loads, and drawn when it is done
+    assert events == [('draw', 0), ('load', 2, True), ('draw', 2)]
+    assert LOADING_CLASS not in out._dom_classes
+
+
+def test_update_scheduler_cancels_waiting_update():
+    scheduler = UpdateScheduler(delay=None)
+    target = object()
+    release = threading.Event()
+    steps = []
+
+    async def update(i):
+        await load_async(release.wait)
+        steps.append(i)
+
+    async def clicks():
+        scheduler.request(target, partial(update, 0))
+        await asyncio.sleep(.01)
+        scheduler.request(target, partial(update, 1))
+        release.set()
+        await asyncio.sleep(.1)
+
+    asyncio.run(clicks())
+    assert steps == [1]
+
+
+def test_loading_status_progress_and_cancel():
+    status = LoadingStatus(min_interval=0)
+    token = CancelToken()
+    status.start(token)
+    with token.active():
+        report_progress(1, 4)
+    assert status.progress_bar.n == 1
+    assert len(status.children) == 3
+
+    status.cancel()
+    assert token.cancelled
+    assert status.progress_bar is None
+    assert status.children == (status.style,)
+
+
+def test_loading_status_progress_from_threads():
+    status = LoadingStatus(min_interval=0)
+    token = CancelToken()
+    status.start(token)
+
+    def read():
+        for done in range(1, 51):
+            status.show_progress(token, done, 50)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    status.stop(token)
+    for thread in threads:
+        thread.join()
+    # progress that arrives after the load has stopped does not bring the progress bar back
+    assert status.progress_bar is None
+    assert status.children == (status.style,)
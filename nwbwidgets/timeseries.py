@@ -1,17 +1,27 @@
 from abc import abstractmethod
+from functools import partial
 
 import matplotlib.pyplot as plt
 import numpy as np
 import plotly.graph_objects as go
+from plotly import colors as plotly_colors
 from ipywidgets import widgets, fixed
 from plotly.subplots import make_subplots
+import pynwb
 from pynwb import TimeSeries
 
-from .controllers import StartAndDurationController, GroupAndSortController
-from .utils.plotly import multi_trace
+from .controllers import (StartAndDurationController, GroupAndSortController, RangeController, LoadingStatus,
+                          make_trial_event_controller)
+from .utils.channel_stats import get_channel_stats
+from .utils import plotly as plotly_utils
+from .utils.plotly import multi_trace, as_typed_array, SegmentedTraces
+from .utils.prefetch import WindowPrefetcher, window_cache
+from .utils.pyramid import get_timeseries_envelope
 from .utils.timeseries import (get_timeseries_tt, get_timeseries_maxt, get_timeseries_mint,
-                               timeseries_time_to_ind, get_timeseries_in_units)
-from .utils.widgets import interactive_output
+                               timeseries_time_to_ind, get_timeseries_in_units, convert_to_units, align_samples,
+                               get_sampling_rate)
+from .utils.cancellation import report_progress
+from .utils.widgets import interactive_output, update_scheduler, can_load_async
 
 color_wheel = plt.rcParams['axes.prop_cycle'].by_key()['color']
 
@@ -96,7 +106,7 @@ def show_indexed_timeseries_plotly(
     trace_kwargs = dict()
     if col is not None or row is not None:
         trace_kwargs.update(row=row, col=col)
-    fig.add_trace(x=tt, y=data, **trace_kwargs, **kwargs)
+    fig.add_trace(x=as_typed_array(tt), y=as_typed_array(data), **trace_kwargs, **kwargs)
     layout_kwargs = dict(xaxis_title=xlabel)
     if ylabel is not None:
         layout_kwargs.update(yaxis_title=ylabel)
@@ -139,10 +149,12 @@ def plot_traces(timeseries: TimeSeries, time_window=None, trace_window=None,
     tt = get_timeseries_tt(timeseries, t_ind_start, t_ind_stop)
     if timeseries.data.shape[1] == len(tt):  # fix of orientation is incorrect
         mini_data = timeseries.data[trace_window[0]:trace_window[1], t_ind_start:t_ind_stop].T
+        mini_data, unit = convert_to_units(timeseries, mini_data, np.arange(*trace_window))
+        gap = np.median(np.nanstd(mini_data, axis=0)) * 20
     else:
         mini_data = timeseries.data[t_ind_start:t_ind_stop, trace_window[0]:trace_window[1]]
-
-    gap = np.median(np.nanstd(mini_data, axis=0)) * 20
+        mini_data, unit = convert_to_units(timeseries, mini_data, np.arange(*trace_window))
+        gap = trace_gap(timeseries, np.arange(*trace_window), mini_data)
     offsets = np.arange(trace_window[1] - trace_window[0]) * gap
 
     fig, ax = plt.subplots()
@@ -164,6 +176,40 @@ def plot_traces(timeseries: TimeSeries, time_window=None, trace_window=None,
     return fig
 
 
+def trace_gap(timeseries: TimeSeries, columns, window_data):
+    """Distance between stacked traces: 20 times the median std of the channels over the whole series, or over the
+    window until the statistics of the series are available"""
+    stats = get_channel_stats(timeseries)
+    if stats.complete:
+        return np.median(stats.std[columns]) * 20
+    return np.median(np.nanstd(window_data, axis=0)) * 20
+
+
+def trace_range(timeseries: TimeSeries, window_data) -> list:
+    """y-range of a single trace: robust range over the whole series, or the range of the window until the
+    statistics of the series are available"""
+    stats = get_channel_stats(timeseries)
+    if stats.complete:
+        return stats.robust_range()
+    return [np.nanmin(window_data), np.nanmax(window_data)]
+
+
+def envelope_request(time_series: TimeSeries, istart, istop, columns=None):
+    """Key and reader of the data of a window, for `window_cache`"""
+    key = ('envelope', time_series, istart, istop, None if columns is None else tuple(np.asarray(columns).tolist()))
+    return key, partial(get_timeseries_envelope, time_series, istart, istop, columns)
+
+
+def time_window_request(time_series: TimeSeries, time_window, columns=None):
+    return envelope_request(time_series, timeseries_time_to_ind(time_series, time_window[0]),
+                            timeseries_time_to_ind(time_series, time_window[1]), columns)
+
+
+def read_envelope(time_series: TimeSeries, istart, istop, columns=None):
+    """`get_timeseries_envelope` through `window_cache`, so that windows read ahead by a prefetcher are reused"""
+    return window_cache.get(*envelope_request(time_series, istart, istop, columns))
+
+
 def show_timeseries(node, **kwargs):
     if len(node.data.shape) == 1:
         return SingleTracePlotlyWidget(node, **kwargs)
@@ -184,6 +230,7 @@ class AbstractTraceWidget(widgets.VBox):
         self.foreign_time_window_controller = foreign_time_window_controller
         self.controls = {}
         self.out_fig = None
+        self.loading = LoadingStatus()
 
         if foreign_time_window_controller is None:
             tmin = get_timeseries_mint(timeseries)
@@ -217,9 +264,9 @@ class SingleTraceWidget(AbstractTraceWidget):
 
     def set_children(self):
         if self.foreign_time_window_controller:
-            self.children = [self.out_fig]
+            self.children = [self.loading, self.out_fig]
         else:
-            self.children = [self.time_window_controller, self.out_fig]
+            self.children = [self.time_window_controller, self.loading, self.out_fig]
 
 
 class SingleTracePlotlyWidget(SingleTraceWidget):
@@ -236,12 +283,12 @@ class SingleTracePlotlyWidget(SingleTraceWidget):
 
         istart = timeseries_time_to_ind(timeseries, time_window[0])
         istop = timeseries_time_to_ind(timeseries, time_window[1])
-        yy, units = get_timeseries_in_units(timeseries, istart, istop)
+        tt, yy, units = read_envelope(timeseries, istart, istop)
 
         self.out_fig = go.FigureWidget(
             data=go.Scatter(
-                x=get_timeseries_tt(timeseries, istart, istop),
-                y=list(yy)
+                x=as_typed_array(tt),
+                y=as_typed_array(yy)
             )
         )
 
@@ -249,24 +296,51 @@ class SingleTracePlotlyWidget(SingleTraceWidget):
             title=timeseries.name,
             xaxis_title="time (s)",
             yaxis_title=units,
-            yaxis={"range": [min(yy), max(yy)], "autorange": False},
-            xaxis={"range": [min(self.out_fig.data[0].x), max(self.out_fig.data[0].x)], "autorange": False}
+            yaxis={"range": trace_range(timeseries, yy), "autorange": False},
+            xaxis={"range": list(time_window), "autorange": False}
         )
+        self._shown = (istart, istop)
+        self.loading.views.append(self.out_fig)
+
+        def show_range(x_range):
+            """Redraw the envelope of a time range, at finer levels as the user zooms in"""
+            istart = timeseries_time_to_ind(timeseries, x_range[0])
+            istop = timeseries_time_to_ind(timeseries, x_range[1])
+            if (istart, istop) == self._shown:
+                return None
+            self._shown = (istart, istop)
+            tt, yy, units = read_envelope(timeseries, istart, istop)
+            with self.out_fig.batch_update():
+                self.out_fig.data[0].x = as_typed_array(tt)
+                self.out_fig.data[0].y = as_typed_array(yy)
+            return yy
+
+        def update(time_window, set_layout=True):
+            yy = show_range(time_window)
+            if yy is not None and set_layout:
+                self.out_fig.update_layout(
+                    yaxis={"range": trace_range(timeseries, yy), "autorange": False},
+                    xaxis={"range": list(time_window), "autorange": False}
+                )
+
+        async def load_and_update(time_window, set_layout=True):
+            """Read the envelope off the kernel thread, keeping the previous trace greyed out meanwhile"""
+            await self.loading.load(window_cache.get, *time_window_request(timeseries, time_window))
+            update(time_window, set_layout)
+
+        def request(target, time_window, set_layout=True):
+            update_scheduler.request(
+                target, partial(load_and_update if can_load_async() else update, time_window, set_layout))
 
         def on_change(change):
-            time_window = self.controls['time_window'].value
-            istart = timeseries_time_to_ind(timeseries, time_window[0])
-            istop = timeseries_time_to_ind(timeseries, time_window[1])
-            yy, units = get_timeseries_in_units(timeseries, istart, istop)
-            self.out_fig.data[0].x = get_timeseries_tt(timeseries, istart, istop)
-            self.out_fig.data[0].y = list(yy)
+            request(self, self.controls['time_window'].value)
 
-            self.out_fig.update_layout(
-                yaxis={"range": [min(yy), max(yy)], "autorange": False},
-                xaxis={"range": [min(self.out_fig.data[0].x), max(self.out_fig.data[0].x)], "autorange": False}
-            )
+        def on_zoom(layout, x_range):
+            request(self.out_fig, x_range, set_layout=False)
 
         self.controls['time_window'].observe(on_change)
+        self.out_fig.layout.on_change(on_zoom, 'xaxis.range')
+        self.prefetcher = WindowPrefetcher(self.time_window_controller, partial(time_window_request, timeseries))
 
 
 class SeparateTracesPlotlyWidget(SingleTraceWidget):
@@ -277,46 +351,74 @@ class SeparateTracesPlotlyWidget(SingleTraceWidget):
 
         time_window = self.controls['time_window'].value
 
-        istart = timeseries_time_to_ind(timeseries, time_window[0])
-        istop = timeseries_time_to_ind(timeseries, time_window[1])
-
-        data, units = get_timeseries_in_units(timeseries, istart, istop)
-
-        tt = get_timeseries_tt(timeseries, istart, istop)
+        units = timeseries.unit if timeseries.conversion and np.isfinite(timeseries.conversion) else None
+        n_traces = timeseries.data.shape[1] if len(timeseries.data.shape) > 1 else 1
 
-        if len(data.shape) > 1:
-            self.out_fig = go.FigureWidget(make_subplots(rows=data.shape[1], cols=1))
+        if n_traces > 1:
+            self.out_fig = go.FigureWidget(make_subplots(rows=n_traces, cols=1))
 
-            for i, (yy, xyz) in enumerate(zip(data.T, ('x', 'y', 'z'))):
-                self.out_fig.add_trace(
-                    go.Scatter(x=tt, y=yy),
-                    row=i + 1, col=1)
+            for i, xyz in zip(range(n_traces), ('x', 'y', 'z')):
                 if units:
                     yaxes_label = '{} ({})'.format(xyz, units)
                 else:
                     yaxes_label = xyz
                 self.out_fig.update_yaxes(title_text=yaxes_label, row=i + 1, col=1)
-            self.out_fig.update_xaxes(title_text='time (s)', row=i + 1, col=1)
+            self.out_fig.update_xaxes(title_text='time (s)', row=n_traces, col=1)
         else:
             self.out_fig = go.FigureWidget()
-            self.out_fig.add_trace(go.Scatter(x=tt, y=data))
             self.out_fig.update_xaxes(title_text='time (s)')
 
         self.out_fig.update_layout(showlegend=False, title=timeseries.name)
 
-        def on_change(change):
-            time_window = self.controls['time_window'].value
+        n_samples = len(timeseries.data)
+
+        def segment_request(start, stop):
+            """Key and reader of samples start to stop, and the first sample of the next segment to join them, within
+            the data"""
+            istart, istop = min(int(start), n_samples), min(int(stop) + 1, n_samples)
+
+            def load():
+                data, _ = get_timeseries_in_units(timeseries, istart, istop)
+                return get_timeseries_tt(timeseries, istart, istop), data.reshape(len(data), -1)
+            return ('segment', timeseries, istart, istop), load
+
+        def load_segments(segments):
+            for i, segment in enumerate(segments):
+                window_cache.get(*segment_request(*segment))
+                report_progress(i + 1, len(segments))
+
+        def make_segment(start, stop):
+            tt, data = window_cache.get(*segment_request(start, stop))
+            if not len(tt):
+                return []  # past the end of the data
+            tt = as_typed_array(tt)
+            colors = plotly_colors.qualitative.Plotly
+            return [(go.Scatter(x=tt, y=as_typed_array(data[:, i]), line_color=colors[i % len(colors)],
+                                xaxis='x{}'.format(i + 1 if i else ''), yaxis='y{}'.format(i + 1 if i else '')),
+                     None) for i in range(n_traces)]
+
+        # shifting the window adds and removes segments instead of sending the whole window again
+        self.segments = SegmentedTraces(self.out_fig, make_segment, min_size=1)
+        self.loading.views.append(self.out_fig)
+
+        def show_window(time_window):
             istart = timeseries_time_to_ind(timeseries, time_window[0])
             istop = timeseries_time_to_ind(timeseries, time_window[1])
+            self.segments.show(istart, istop)
+            self.out_fig.update_xaxes(range=list(time_window), autorange=False)
 
-            tt = get_timeseries_tt(timeseries, istart, istop)
-            yy, units = get_timeseries_in_units(timeseries, istart, istop)
+        async def load_and_show(time_window):
+            """Read the segments that the window adds off the kernel thread, then show it"""
+            istart = timeseries_time_to_ind(timeseries, time_window[0])
+            istop = timeseries_time_to_ind(timeseries, time_window[1])
+            await self.loading.load(load_segments, self.segments.missing(istart, istop))
+            show_window(time_window)
 
-            with self.out_fig.batch_update():
-                for i, dd in enumerate(yy.T):
-                    self.out_fig.data[i].x = tt
-                    self.out_fig.data[i].y = dd
+        def on_change(change):
+            update_scheduler.request(
+                self, partial(load_and_show if can_load_async() else show_window, self.controls['time_window'].value))
 
+        show_window(time_window)
         self.controls['time_window'].observe(on_change)
 
 
@@ -340,17 +442,14 @@ def _prep_timeseries(time_series: TimeSeries, time_window=None, order=None):
         t_ind_start = timeseries_time_to_ind(time_series, time_window[0])
         t_ind_stop = timeseries_time_to_ind(time_series, time_window[1])
 
-    tt = get_timeseries_tt(time_series, t_ind_start, t_ind_stop)
-
-    unique_sorted_order, inverse_sort = np.unique(order, return_inverse=True)
-
+    # long windows are drawn from the min/max envelope of the data
     if len(time_series.data.shape) > 1:
-        mini_data = time_series.data[t_ind_start:t_ind_stop, unique_sorted_order][:, inverse_sort]
-        gap = np.median(np.nanstd(mini_data, axis=0)) * 20
+        tt, mini_data, unit = read_envelope(time_series, t_ind_start, t_ind_stop, columns=order)
+        gap = trace_gap(time_series, order, mini_data)
         offsets = np.arange(len(order)) * gap
         mini_data = mini_data + offsets
     else:
-        mini_data = time_series.data[t_ind_start:t_ind_stop]
+        tt, mini_data, unit = read_envelope(time_series, t_ind_start, t_ind_stop)
         offsets = [0]
 
     return mini_data, tt, offsets
@@ -403,14 +502,16 @@ def plot_grouped_traces_plotly(time_series: TimeSeries, time_window, order, grou
 
     if fig is None:
         fig = go.FigureWidget()
+    # many channels are drawn as one WebGL trace per group
+    single_trace = len(order) > plotly_utils.single_trace_threshold
     if group_inds is not None:
         ugroup_inds = np.unique(group_inds)
         for igroup, ui in enumerate(ugroup_inds[::-1]):
             color = colors[ugroup_inds[::-1][igroup] % len(colors)]
             group_data = mini_data[:, group_inds == ui].T
-            multi_trace(tt, group_data, color, labels[ui], fig=fig)
+            multi_trace(tt, group_data, color, labels[ui], fig=fig, single_trace=single_trace)
     else:
-        multi_trace(tt, mini_data.T, 'black', fig=fig)
+        multi_trace(tt, mini_data.T, 'black', fig=fig, single_trace=single_trace)
     fig.update_layout(
         title=time_series.name,
         xaxis_title="time (s)")
@@ -469,15 +570,27 @@ class BaseGroupedTraceWidget(widgets.HBox):
             self.gas = foreign_group_and_sort_controller
             self.controls.update(gas=self.gas)
 
-        # Sets up interactive output controller
-        out_fig = interactive_output(mpl_plotter, self.controls)
+        # Sets up interactive output controller. New windows are read off the kernel thread, with their progress shown
+        self.loading = LoadingStatus()
+        out_fig = interactive_output(mpl_plotter, self.controls, load=self.load_window, status=self.loading)
+
+        # read the windows that paging in time or through the channels leads to in the background
+        self.prefetchers = [WindowPrefetcher(
+            self.time_window_controller,
+            lambda time_window: time_window_request(time_series, time_window, self.columns()))]
+        if self.gas is not None and isinstance(self.gas.range_controller, RangeController):
+            self.prefetchers.append(WindowPrefetcher(
+                self.gas.range_controller,
+                lambda window: time_window_request(time_series, self.time_window_controller.value,
+                                                   self.columns(self.gas.window_order(window)))))
 
         if foreign_time_window_controller:
-            right_panel = out_fig
+            right_panel = widgets.VBox(children=[self.loading, out_fig], layout=widgets.Layout(width="100%"))
         else:
             right_panel = widgets.VBox(
                 children=[
                     self.time_window_controller,
+                    self.loading,
                     out_fig,
                 ],
                 layout=widgets.Layout(width="100%")
@@ -494,6 +607,166 @@ class BaseGroupedTraceWidget(widgets.HBox):
 
         self.layout = widgets.Layout(width="100%")
 
+    def columns(self, order=None):
+        """Channels read for an order of the group and sort controller, the shown order by default"""
+        if len(self.time_series.data.shape) == 1:
+            return None
+        if order is not None:
+            return order
+        if self.gas is None:
+            return np.arange(self.time_series.data.shape[1])
+        return self.gas.value['order']
+
+    def load_window(self, time_window=None, order=None, **kwargs):
+        """Read the window that `mpl_plotter` draws into `window_cache`"""
+        if time_window is not None:
+            window_cache.get(*time_window_request(self.time_series, time_window, self.columns(order)))
+
+
+def trials_request(time_series: TimeSeries, trials, start_label='start_time', before=.5, after=1., channel=0,
+                   max_samples=1000):
+    """Key and reader of a channel aligned to every trial, for `window_cache`
+
+    Windows longer than `max_samples` samples keep every n-th sample.
+    """
+    n_samples = (before + after) * get_sampling_rate(time_series)
+    step = max(int(np.ceil(n_samples / max_samples)), 1)
+    key = ('trials', time_series, trials.object_id, start_label, before, after, channel, step)
+    columns = [channel] if len(time_series.data.shape) > 1 else None
+    return key, partial(align_samples, time_series, trials[start_label][:], before, after, columns, step)
+
+
+def plot_trial_average(time_series: TimeSeries, trials, channel=0, start_label='start_time', before=.5, after=1.,
+                       order=None, group_inds=None, labels=None, colors=color_wheel, figsize=(7, 7),
+                       align_line_color=(.7, .7, .7), **kwargs):
+    """
+    Heatmap of a channel in every trial, and its trial average per group, with 2 standard errors
+
+    Parameters
+    ----------
+    time_series: pynwb.TimeSeries
+    trials: pynwb.epoch.TimeIntervals
+    channel: int, optional
+    start_label: str, optional
+        trial column to align to
+    before: float, optional
+        seconds before the event
+    after: float, optional
+        seconds after the event
+    order: array-like, optional
+        trials to show, in this order
+    group_inds: array-like, optional
+        group of each trial of `order`
+    labels: array-like, optional
+        label of each group
+    colors: array-like, optional
+    figsize: tuple, optional
+    align_line_color: array-like, optional
+
+    Returns
+    -------
+    matplotlib.Figure
+    """
+    data, tt, unit = window_cache.get(*trials_request(time_series, trials, start_label, before, after, channel))
+    data = data[:, :, 0]
+    if order is not None:
+        data = data[np.asarray(order, dtype=int)]
+    if group_inds is None:
+        group_inds = np.zeros(len(data), dtype=int)
+
+    fig, axs = plt.subplots(2, 1, figsize=figsize, sharex=True)
+    if not len(data) or not len(tt):
+        return fig
+
+    # one image for all the trials, so that thousands of them draw as fast as a few
+    vmin, vmax = np.nanpercentile(data, [1, 99]) if np.isfinite(data).any() else (None, None)
+    image = axs[0].imshow(data, aspect='auto', interpolation='nearest', cmap='viridis', vmin=vmin, vmax=vmax,
+                          extent=[tt[0], tt[-1], len(data), 0])
+    fig.colorbar(image, ax=axs[0], label=unit)
+    axs[0].set_ylabel('trials')
+
+    for group in np.unique(group_inds):
+        group_data = data[group_inds == group]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(group_data, axis=0)
+            err = np.nanstd(group_data, axis=0) / np.sqrt(np.sum(np.isfinite(group_data), axis=0))
+        color = colors[group % len(colors)]
+        label = labels[group] if labels is not None else None
+        axs[1].plot(tt, mean, color=color, label=label)
+        axs[1].fill_between(tt, mean - 2 * err, mean + 2 * err, alpha=.2, color=color)
+    if labels is not None:
+        axs[1].legend(loc='upper right')
+    axs[1].set_ylabel(unit)
+    axs[1].set_xlabel('time (s)')
+    axs[1].set_xlim([-before, after])
+    for ax in axs:
+        ax.axvline(color=align_line_color)
+    return fig
+
+
+class TrialAverageWidget(widgets.VBox):
+    """Trial-aligned heatmap and average of a channel of a TimeSeries, e.g. an ERP
+
+    All the trials are aligned at once by `align_samples`, and kept in `window_cache`, so that grouping, sorting and
+    selecting trials redraws without reading again.
+    """
+
+    def __init__(self, time_series: TimeSeries, trials: pynwb.epoch.TimeIntervals = None, channel=0, **kwargs):
+        super().__init__()
+        self.time_series = time_series
+
+        if trials is None:
+            self.trials = self.get_trials()
+            if self.trials is None:
+                self.children = [widgets.HTML('No trials present')]
+                return
+        else:
+            self.trials = trials
+
+        n_channels = time_series.data.shape[1] if len(time_series.data.shape) > 1 else 1
+        channel_controller = widgets.Dropdown(options=range(n_channels), value=channel, description='channel',
+                                              layout=widgets.Layout(width='200px'))
+        trial_event_controller = make_trial_event_controller(self.trials, layout=widgets.Layout(width='200px'))
+        before_ft = widgets.FloatText(.5, description='before (s)', layout=widgets.Layout(width='200px'))
+        after_ft = widgets.FloatText(1., description='after (s)', layout=widgets.Layout(width='200px'))
+
+        self.gas = GroupAndSortController(self.trials, window=False, control_order=False)
+
+        self.controls = dict(
+            time_series=fixed(time_series),
+            trials=fixed(self.trials),
+            channel=channel_controller,
+            start_label=trial_event_controller,
+            before=before_ft,
+            after=after_ft,
+            gas=self.gas,
+        )
+
+        self.loading = LoadingStatus()
+        out_fig = interactive_output(plot_trial_average, self.controls, load=self.load_trials, status=self.loading)
+
+        self.children = [
+            widgets.HBox([
+                self.gas,
+                widgets.VBox([
+                    channel_controller,
+                    trial_event_controller,
+                    before_ft,
+                    after_ft,
+                ])
+            ]),
+            self.loading,
+            out_fig
+        ]
+
+    def get_trials(self):
+        nwbfile = self.time_series.get_ancestor('NWBFile')
+        return None if nwbfile is None else nwbfile.trials
+
+    def load_trials(self, time_series, trials, channel=0, start_label='start_time', before=.5, after=1., **kwargs):
+        """Align the trials that `plot_trial_average` draws into `window_cache`"""
+        window_cache.get(*trials_request(time_series, trials, start_label, before, after, channel))
+
 
 class MultiTimeSeriesWidget(widgets.VBox):
 
@@ -0,0 +1,62 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+
+# a context variable rather than a thread-local, so that the token follows updates into the asyncio tasks they start
+_current_token = contextvars.ContextVar('nwbwidgets_cancel_token', default=None)
+
+
+class UpdateCancelled(Exception):
+    """Raised by `check_cancelled` in work that has been superseded"""
+
+
+class CancelToken:
+    """Flag that tells the work of a superseded update or prefetch to stop
+
+    Work runs with a token made current by `active`, and long reads call `check_cancelled` between blocks, and
+    `report_progress` to let a view show how far they are.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.on_progress = None  # callable (done, total), called from the thread doing the work
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    @contextmanager
+    def active(self):
+        """Make this the token of the current context"""
+        reset = _current_token.set(self)
+        try:
+            yield self
+        finally:
+            _current_token.reset(reset)
+
+    def run(self, func, *args, **kwargs):
+        """Call a function with this token active, e.g. on an executor"""
+        with self.active():
+            return func(*args, **kwargs)
+
+
+def current_token():
+    """The token of the work running in this context, or None"""
+    return _current_token.get()
+
+
+def check_cancelled():
+    """Raise `UpdateCancelled` if the work running in this context has been superseded"""
+    token = _current_token.get()
+    if token is not None and token.cancelled:
+        raise UpdateCancelled()
+
+
+def report_progress(done, total):
+    """Report that `done` of `total` steps of the work running in this context are complete"""
+    token = _current_token.get()
+    if token is not None and token.on_progress is not None:
+        token.on_progress(done, total)
@@ -0,0 +1,140 @@
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pynwb import TimeSeries
+
+from .timeseries import convert_to_units
+
+# series larger than this are summarized on a background thread, and callers use the current window until it is done.
+# Smaller series are read in full on the calling thread, which takes well under a second from a local disk.
+background_threshold_bytes = 2 ** 24
+
+# bytes of raw data read per block
+block_bytes = 2 ** 25
+
+_executor = None
+_channel_stats = dict()  # id(TimeSeries) -> ChannelStats
+
+
+class ChannelStats:
+    """Streaming per-channel statistics of a series: count, mean, std, min, max and quantiles
+
+    Blocks of rows are merged in one pass (Chan et al.'s parallel variance update), ignoring NaNs. Quantiles are
+    estimated from a strided sample of at most `max_sample_rows` rows, which stands in for a quantile sketch.
+    """
+
+    def __init__(self, n_channels, max_sample_rows=10000):
+        self.count = np.zeros(n_channels)
+        self.mean = np.zeros(n_channels)
+        self._m2 = np.zeros(n_channels)
+        self.min = np.full(n_channels, np.inf)
+        self.max = np.full(n_channels, -np.inf)
+        self.max_sample_rows = max_sample_rows
+        self._samples = []
+        self.complete = False
+        self.future = None
+
+    @property
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self._m2 / self.count)
+
+    def update(self, block, sample_step=1, sample_start=0):
+        """Merge a block of rows
+
+        Parameters
+        ----------
+        block: numpy.ndarray
+            (n_rows, n_channels)
+        sample_step: int, optional
+            every `sample_step`-th row of the block, from `sample_start`, is kept for the quantiles
+        sample_start: int, optional
+        """
+        valid = ~np.isnan(block)
+        count = valid.sum(axis=0)
+        filled = np.where(valid, block, 0.)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = filled.sum(axis=0) / count
+            m2 = (np.where(valid, block - mean, 0.) ** 2).sum(axis=0)
+        has_data = count > 0
+        total = self.count + count
+        delta = np.where(has_data, mean - self.mean, 0.)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(has_data, count / total, 0.)
+        self.mean = self.mean + delta * weight
+        self._m2 = self._m2 + np.where(has_data, m2, 0.) + delta ** 2 * self.count * weight
+        self.count = total
+        if len(block):
+            self.min = np.minimum(self.min, np.where(valid, block, np.inf).min(axis=0))
+            self.max = np.maximum(self.max, np.where(valid, block, -np.inf).max(axis=0))
+            self._samples.append(np.asarray(block[sample_start::sample_step], dtype=np.float32))
+
+    def quantile(self, q, columns=None) -> np.ndarray:
+        """Estimated quantiles of each channel, or of the given columns"""
+        sample = np.concatenate(self._samples) if self._samples else np.full((1, len(self.count)), np.nan)
+        if columns is not None:
+            sample = sample[:, columns]
+        return np.nanquantile(sample, q, axis=0)
+
+    def robust_range(self, columns=None, q=.0005, margin=.05) -> list:
+        """[low, high] y-range that holds all but the `q` most extreme values of the given channels at each end"""
+        low = np.nanmin(self.quantile(q, columns))
+        high = np.nanmax(self.quantile(1 - q, columns))
+        pad = (high - low) * margin
+        return [float(low - pad), float(high + pad)]
+
+
+def _as_array(data):
+    return data if hasattr(data, 'shape') else np.asarray(data)
+
+
+def compute_channel_stats(node: TimeSeries, stats: ChannelStats = None) -> ChannelStats:
+    """Statistics of the data of a TimeSeries in its units, computed in blocks over the whole series"""
+    data = _as_array(node.data)
+    n = data.shape[0]
+    n_channels = int(np.prod(data.shape[1:]))
+    if stats is None:
+        stats = ChannelStats(n_channels)
+    row_bytes = max(n_channels * np.dtype(data.dtype).itemsize, 1)
+    block_rows = max(block_bytes // row_bytes, 1)
+    sample_step = max(n // stats.max_sample_rows, 1)
+    for start in range(0, n, block_rows):
+        block, unit = convert_to_units(node, data[start:start + block_rows], dtype=np.float64)
+        block = np.asarray(block, dtype=float).reshape(-1, n_channels)
+        stats.update(block, sample_step, (-start) % sample_step)
+    stats.complete = True
+    return stats
+
+
+def get_channel_stats(node: TimeSeries, background=None) -> ChannelStats:
+    """
+    Cached statistics of a TimeSeries, computed on first use
+
+    Parameters
+    ----------
+    node: pynwb.TimeSeries
+    background: bool, optional
+        compute on a background thread. Default is to do so for series larger than `background_threshold_bytes`.
+
+    Returns
+    -------
+    ChannelStats
+        check `complete` before using it
+    """
+    global _executor
+    stats = _channel_stats.get(id(node))
+    if stats is not None:
+        return stats
+    data = _as_array(node.data)
+    stats = _channel_stats[id(node)] = ChannelStats(int(np.prod(data.shape[1:])))
+    weakref.finalize(node, _channel_stats.pop, id(node), None)
+    if background is None:
+        background = np.prod(data.shape) * np.dtype(data.dtype).itemsize > background_threshold_bytes
+    if background:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='channel_stats')
+        stats.future = _executor.submit(compute_channel_stats, node, stats)
+    else:
+        compute_channel_stats(node, stats)
+    return stats
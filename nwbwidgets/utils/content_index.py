@@ -0,0 +1,185 @@
+import weakref
+from collections.abc import Mapping
+
+import h5py
+import numpy as np
+import pandas as pd
+
+_indices = weakref.WeakKeyDictionary()  # root container -> ContentIndex
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def build_content_index(h5file: h5py.File) -> pd.DataFrame:
+    """Describe every group and dataset of an HDF5 file without reading any data
+
+    Parameters
+    ----------
+    h5file: h5py.File
+
+    Returns
+    -------
+    pandas.DataFrame
+        indexed by HDF5 path, with columns parent, kind ('group' or 'dataset'), neurodata_type, object_id,
+        description, shape, dtype, chunks, compression, storage_size (bytes on disk), and the aggregates
+        n_objects (typed objects in the subtree, including the object itself) and total_size (storage size of the
+        subtree)
+    """
+    rows = []
+
+    def visit(name, obj):
+        attrs = obj.attrs
+        row = dict(
+            path='/' + name,
+            parent='/' + name.rpartition('/')[0],
+            neurodata_type=_decode(attrs.get('neurodata_type')),
+            object_id=_decode(attrs.get('object_id')),
+            description=_decode(attrs.get('description')),
+        )
+        if isinstance(obj, h5py.Dataset):
+            row.update(kind='dataset', shape=obj.shape, dtype=str(obj.dtype), chunks=obj.chunks,
+                       compression=obj.compression, storage_size=obj.id.get_storage_size())
+        else:
+            row.update(kind='group', storage_size=0)
+        rows.append(row)
+
+    h5file.visititems(visit)
+    columns = ['path', 'parent', 'kind', 'neurodata_type', 'object_id', 'description', 'shape', 'dtype', 'chunks',
+               'compression', 'storage_size']
+    df = pd.DataFrame(rows, columns=columns).set_index('path')
+
+    # aggregate sizes and counts up the tree in one pass, deepest paths first
+    n_objects = dict.fromkeys(df.index, 0)
+    total_size = dict.fromkeys(df.index, 0)
+    n_objects['/'] = total_size['/'] = 0
+    ordered = df.iloc[np.argsort(-df.index.str.count('/'), kind='stable')]
+    for path, parent, neurodata_type, storage_size in zip(ordered.index, ordered['parent'], ordered['neurodata_type'],
+                                                          ordered['storage_size']):
+        n_objects[path] += int(pd.notnull(neurodata_type))
+        total_size[path] += int(storage_size)
+        n_objects[parent] += n_objects[path]
+        total_size[parent] += total_size[path]
+    df['n_objects'] = pd.Series(n_objects)
+    df['total_size'] = pd.Series(total_size)
+    return df
+
+
+def format_bytes(nbytes) -> str:
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if nbytes < 1000:
+            break
+        nbytes /= 1000
+    else:
+        unit = 'TB'
+    return '{:.0f} {}'.format(nbytes, unit) if unit == 'B' else '{:.1f} {}'.format(nbytes, unit)
+
+
+class ContentIndex:
+    """Metadata-only index of the objects of an NWB file
+
+    The index is built in one pass over the HDF5 file and records, for each group and dataset, its neurodata type,
+    HDF5 path, shape, dtype, chunking, compression and storage size. The file browser labels and filters its entries
+    from the index, so opening it does not touch the objects themselves.
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        """
+        Parameters
+        ----------
+        table: pandas.DataFrame
+            output of `build_content_index`
+        """
+        self.table = table
+        ids = table['object_id'].dropna()
+        self._paths = dict(zip(ids.to_numpy(), ids.index))
+        # lookups per path, so that summarizing a group costs one lookup per item rather than a scan of the table
+        self._sizes = dict(zip(table.index, zip(table['n_objects'].to_numpy(), table['total_size'].to_numpy())))
+        self._children = {parent: rows.index for parent, rows in table.groupby('parent', sort=False)}
+
+    def path_of(self, node):
+        """HDF5 path of a container, or None if it is not in the index"""
+        return self._paths.get(getattr(node, 'object_id', None))
+
+    def children(self, path) -> pd.DataFrame:
+        return self.table.loc[self._children.get(path, [])]
+
+    def summarize(self, value):
+        """Size of a field value from the index
+
+        Parameters
+        ----------
+        value: container, or dict of containers (e.g. NWBFile.acquisition)
+
+        Returns
+        -------
+        dict or None
+            n_objects and total_size, or None if the value is not in the index
+        """
+        items = value.values() if isinstance(value, Mapping) else [value]
+        n_objects = total_size = 0
+        for item in items:
+            sizes = self._sizes.get(self.path_of(item))
+            if sizes is None:
+                return None
+            n_objects += int(sizes[0])
+            total_size += int(sizes[1])
+        return dict(n_objects=n_objects, total_size=total_size)
+
+    @staticmethod
+    def size_label(summary) -> str:
+        """Size of a field for its accordion label, e.g. '12 objects, 3.2 GB'"""
+        if summary['n_objects'] > 1:
+            return '{} objects, {}'.format(summary['n_objects'], format_bytes(summary['total_size']))
+        return format_bytes(summary['total_size'])
+
+
+def _open_file(root):
+    """The h5py.File that the IO which read a container has open, found through the datasets it read, or None"""
+    h5file = getattr(getattr(root, 'read_io', None), '_file', None)
+    if h5file is not None:
+        return h5file
+    stack = [root]
+    while stack:
+        container = stack.pop()
+        for value in container.fields.values():
+            if isinstance(value, (h5py.Dataset, h5py.Group)):
+                return value.file
+        stack.extend(container.children)
+    return None
+
+
+def get_content_index(node):
+    """Content index of the file a container was read from, built once per file on first use
+
+    The index is read through the file handle of the IO, rather than by opening the file again.
+
+    Parameters
+    ----------
+    node: NWB container
+
+    Returns
+    -------
+    ContentIndex or None
+        None for containers that were not read from an HDF5 file
+    """
+    root = node
+    while getattr(root, 'parent', None) is not None:
+        root = root.parent
+    if getattr(root, 'container_source', None) is None:
+        return None
+    try:
+        return _indices[root]
+    except KeyError:
+        pass
+    h5file = _open_file(root)
+    try:
+        index = None if h5file is None else ContentIndex(build_content_index(h5file))
+    except (OSError, ValueError):
+        # e.g. files that have been closed
+        index = None
+    _indices[root] = index
+    return index
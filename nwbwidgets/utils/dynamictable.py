@@ -1,5 +1,14 @@
-from pynwb.core import DynamicTable
+import weakref
+from collections import OrderedDict
+from functools import reduce
+
+import h5py
 import numpy as np
+import pandas as pd
+from hdmf.common.table import VectorIndex, DynamicTableRegion
+from hdmf.container import AbstractContainer
+from hdmf.query import ReferenceResolver
+from pynwb.core import DynamicTable
 
 
 def infer_categorical_columns(dynamic_table: DynamicTable):
@@ -95,3 +104,193 @@ def group_and_sort(group_vals=None, group_select=None, order_vals=None, discard_
             order = order[:limit]
 
     return order, group_inds, labels
+
+
+def column_kind(dynamic_table: DynamicTable, name: str) -> str:
+    """'ragged' for indexed columns, 'array' for columns with more than one dimension, 'region' for rows of another
+    table, 'reference' for references to containers, 'scalar' otherwise"""
+    column = dynamic_table[name]
+    if isinstance(column, VectorIndex):
+        return 'ragged'
+    if isinstance(column, DynamicTableRegion):
+        return 'region'
+    if len(column.shape) > 1:
+        return 'array'
+    if isinstance(column.data, ReferenceResolver) or (
+            not hasattr(column.data, 'dtype') and len(column.data) and isinstance(column.data[0], AbstractContainer)):
+        return 'reference'
+    return 'scalar'
+
+
+def take_rows(data, rows):
+    """Read the elements of a column at the given rows, in any order
+
+    An h5py dataset is read with a single selection: a slice if the rows are contiguous, otherwise the sorted rows.
+
+    Parameters
+    ----------
+    data: h5py.Dataset, numpy.ndarray or list
+    rows: array-like of int
+        unique row indices
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    rows = np.asarray(rows, dtype=int)
+    if isinstance(data, np.ndarray):
+        return data[rows]
+    if not isinstance(data, h5py.Dataset):
+        return np.asarray([data[row] for row in rows])
+    if not len(rows):
+        return data[:0]
+    if np.all(np.diff(rows) == 1):
+        return data[rows[0]:rows[-1] + 1]
+    order = np.argsort(rows)
+    values = data[rows[order]]
+    out = np.empty_like(values)
+    out[order] = values
+    return out
+
+
+def ragged_lengths(index: VectorIndex, rows):
+    """Number of elements of a ragged column at the given rows, read from the index only"""
+    rows = np.asarray(rows, dtype=int)
+    needed = np.union1d(rows, rows[rows > 0] - 1)
+    ends = dict(zip(needed, take_rows(index.data, needed)))
+    ends[-1] = 0
+    return np.array([ends[row] - ends[row - 1] for row in rows], dtype=int)
+
+
+def _dtype(data):
+    if hasattr(data, 'dtype'):
+        return data.dtype
+    return np.asarray(data[0]).dtype if len(data) else None
+
+
+def read_rows(dynamic_table: DynamicTable, rows) -> pd.DataFrame:
+    """Read some rows of a DynamicTable without materializing the whole table
+
+    Scalar columns are read at the given rows. Ragged and array columns are summarized by their length or shape and
+    dtype, which only reads the index of ragged columns. Regions are shown as the referenced row of their table, e.g.
+    'electrodes[3]', and references by the name of the container they point to.
+
+    Parameters
+    ----------
+    dynamic_table: DynamicTable
+    rows: array-like of int
+        unique row indices, in the order they should be returned
+
+    Returns
+    -------
+    pandas.DataFrame
+        indexed by the ids of the rows
+    """
+    rows = np.asarray(rows, dtype=int)
+    columns = OrderedDict()
+    for name in dynamic_table.colnames:
+        column = dynamic_table[name]
+        kind = column_kind(dynamic_table, name)
+        if kind == 'ragged':
+            target = column.target
+            while isinstance(target, VectorIndex):
+                target = target.target
+            dtype = _dtype(target.data)
+            columns[name] = ['[{} x {}]'.format(n, dtype) for n in ragged_lengths(column, rows)]
+        elif kind == 'array':
+            columns[name] = ['[{} {}]'.format(' x '.join(map(str, column.shape[1:])), _dtype(column.data))] * len(rows)
+        elif kind == 'region':
+            columns[name] = ['{}[{}]'.format(column.table.name, row) for row in take_rows(column.data, rows)]
+        elif kind == 'reference':
+            columns[name] = [getattr(column.data[row], 'name', None) for row in rows]
+        else:
+            values = take_rows(column.data, rows)
+            if values.dtype == object:
+                values = [value.decode() if isinstance(value, bytes) else value for value in values]
+            columns[name] = values
+    return pd.DataFrame(columns, index=pd.Index(take_rows(dynamic_table.id.data, rows), name='id'))
+
+
+def sort_rows(dynamic_table: DynamicTable, name: str, descending=False) -> np.ndarray:
+    """Row order that sorts a table by one of its scalar columns, reading only that column"""
+    values = np.asarray(dynamic_table[name].data[:])
+    order = np.argsort(values, kind='stable')
+    if descending:
+        order = order[::-1]
+    return order
+
+
+def format_hover_column(name: str, values):
+    """Format one column of hover text at once
+
+    Floats get 3 decimals, and numbers larger than 1e5 scientific notation. Strings and integers are shown as they
+    are. Columns of other objects (e.g. references to containers) are skipped.
+
+    Parameters
+    ----------
+    name: str
+    values: array-like
+
+    Returns
+    -------
+    numpy.ndarray of str or None
+        'name: value' for each row, None if the column cannot be shown
+    """
+    values = np.asarray(values)
+    if values.ndim != 1:
+        return None
+    if values.dtype.kind in 'iuf':
+        text = np.char.mod('%.3f' if values.dtype.kind == 'f' else '%d', values)
+        large = np.abs(values) > 1e5
+        if np.any(large):
+            text = np.where(large, np.char.mod('%.2e', values.astype(float)), text)
+    elif values.dtype.kind in 'bU':
+        text = values.astype(str)
+    elif values.dtype.kind == 'S':
+        text = np.char.decode(values)
+    elif values.dtype.kind == 'O' and all(isinstance(value, (str, bytes)) for value in values):
+        text = np.array([value.decode() if isinstance(value, bytes) else value for value in values], dtype=str)
+    else:
+        return None
+    return np.char.add(name + ': ', text.astype(str))
+
+
+def join_hover_columns(columns, n_rows: int) -> list:
+    """Join formatted columns into one hover text per row"""
+    columns = [column for column in columns if column is not None]
+    if not columns:
+        return [''] * n_rows
+    return list(reduce(lambda text, column: np.char.add(np.char.add(text, '<br>'), column), columns))
+
+
+# id(DynamicTable) -> {(n_rows, exclude): hover text}. Tables are not hashable, so entries are keyed by id and
+# removed when the table is garbage collected.
+_hover_text_cache = dict()
+
+
+def dynamic_table_hover_text(dynamic_table: DynamicTable, exclude=()) -> list:
+    """Hover text of each row of a DynamicTable, made from its scalar columns
+
+    Only the scalar columns are read; ragged and multi-dimensional columns (e.g. image_mask, spike_times) are skipped.
+    The result is cached per table.
+
+    Parameters
+    ----------
+    dynamic_table: DynamicTable
+    exclude: iterable of str, optional
+        names of columns to leave out
+
+    Returns
+    -------
+    list of str
+    """
+    key = (len(dynamic_table), tuple(exclude))
+    if id(dynamic_table) not in _hover_text_cache:
+        _hover_text_cache[id(dynamic_table)] = dict()
+        weakref.finalize(dynamic_table, _hover_text_cache.pop, id(dynamic_table), None)
+    cache = _hover_text_cache[id(dynamic_table)]
+    if key not in cache:
+        columns = [format_hover_column(name, dynamic_table[name].data[:]) for name in dynamic_table.colnames
+                   if name not in exclude and column_kind(dynamic_table, name) in ('scalar', 'region')]
+        cache[key] = join_hover_columns(columns, len(dynamic_table))
+    return cache[key]
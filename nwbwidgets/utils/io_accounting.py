@@ -0,0 +1,199 @@
+import sys
+import threading
+from collections import defaultdict
+
+import h5py
+import numpy as np
+import pandas as pd
+from hdmf.container import AbstractContainer
+from ipywidgets import Widget
+
+# modules whose frames are skipped when looking for the code that issued a read
+_LIBRARY_PREFIXES = ('h5py', 'hdmf', 'pynwb', 'numpy', 'pandas', 'bisect', 'nwbwidgets.utils.io_accounting')
+
+
+def count_chunks(shape, chunks, args):
+    """Number of chunks touched by a selection
+
+    Parameters
+    ----------
+    shape: tuple
+    chunks: tuple or None
+        chunk shape of the dataset, None if it is contiguous
+    args: selection passed to `Dataset.__getitem__`
+
+    Returns
+    -------
+    int or None
+        None if the dataset is not chunked or the selection is not understood (e.g. a field name)
+    """
+    if chunks is None:
+        return None
+    if not isinstance(args, tuple):
+        args = (args,)
+    if any(arg is Ellipsis for arg in args):
+        i = next(i for i, arg in enumerate(args) if arg is Ellipsis)
+        args = args[:i] + (slice(None),) * (len(shape) - len(args) + 1) + args[i + 1:]
+    args = args + (slice(None),) * (len(shape) - len(args))
+    if len(args) != len(shape):
+        return None
+    n_chunks = 1
+    for arg, size, chunk in zip(args, shape, chunks):
+        if isinstance(arg, slice):
+            start, stop, step = arg.indices(size)
+            if stop <= start:
+                return 0
+            if step == 1:
+                n_chunks *= (stop - 1) // chunk - start // chunk + 1
+            else:
+                n_chunks *= len(np.unique(np.arange(start, stop, step) // chunk))
+        elif isinstance(arg, (int, np.integer)):
+            continue
+        elif isinstance(arg, (list, np.ndarray)):
+            arg = np.asarray(arg)
+            if arg.dtype == bool:
+                arg = np.flatnonzero(arg)
+            if arg.dtype.kind not in 'iu':
+                return None
+            n_chunks *= len(np.unique(np.where(arg < 0, arg + size, arg) // chunk))
+        else:
+            return None
+    return n_chunks
+
+
+def find_caller():
+    """Find the widget and the function that issued a read
+
+    Returns
+    -------
+    widget: str or None
+        class name of the nearest widget on the call stack
+    caller: str or None
+        'module.function' of the first frame outside of the I/O libraries
+    """
+    widget = caller = None
+    frame = sys._getframe(2)
+    while frame is not None and widget is None:
+        module = frame.f_globals.get('__name__', '')
+        if caller is None and not module.startswith(_LIBRARY_PREFIXES):
+            caller = '{}.{}'.format(module, frame.f_code.co_name)
+        obj = frame.f_locals.get('self')
+        if isinstance(obj, Widget):
+            widget = type(obj).__name__
+        frame = frame.f_back
+    return widget, caller
+
+
+class AccountedDataset(h5py.Dataset):
+    """h5py.Dataset that reports each read to an `IOAccounting`
+
+    Tracked datasets are switched to this class in place, so they remain `h5py.Dataset` instances for the code that
+    reads them and for the type dispatch of `nwb2widget`.
+    """
+
+    def __getitem__(self, args, *more_args, **kwargs):
+        out = super().__getitem__(args, *more_args, **kwargs)
+        self._io_accounting.record(self, args, out)
+        return out
+
+    def read_direct(self, dest, source_sel=None, dest_sel=None):
+        super().read_direct(dest, source_sel, dest_sel)
+        self._io_accounting.record(self, Ellipsis if source_sel is None else source_sel,
+                                   dest if dest_sel is None else dest[dest_sel])
+
+
+class IOAccounting:
+    """Count the reads of the datasets of an NWB file
+
+    Every read of a tracked dataset is counted with the number of elements and bytes returned and the number of chunks
+    touched, and is attributed to the dataset, the nearest widget on the call stack and the first function outside of
+    the I/O libraries that issued it. This finds access patterns like a bisect over timestamps issuing one tiny read
+    per step, and lets tests bound the number of reads of a view.
+
+    Examples
+    --------
+    >>> io = NWBHDF5IO(path, 'r')
+    >>> nwbfile = io.read()
+    >>> accounting = IOAccounting().track(nwbfile)
+    >>> widget = nwb2widget(nwbfile.acquisition['ElectricalSeries'])
+    >>> accounting.to_dataframe()
+    """
+
+    columns = ('reads', 'elements', 'bytes', 'chunks')
+
+    def __init__(self):
+        self.datasets = []
+        self._counts = defaultdict(lambda: dict.fromkeys(self.columns, 0))
+        self._lock = threading.Lock()
+
+    def track(self, node):
+        """Track all the datasets of a container and its descendants, or a single dataset
+
+        Parameters
+        ----------
+        node: NWB container or h5py.Dataset
+
+        Returns
+        -------
+        IOAccounting
+            self
+        """
+        if isinstance(node, h5py.Dataset):
+            self._track_dataset(node)
+            return self
+        stack = [node]
+        seen = set()
+        while stack:
+            container = stack.pop()
+            if id(container) in seen:
+                continue
+            seen.add(id(container))
+            for value in container.fields.values():
+                if isinstance(value, h5py.Dataset):
+                    self._track_dataset(value)
+            stack.extend(child for child in container.children if isinstance(child, AbstractContainer))
+        return self
+
+    def _track_dataset(self, dataset):
+        if getattr(dataset, '_io_accounting', None) is self:
+            return
+        if isinstance(dataset, AccountedDataset):
+            raise ValueError('{} is already tracked by another IOAccounting'.format(dataset.name))
+        dataset.__class__ = AccountedDataset
+        dataset._io_accounting = self
+        self.datasets.append(dataset)
+
+    def untrack(self):
+        """Turn tracked datasets back into plain h5py datasets"""
+        for dataset in self.datasets:
+            dataset.__class__ = h5py.Dataset
+            del dataset._io_accounting
+        self.datasets = []
+
+    def record(self, dataset, args, out):
+        widget, caller = find_caller()
+        chunks = count_chunks(dataset.shape, dataset.chunks, args)
+        with self._lock:
+            counts = self._counts[(widget, caller, dataset.name)]
+            counts['reads'] += 1
+            counts['elements'] += int(np.size(out))
+            counts['bytes'] += int(getattr(out, 'nbytes', 0))
+            counts['chunks'] += chunks or 0
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    @property
+    def totals(self) -> dict:
+        """Total reads, elements, bytes and chunks since tracking started or the last `reset`"""
+        with self._lock:
+            return {column: sum(counts[column] for counts in self._counts.values()) for column in self.columns}
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Counts per widget, calling function and dataset, most reads first"""
+        with self._lock:
+            rows = [dict(widget=widget, caller=caller, dataset=dataset, **counts)
+                    for (widget, caller, dataset), counts in self._counts.items()]
+        df = pd.DataFrame(rows, columns=('widget', 'caller', 'dataset') + self.columns)
+        return df.sort_values('reads', ascending=False).reset_index(drop=True)
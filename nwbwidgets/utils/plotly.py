@@ -2,7 +2,57 @@ import plotly.graph_objects as go
 import numpy as np
 
 
-def multi_trace(x, y, color, label=None, fig=None):
+def as_typed_array(values) -> np.ndarray:
+    """Numeric array in a dtype that FigureWidgets send to the browser as a binary typed array
+
+    FigureWidgets transfer 1-D numpy arrays of JavaScript typed array dtypes as binary buffers, but serialize lists and
+    (u)int64 arrays as JSON. 64-bit integers are converted to float64 (JavaScript numbers), float16 to float32 and
+    booleans to uint8; other arrays are returned as they are, without a copy.
+    """
+    values = np.asarray(values)
+    if values.dtype in (np.int64, np.uint64):
+        return values.astype(np.float64)
+    if values.dtype == np.float16:
+        return values.astype(np.float32)
+    if values.dtype == bool:
+        return values.astype(np.uint8)
+    return values
+
+
+# above this many rows, multi_trace draws all of them as one WebGL trace
+single_trace_threshold = 64
+
+
+def nan_join(x, y):
+    """Join rows that share the same x into single x and y arrays, with NaNs between the rows
+
+    Parameters
+    ----------
+    x: array-like
+        (n,)
+    y: array-like
+        (n_rows, n)
+
+    Returns
+    -------
+    x: numpy.ndarray
+        (n_rows * (n + 1) - 1,)
+    y: numpy.ndarray
+        (n_rows * (n + 1) - 1,)
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    xx = np.empty((len(y), n + 1), dtype=np.promote_types(x.dtype, np.float16))
+    xx[:, :n] = x
+    xx[:, n] = np.nan
+    yy = np.empty((len(y), n + 1), dtype=np.promote_types(y.dtype, np.float16))
+    yy[:, :n] = y
+    yy[:, n] = np.nan
+    return xx.ravel()[:-1], yy.ravel()[:-1]
+
+
+def multi_trace(x, y, color, label=None, fig=None, single_trace=None):
     """ Create multiple traces that are associated with a single legend label
 
     Parameters
@@ -12,6 +62,9 @@ def multi_trace(x, y, color, label=None, fig=None):
     color: str
     label: str, optional
     fig: go.FigureWidget
+    single_trace: bool, optional
+        draw all rows as a single Scattergl trace, with NaNs between the rows, instead of one Scatter trace per row.
+        Default is to do so for more than `single_trace_threshold` rows.
 
     Returns
     -------
@@ -19,6 +72,15 @@ def multi_trace(x, y, color, label=None, fig=None):
     """
     if fig is None:
         fig = go.FigureWidget()
+    if single_trace is None:
+        single_trace = len(y) > single_trace_threshold
+
+    if single_trace:
+        if len(y):
+            xx, yy = nan_join(x, y)
+            fig.add_trace(go.Scattergl(x=as_typed_array(xx), y=as_typed_array(yy), legendgroup=label, name=label,
+                                       showlegend=True, line={'color': color}, mode='lines', connectgaps=False))
+        return fig
 
     for i, yy in enumerate(y):
         if label is not None and i:
@@ -26,7 +88,8 @@ def multi_trace(x, y, color, label=None, fig=None):
         else:
             showlegend = True
 
-        fig.add_scatter(x=x, y=yy, legendgroup=label, name=label, showlegend=showlegend, line={'color': color})
+        fig.add_scatter(x=as_typed_array(x), y=as_typed_array(yy), legendgroup=label, name=label,
+                        showlegend=showlegend, line={'color': color})
 
     return fig
 
@@ -62,7 +125,7 @@ def event_group(times_list, offset=0, color='Black', label=None, fig=None, marke
 
     for i, times in enumerate(times_list):
         if len(times):
-            fig.add_scatter(x=times, y=np.ones_like(times) * (i + offset),
+            fig.add_scatter(x=as_typed_array(times), y=np.full(len(times), i + offset, dtype=np.float32),
                             marker=dict(color=color, line_width=line_width, symbol=marker, line_color=color),
                             legendgroup=str(label),
                             name=label,
@@ -73,3 +136,91 @@ def event_group(times_list, offset=0, color='Black', label=None, fig=None, marke
 
     return fig
 
+
+class SegmentedTraces:
+    """Traces of a FigureWidget that draw a window of a long recording in segments on a fixed grid
+
+    `show` compares the segments of a new window with those already drawn, deletes the traces of the segments that
+    left the window and adds traces for those that entered it, so that shifting the window sends the data of the new
+    segments only. Segments are a power of two long, about 1 / `segments_per_window` of the window; a change of window
+    length that changes the segment length redraws every segment.
+    """
+
+    def __init__(self, fig, make_segment, segments_per_window=4, min_size=None):
+        """
+        Parameters
+        ----------
+        fig: go.FigureWidget
+        make_segment: callable
+            (start, stop) -> list of (trace, info) of the segment [start, stop). `info` is kept with the trace for
+            restyling it later, see `drawn`.
+        segments_per_window: int, optional
+        min_size: float, optional
+            e.g. 1 for segments of sample indices
+        """
+        self.fig = fig
+        self.make_segment = make_segment
+        self.segments_per_window = segments_per_window
+        self.min_size = min_size
+        self.size = None
+        self.window = None
+        self.segments = dict()  # segment -> list of (trace uid, info)
+
+    def segment_size(self, start, stop) -> float:
+        length = max(stop - start, np.finfo(float).tiny) / self.segments_per_window
+        size = 2. ** np.ceil(np.log2(length))
+        return size if self.min_size is None else max(size, self.min_size)
+
+    def windows(self, start, stop) -> list:
+        """[start, stop) of the segments that a window is drawn with"""
+        size = self.segment_size(start, stop)
+        first = int(np.floor(start / size))
+        last = max(int(np.ceil(stop / size)), first + 1)
+        return [(segment * size, (segment + 1) * size) for segment in range(first, last)]
+
+    def missing(self, start, stop) -> list:
+        """[start, stop) of the segments that showing a window would make, e.g. to read their data beforehand"""
+        size = self.segment_size(start, stop)
+        return [(seg_start, seg_stop) for seg_start, seg_stop in self.windows(start, stop)
+                if size != self.size or int(round(seg_start / size)) not in self.segments]
+
+    def show(self, start, stop):
+        """Draw the window [start, stop), adding and deleting segments as needed"""
+        size = self.segment_size(start, stop)
+        if size != self.size:
+            self.clear()
+            self.size = size
+        self.window = (start, stop)
+        wanted = {int(round(seg_start / size)): (seg_start, seg_stop)
+                  for seg_start, seg_stop in self.windows(start, stop)}
+        self.remove([segment for segment in self.segments if segment not in wanted])
+
+        new_traces = []
+        for segment, (seg_start, seg_stop) in wanted.items():
+            if segment not in self.segments:
+                self.segments[segment] = []
+                new_traces.extend((segment, trace, info) for trace, info in self.make_segment(seg_start, seg_stop))
+        if new_traces:
+            n_before = len(self.fig.data)
+            self.fig.add_traces([trace for _, trace, _ in new_traces])
+            for (segment, _, info), trace in zip(new_traces, self.fig.data[n_before:]):
+                self.segments[segment].append((trace.uid, info))
+
+    def remove(self, segments):
+        uids = {uid for segment in segments for uid, _ in self.segments.pop(segment)}
+        if uids:
+            self.fig.data = [trace for trace in self.fig.data if trace.uid not in uids]
+
+    def clear(self):
+        self.remove(list(self.segments))
+
+    def redraw(self):
+        """Draw every segment of the current window again, e.g. after what make_segment draws has changed"""
+        self.clear()
+        if self.window is not None:
+            self.show(*self.window)
+
+    def drawn(self) -> list:
+        """(trace, info) of every trace drawn"""
+        traces = {trace.uid: trace for trace in self.fig.data}
+        return [(traces[uid], info) for drawn in self.segments.values() for uid, info in drawn]
@@ -0,0 +1,176 @@
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+from .cancellation import CancelToken
+
+# worker that reads windows ahead of navigation. Set to None to disable prefetching.
+prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='nwbwidgets-prefetch')
+
+
+def estimate_nbytes(value) -> int:
+    """Memory held by a window read: the buffers of the arrays it is made of, found through lists, tuples and dicts"""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class WindowCache:
+    """LRU cache of window reads bounded in bytes, filled when a window is shown or ahead of time by a
+    `WindowPrefetcher`
+
+    Entries are futures, so a window that is still being prefetched when it is requested is waited for rather than
+    read twice. The size of an entry is counted once its read has finished, so that one widget reading large windows
+    evicts few entries of the others rather than a fixed number of them.
+    """
+
+    def __init__(self, max_bytes=2 ** 28):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._futures = OrderedDict()
+        self._sizes = dict()  # key -> bytes of the finished reads
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._futures
+
+    def _remove(self, key):
+        self._futures.pop(key, None)
+        self.nbytes -= self._sizes.pop(key, 0)
+
+    def _put(self, key, future):
+        self._remove(key)
+        self._futures[key] = future
+
+    def _count(self, key, future):
+        """Add the size of a finished read, and evict the least recently used entries beyond `max_bytes`"""
+        if future.cancelled():
+            return  # called by `cancel`, which holds the lock and removes the entry
+        size = 0 if future.exception() is not None else estimate_nbytes(future.result())
+        with self._lock:
+            if self._futures.get(key) is not future:
+                return  # evicted or replaced meanwhile
+            self._sizes[key] = size
+            self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self._futures) > 1:
+                self._remove(next(iter(self._futures)))
+
+    def get(self, key, load):
+        """Result of `load()` for a key, read now unless it is cached or being prefetched"""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self._futures.move_to_end(key)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                pass  # a failed prefetch is retried here, where its error is raised to the caller
+        result = load()
+        future = Future()
+        future.set_result(result)
+        with self._lock:
+            self._put(key, future)
+        self._count(key, future)
+        return result
+
+    def prefetch(self, key, load, token: CancelToken = None):
+        """Start reading a window on `prefetch_executor` if it is not cached
+
+        The read runs with `token` active, so that cancelling the token stops it at its next `check_cancelled`.
+        """
+        executor = prefetch_executor
+        if executor is None:
+            return
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not _failed(future):
+                return
+            future = executor.submit(load) if token is None else executor.submit(token.run, load)
+            self._put(key, future)
+        future.add_done_callback(partial(self._count, key))
+
+    def cancel(self, key):
+        """Drop a read that has not started yet"""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and future.cancel():
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._futures.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+
+def _failed(future) -> bool:
+    return future.cancelled() or (future.done() and future.exception() is not None)
+
+
+window_cache = WindowCache()
+
+
+def neighbor_windows(window, vmin, vmax) -> list:
+    """The windows that paging forward and back from `window` leads to, as `WindowController.move_up`/`move_down`"""
+    start, stop = window
+    width = stop - start
+    out = []
+    if stop < vmax:
+        out.append((start + width, stop + width) if stop + width < vmax else (vmax - width, vmax))
+    if start > vmin:
+        out.append((start - width, stop - width) if start - width > vmin else (vmin, vmin + width))
+    return out
+
+
+class WindowPrefetcher:
+    """Read the next and previous windows of a window controller in the background
+
+    Parameters
+    ----------
+    controller: WindowController
+        e.g. StartAndDurationController for time, or the vertical RangeController of a GroupAndSortController
+    request: callable
+        window -> (key, load), where load() reads what a view shows for that window, or a list of (key, load) for
+        views that read a window in parts. Views read through `window_cache.get` with the same keys.
+    cache: WindowCache, optional
+        default is `window_cache`
+    """
+
+    def __init__(self, controller, request, cache: WindowCache = None):
+        self.controller = controller
+        self.request = request
+        self.cache = window_cache if cache is None else cache
+        self._tokens = dict()  # key -> CancelToken of the reads started by this prefetcher
+        controller.observe(self.prefetch, names='value')
+        self.prefetch()
+
+    def _requests(self, window) -> list:
+        requests = self.request(window)
+        return requests if isinstance(requests, list) else [requests]
+
+    def prefetch(self, change=None):
+        shown = {key for key, _ in self._requests(self.controller.value)}
+        wanted = dict()
+        for window in neighbor_windows(self.controller.value, self.controller.vmin, self.controller.vmax):
+            wanted.update(self._requests(window))
+
+        # reads of windows that are neither shown nor next to the shown one anymore, e.g. after rapid paging, are
+        # cancelled so that they do not hold up the worker
+        for key in list(self._tokens):
+            if key not in wanted and key not in shown:
+                self._tokens.pop(key).cancel()
+                self.cache.cancel(key)
+
+        for key, load in wanted.items():
+            token = self._tokens.get(key)
+            if token is None or token.cancelled:
+                token = self._tokens[key] = CancelToken()
+            self.cache.prefetch(key, load, token)
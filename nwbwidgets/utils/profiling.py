@@ -0,0 +1,325 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import h5py
+import pandas as pd
+from ipywidgets import widgets, Widget
+
+# the profiler that is currently recording, if any
+active_profiler = None
+
+_thread_state = threading.local()
+
+
+def _counters():
+    """Per-thread I/O and comm counters. Deltas of these are attributed to the nodes being rendered in that thread."""
+    if not hasattr(_thread_state, 'counters'):
+        _thread_state.counters = dict(n_reads=0, bytes_read=0, comm_messages=0, comm_bytes=0)
+        _thread_state.stack = []
+    return _thread_state.counters
+
+
+def record_read(nbytes):
+    """Count a dataset read in the current thread. Called by the instrumented readers while a profiler is active"""
+    counters = _counters()
+    counters['n_reads'] += 1
+    counters['bytes_read'] += nbytes
+
+
+def node_label(node) -> str:
+    """e.g. 'TimeSeries test_timeseries' or 'Dataset /acquisition/test_timeseries/data'"""
+    name = getattr(node, 'name', None)
+    if name is None:
+        return type(node).__name__
+    return '{} {}'.format(type(node).__name__, name)
+
+
+def _message_size(msg, buffers):
+    return len(json.dumps(msg, default=str)) + sum(memoryview(buffer).nbytes for buffer in buffers or ())
+
+
+class RenderProfiler:
+    """Opt-in per-node profiler of widget rendering
+
+    While enabled, each call of `nwb2widget`, `vis2widget` and of the plotter functions run by
+    `utils.widgets.interactive_output` is recorded with its wall time, the number of HDF5 dataset reads and bytes read,
+    the peak memory allocated (if `trace_memory`) and the number and size of the comm messages sent to the frontend.
+    Measurements are inclusive of nested calls; `to_dataframe` also reports self time.
+
+    Examples
+    --------
+    >>> with RenderProfiler() as profiler:
+    ...     widget = nwb2widget(nwbfile)
+    >>> profiler.to_dataframe().sort_values('self_time')
+    >>> profiler.to_speedscope('render.speedscope.json')
+    """
+
+    def __init__(self, trace_memory=True):
+        """
+        Parameters
+        ----------
+        trace_memory: bool, optional
+            Record the peak memory allocated by each node with tracemalloc. This slows down rendering.
+        """
+        self.trace_memory = trace_memory
+        self.records = []
+        self.t0 = None
+        self._lock = threading.Lock()
+        self._stats_widgets = []
+        self._started_tracemalloc = False
+        self._original_getitem = None
+        self._original_send = None
+
+    def enable(self):
+        global active_profiler
+        if active_profiler is not None and active_profiler is not self:
+            raise RuntimeError('another RenderProfiler is already enabled')
+        if active_profiler is self:
+            return self
+        active_profiler = self
+        if self.t0 is None:
+            self.t0 = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._patch()
+        return self
+
+    def disable(self):
+        global active_profiler
+        if active_profiler is self:
+            self._unpatch()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            active_profiler = None
+        return self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def _patch(self):
+        self._original_getitem = h5py.Dataset.__getitem__
+        self._original_send = Widget._send
+        original_getitem = self._original_getitem
+        original_send = self._original_send
+        stats_widgets = self._stats_widgets
+
+        def getitem(dataset, args, *more_args, **kwargs):
+            out = original_getitem(dataset, args, *more_args, **kwargs)
+            record_read(getattr(out, 'nbytes', 0))
+            return out
+
+        def send(widget, msg, buffers=None):
+            if not any(widget is stats_widget for stats_widget in stats_widgets):
+                counters = _counters()
+                counters['comm_messages'] += 1
+                counters['comm_bytes'] += _message_size(msg, buffers)
+            return original_send(widget, msg, buffers)
+
+        h5py.Dataset.__getitem__ = getitem
+        Widget._send = send
+
+    def _unpatch(self):
+        h5py.Dataset.__getitem__ = self._original_getitem
+        Widget._send = self._original_send
+
+    @contextmanager
+    def measure(self, name, kind, node=None):
+        counters = _counters()
+        stack = _thread_state.stack
+        parent = stack[-1] if stack else None
+        frame = dict(counters=dict(counters), abs_peak=0, start_mem=0)
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent['abs_peak'] = max(parent['abs_peak'], peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            frame.update(start_mem=current, abs_peak=current)
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            peak_alloc = None
+            if self.trace_memory and tracemalloc.is_tracing():
+                frame['abs_peak'] = max(frame['abs_peak'], tracemalloc.get_traced_memory()[1])
+                peak_alloc = frame['abs_peak'] - frame['start_mem']
+                if parent is not None:
+                    parent['abs_peak'] = max(parent['abs_peak'], frame['abs_peak'])
+            record = dict(
+                name=name,
+                kind=kind,
+                node_type=None if node is None else type(node).__name__,
+                thread=threading.current_thread().name,
+                depth=len(stack),
+                start=start - self.t0,
+                end=end - self.t0,
+                wall_time=end - start,
+                peak_alloc=peak_alloc,
+            )
+            record.update({key: counters[key] - frame['counters'][key] for key in counters})
+            with self._lock:
+                self.records.append(record)
+            self._update_stats_widgets()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """One row per rendered node, in order of completion, with inclusive measurements and self time"""
+        columns = ['name', 'kind', 'node_type', 'thread', 'depth', 'start', 'end', 'wall_time', 'self_time',
+                   'n_reads', 'bytes_read', 'peak_alloc', 'comm_messages', 'comm_bytes']
+        with self._lock:
+            df = pd.DataFrame(list(self.records), columns=[c for c in columns if c != 'self_time'])
+        if not len(df):
+            return pd.DataFrame(columns=columns)
+        # self time: subtract the time of the direct children, i.e. the records one level deeper in the same thread
+        # that are contained in this one
+        self_time = df['wall_time'].to_numpy().copy()
+        for i, row in enumerate(df.itertuples()):
+            children = (df['thread'] == row.thread) & (df['depth'] == row.depth + 1) & \
+                       (df['start'] >= row.start) & (df['end'] <= row.end)
+            self_time[i] -= df.loc[children, 'wall_time'].sum()
+        df['self_time'] = self_time
+        return df[columns]
+
+    def summary(self, top=10) -> pd.DataFrame:
+        """Slowest node types by total self time"""
+        df = self.to_dataframe()
+        return df.groupby(['kind', 'name']).agg(
+            calls=('wall_time', 'size'), self_time=('self_time', 'sum'), wall_time=('wall_time', 'sum'),
+            bytes_read=('bytes_read', 'sum'), comm_bytes=('comm_bytes', 'sum'),
+        ).sort_values('self_time', ascending=False).head(top)
+
+    def to_chrome_trace(self, path=None) -> dict:
+        """Export as Chrome trace event format (chrome://tracing, Perfetto, speedscope)
+
+        Parameters
+        ----------
+        path: str, optional
+            write the JSON trace to this file
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            records = list(self.records)
+        events = [dict(
+            name=record['name'],
+            cat=record['kind'],
+            ph='X',
+            ts=record['start'] * 1e6,
+            dur=record['wall_time'] * 1e6,
+            pid=0,
+            tid=record['thread'],
+            args={key: record[key] for key in ('node_type', 'n_reads', 'bytes_read', 'peak_alloc', 'comm_messages',
+                                               'comm_bytes')},
+        ) for record in records]
+        trace = dict(traceEvents=sorted(events, key=lambda event: event['ts']), displayTimeUnit='ms')
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(trace, f)
+        return trace
+
+    def to_speedscope(self, path=None, name='nwbwidgets render') -> dict:
+        """Export in the speedscope file format (https://www.speedscope.app), one evented profile per thread
+
+        Parameters
+        ----------
+        path: str, optional
+            write the JSON profile to this file
+        name: str, optional
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            records = list(self.records)
+        frames = []
+        frame_index = dict()
+        profiles = []
+        for thread in sorted(set(record['thread'] for record in records)):
+            thread_records = sorted((r for r in records if r['thread'] == thread),
+                                    key=lambda r: (r['start'], -r['end']))
+            events = []
+            stack = []
+            for record in thread_records:
+                while stack and stack[-1]['end'] <= record['start']:
+                    closed = stack.pop()
+                    events.append(dict(type='C', frame=frame_index[closed['name']], at=closed['end']))
+                if record['name'] not in frame_index:
+                    frame_index[record['name']] = len(frames)
+                    frames.append(dict(name=record['name']))
+                events.append(dict(type='O', frame=frame_index[record['name']], at=record['start']))
+                stack.append(record)
+            while stack:
+                closed = stack.pop()
+                events.append(dict(type='C', frame=frame_index[closed['name']], at=closed['end']))
+            profiles.append(dict(
+                type='evented', name='{} ({})'.format(name, thread), unit='seconds',
+                startValue=thread_records[0]['start'], endValue=max(r['end'] for r in thread_records),
+                events=events))
+        out = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': dict(frames=frames),
+            'profiles': profiles,
+            'name': name,
+            'exporter': 'nwbwidgets',
+        }
+        if path is not None:
+            with open(path, 'w') as f:
+                json.dump(out, f)
+        return out
+
+    def stats_widget(self, top=5) -> widgets.HTML:
+        """Small widget showing live totals and the slowest nodes while the profiler records"""
+        widget = widgets.HTML()
+        widget.top = top
+        self._stats_widgets.append(widget)
+        self._update_stats_widgets()
+        return widget
+
+    def _update_stats_widgets(self):
+        if not self._stats_widgets:
+            return
+        with self._lock:
+            records = list(self.records)
+        for widget in self._stats_widgets:
+            slowest = sorted(records, key=lambda r: r['wall_time'], reverse=True)[:widget.top]
+            rows = ''.join('<tr><td>{}</td><td>{}</td><td>{:.3f} s</td><td>{:.1f} kB</td></tr>'.format(
+                r['kind'], r['name'], r['wall_time'], r['bytes_read'] / 1e3) for r in slowest)
+            widget.value = (
+                '<b>{} nodes</b>, {} reads, {:.1f} MB read, {:.1f} kB sent'
+                '<table><tr><th>kind</th><th>name</th><th>time</th><th>read</th></tr>{}</table>'
+            ).format(len(records), sum(r['n_reads'] for r in records),
+                     sum(r['bytes_read'] for r in records) / 1e6,
+                     sum(r['comm_bytes'] for r in records) / 1e3, rows)
+
+
+_no_profile = contextmanager(lambda: (yield))
+
+
+def profile(name, kind, node=None):
+    """Measure a block with the active profiler. Does nothing when no profiler is enabled.
+
+    Parameters
+    ----------
+    name: str
+    kind: str
+        e.g. 'nwb2widget', 'vis2widget', 'plotter'
+    node: optional
+        node being rendered
+    """
+    profiler = active_profiler
+    if profiler is None:
+        return _no_profile()
+    return profiler.measure(name, kind, node)
@@ -0,0 +1,255 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import h5py
+import numpy as np
+from pynwb import TimeSeries
+
+from .cancellation import check_cancelled, report_progress
+from .timeseries import get_timeseries_tt, get_timeseries_in_units, get_time_index, convert_to_units
+
+# number of pixel columns a trace is drawn on. Windows are drawn with 2 to 2 * factor points per column.
+default_n_columns = 1000
+
+# directory of the sidecar files that persist the pyramids of file-backed series. None keeps them in memory only.
+sidecar_dir = None
+
+_pyramids = dict()  # id(TimeSeries) -> MinMaxPyramid
+_pyramids_lock = threading.Lock()
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max summary of a long array, for drawing its envelope without reading every sample
+
+    Level k holds the minimum and maximum of each bin of `min_bin * factor ** k` samples along the first axis. A window
+    is drawn from the coarsest level that still has `n_columns` bins in it, as a min and a max point per bin, so that
+    the envelope is exact at the resolution of the plot. Windows too short for the finest level are read raw.
+
+    Levels are built one block of samples at a time, the first time a window touches the block, and can be persisted
+    in an HDF5 sidecar file so that a recording is summarized only once. The finest levels of the least recently used
+    blocks are dropped from memory; the coarse levels of every visited block are kept. Blocks are built and dropped
+    under a lock, since windows are read from several threads (e.g. a prefetch and the shown window).
+    """
+
+    def __init__(self, data, factor=4, min_bin=16, block_size=None, max_block_bytes=2 ** 26, max_blocks=32,
+                 sidecar=None):
+        """
+        Parameters
+        ----------
+        data: array-like
+            numpy array or h5py.Dataset, summarized along the first axis
+        factor: int, optional
+            ratio of the bin sizes of consecutive levels
+        min_bin: int, optional
+            bin size of the finest level
+        block_size: int, optional
+            number of samples read at once to build the levels. Must be `min_bin` times a power of `factor`. The
+            default is the largest such block of at most `max_block_bytes`.
+        max_block_bytes: int, optional
+        max_blocks: int, optional
+            number of blocks whose finest levels are kept in memory
+        sidecar: str, optional
+            path of an HDF5 file in which the levels are persisted
+        """
+        self.data = data
+        self.n = data.shape[0]
+        self.factor = factor
+        self.min_bin = min_bin
+        if block_size is None:
+            row_bytes = max(int(np.prod(data.shape[1:])) * np.dtype(data.dtype).itemsize, 1)
+            block_size = min_bin * factor
+            while block_size < self.n and block_size * factor * row_bytes <= max_block_bytes:
+                block_size *= factor
+        self.block_size = block_size
+        self.bins = []
+        bin_size = min_bin
+        while bin_size <= block_size:
+            self.bins.append(bin_size)
+            bin_size *= factor
+        if self.bins[-1] != block_size:
+            raise ValueError('block_size must be min_bin times a power of factor')
+        self.n_blocks = -(-self.n // block_size)
+        self.max_blocks = max_blocks
+        self._n_fine = max(len(self.bins) - 3, 0)
+        self._blocks = dict()  # block -> list of (mins, maxs) per level, None for dropped levels
+        self._recent = OrderedDict()  # blocks whose finest levels are in memory
+        self._lock = threading.Lock()
+        self._sidecar = None
+        if sidecar is not None:
+            self._open_sidecar(sidecar)
+
+    def _open_sidecar(self, path):
+        attrs = dict(n=self.n, shape=self.data.shape, dtype=str(np.dtype(self.data.dtype)), factor=self.factor,
+                     min_bin=self.min_bin, block_size=self.block_size)
+        sidecar = h5py.File(path, 'a')
+        if any(key not in sidecar.attrs or np.any(sidecar.attrs[key] != value) for key, value in attrs.items()):
+            sidecar.close()
+            sidecar = h5py.File(path, 'w')
+            sidecar.attrs.update(attrs)
+            sidecar.create_dataset('built', shape=(self.n_blocks,), dtype=bool, fillvalue=False)
+            for bin_size in self.bins:
+                shape = (-(-self.n // bin_size),) + self.data.shape[1:]
+                chunks = (min(self.block_size // bin_size, shape[0]),) + self.data.shape[1:]
+                for name in ('min', 'max'):
+                    sidecar.create_dataset('{}_{}'.format(name, bin_size), shape=shape, chunks=chunks,
+                                           dtype=self.data.dtype)
+        self._sidecar = sidecar
+
+    def close(self):
+        with self._lock:
+            if self._sidecar is not None:
+                self._sidecar.close()
+                self._sidecar = None
+
+    def level_for(self, n_samples, n_columns) -> int:
+        """Bin size of the coarsest level with at least `n_columns` bins in `n_samples`, 1 for raw samples"""
+        bin_size = 1
+        for candidate in self.bins:
+            if n_samples // candidate >= n_columns:
+                bin_size = candidate
+        return bin_size
+
+    def _build_block(self, i):
+        start = i * self.block_size
+        stop = min(start + self.block_size, self.n)
+        if self._sidecar is not None and self._sidecar['built'][i]:
+            levels = []
+            for bin_size in self.bins:
+                lo, hi = start // bin_size, -(-stop // bin_size)
+                levels.append((self._sidecar['min_{}'.format(bin_size)][lo:hi],
+                               self._sidecar['max_{}'.format(bin_size)][lo:hi]))
+            return levels
+
+        raw = np.asarray(self.data[start:stop])
+        bin_starts = np.arange(0, len(raw), self.min_bin)
+        mins = np.minimum.reduceat(raw, bin_starts, axis=0)
+        maxs = np.maximum.reduceat(raw, bin_starts, axis=0)
+        levels = [(mins, maxs)]
+        for _ in self.bins[1:]:
+            bin_starts = np.arange(0, len(mins), self.factor)
+            mins = np.minimum.reduceat(mins, bin_starts, axis=0)
+            maxs = np.maximum.reduceat(maxs, bin_starts, axis=0)
+            levels.append((mins, maxs))
+
+        if self._sidecar is not None:
+            for bin_size, (mins, maxs) in zip(self.bins, levels):
+                lo = start // bin_size
+                self._sidecar['min_{}'.format(bin_size)][lo:lo + len(mins)] = mins
+                self._sidecar['max_{}'.format(bin_size)][lo:lo + len(maxs)] = maxs
+            self._sidecar['built'][i] = True
+        return levels
+
+    def _level(self, i, level):
+        with self._lock:
+            levels = self._blocks.get(i)
+            if levels is None or levels[level] is None:
+                levels = self._blocks[i] = self._build_block(i)
+            if self._n_fine and levels[0] is not None:
+                self._recent[i] = None
+                self._recent.move_to_end(i)
+                while len(self._recent) > self.max_blocks:
+                    dropped, _ = self._recent.popitem(last=False)
+                    self._blocks[dropped][:self._n_fine] = [None] * self._n_fine
+            return levels[level]
+
+    def read(self, istart, istop, n_columns=None):
+        """Envelope of a window
+
+        Parameters
+        ----------
+        istart: int
+        istop: int
+        n_columns: int, optional
+            default is `default_n_columns`
+
+        Returns
+        -------
+        index: numpy.ndarray
+            sample index of each point. Each bin is drawn as its min at its first sample and its max at its middle
+            sample; the first and last bins may extend past the window.
+        values: numpy.ndarray
+            raw samples, or interleaved bin mins and maxs
+        """
+        n_columns = default_n_columns if n_columns is None else n_columns
+        bin_size = self.level_for(istop - istart, n_columns)
+        if bin_size == 1:
+            return np.arange(istart, istop), np.asarray(self.data[istart:istop])
+
+        level = self.bins.index(bin_size)
+        per_block = self.block_size // bin_size
+        b0, b1 = istart // bin_size, -(-istop // bin_size)
+        mins, maxs = [], []
+        blocks = range(b0 // per_block, (b1 - 1) // per_block + 1)
+        for i in blocks:
+            check_cancelled()
+            block_mins, block_maxs = self._level(i, level)
+            report_progress(i - blocks.start + 1, len(blocks))
+            lo, hi = max(b0 - i * per_block, 0), b1 - i * per_block
+            mins.append(block_mins[lo:hi])
+            maxs.append(block_maxs[lo:hi])
+        mins = np.concatenate(mins)
+        values = np.empty((2 * len(mins),) + mins.shape[1:], dtype=mins.dtype)
+        values[0::2] = mins
+        values[1::2] = np.concatenate(maxs)
+
+        index = np.repeat(np.arange(b0, b0 + len(mins)) * bin_size, 2)
+        index[1::2] += bin_size // 2
+        np.minimum(index, self.n - 1, out=index)
+        return index, values
+
+
+def get_pyramid(node: TimeSeries) -> MinMaxPyramid:
+    """Pyramid of the data of a TimeSeries, created on first use and persisted in `sidecar_dir` if it is set"""
+    with _pyramids_lock:
+        pyramid = _pyramids.get(id(node))
+        if pyramid is None:
+            sidecar = None
+            if sidecar_dir is not None and isinstance(node.data, h5py.Dataset):
+                sidecar = os.path.join(sidecar_dir, '{}.pyramid.h5'.format(node.object_id))
+            pyramid = _pyramids[id(node)] = MinMaxPyramid(node.data, sidecar=sidecar)
+            weakref.finalize(node, _forget_pyramid, id(node))
+        return pyramid
+
+
+def _forget_pyramid(key):
+    pyramid = _pyramids.pop(key, None)
+    if pyramid is not None:
+        pyramid.close()
+
+
+def get_timeseries_envelope(node: TimeSeries, istart=0, istop=None, columns=None, n_columns=None):
+    """
+    Data of a TimeSeries window in its units, decimated to its min/max envelope if the window is long
+
+    Parameters
+    ----------
+    node: pynwb.TimeSeries
+    istart: int, optional
+    istop: int, optional
+    columns: array-like, optional
+        indices of the channels to return, in any order. Default is all channels.
+    n_columns: int, optional
+        width of the plot in pixels, default is `default_n_columns`
+
+    Returns
+    -------
+    tt: numpy.ndarray
+    data: numpy.ndarray
+    unit: str
+    """
+    n = len(node.data)
+    istart = 0 if istart is None else istart
+    istop = n if istop is None else min(istop, n)
+    pyramid = get_pyramid(node)
+    if pyramid.level_for(istop - istart, default_n_columns if n_columns is None else n_columns) == 1:
+        data, unit = get_timeseries_in_units(node, istart, istop, columns=columns)
+        return get_timeseries_tt(node, istart, istop), data, unit
+
+    # the envelope is decimated and reordered in the raw type, and only the output is scaled
+    index, data = pyramid.read(istart, istop, n_columns)
+    if columns is not None:
+        data = data[:, columns]
+    data, unit = convert_to_units(node, data, columns)
+    return get_time_index(node).times_at(index), data, unit
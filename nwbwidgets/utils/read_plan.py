@@ -0,0 +1,150 @@
+import h5py
+import numpy as np
+
+from .cancellation import check_cancelled, report_progress
+
+# cost of a read call, in bytes read, used to weigh fewer larger reads against more smaller ones
+read_overhead_bytes = 2 ** 16
+
+# largest read that the windows of several trials are grouped into
+max_read_bytes = 2 ** 26
+
+
+def _spanned(start, stop, chunk):
+    """Number of chunks of length `chunk` that the range [start, stop) touches"""
+    return (stop - 1) // chunk - start // chunk + 1 if stop > start else 0
+
+
+def _runs(sorted_values):
+    """[start, stop) ranges of the consecutive runs of sorted unique integers"""
+    breaks = np.flatnonzero(np.diff(sorted_values) != 1) + 1
+    return [(int(run[0]), int(run[-1]) + 1) for run in np.split(sorted_values, breaks)]
+
+
+def plan_column_read(shape, chunks, itemsize, istart, istop, columns) -> dict:
+    """Choose how to read a subset of the columns of rows istart to istop of a 2-D dataset
+
+    The candidates are
+        'block': one read of all the columns between the first and the last requested, subselected in memory
+        'runs': one read per run of consecutive requested columns
+        'chunks': one read per run of consecutive column chunks that contain requested columns, subselected in memory
+    Bytes touched are counted in whole chunks (in elements for contiguous datasets), and each read costs
+    `read_overhead_bytes` more. The cheapest candidate wins.
+
+    Parameters
+    ----------
+    shape: tuple
+    chunks: tuple or None
+        chunk shape, None for contiguous datasets
+    itemsize: int
+    istart: int
+    istop: int
+    columns: array-like
+        sorted unique column indices
+
+    Returns
+    -------
+    dict
+        strategy, ranges (list of [start, stop) column ranges to read), reads and bytes
+    """
+    columns = np.asarray(columns)
+    row_chunk, col_chunk = chunks if chunks is not None else (1, 1)
+    chunk_bytes = row_chunk * col_chunk * itemsize
+    row_chunks = _spanned(istart, istop, row_chunk)
+
+    column_runs = _runs(columns)
+    chunk_runs = [(start * col_chunk, min(stop * col_chunk, shape[1]))
+                  for start, stop in _runs(np.unique(columns // col_chunk))]
+    candidates = dict(
+        block=[(int(columns[0]), int(columns[-1]) + 1)],
+        runs=column_runs,
+        chunks=chunk_runs,
+    )
+
+    plans = []
+    for strategy, ranges in candidates.items():
+        n_chunks = sum(_spanned(start, stop, col_chunk) for start, stop in ranges)
+        plans.append(dict(strategy=strategy, ranges=ranges, reads=len(ranges),
+                          bytes=row_chunks * n_chunks * chunk_bytes))
+    return min(plans, key=lambda plan: plan['bytes'] + plan['reads'] * read_overhead_bytes)
+
+
+def plan_row_reads(starts, length, n_rows, row_bytes, max_bytes=None) -> list:
+    """Group the row windows [start, start + length) of many trials into reads, in one pass over the sorted starts
+
+    A window shares the read of the previous ones when the rows between them cost less than `read_overhead_bytes`
+    to read and the read stays within `max_bytes`, so that overlapping and nearby trials are read once. Rows outside
+    of [0, n_rows) are not read.
+
+    Parameters
+    ----------
+    starts: array-like
+        first row of each window, possibly out of range
+    length: int
+    n_rows: int
+    row_bytes: int
+    max_bytes: int, optional
+        default is `max_read_bytes`. A single window may exceed it.
+
+    Returns
+    -------
+    list
+        (start, stop, trials) of each read, in increasing order, with the indices of the trials it holds
+    """
+    starts = np.asarray(starts, dtype=int)
+    order = np.argsort(starts, kind='stable')
+    first = np.clip(starts[order], 0, n_rows)
+    last = np.clip(starts[order] + length, 0, n_rows)
+    order, first, last = order[last > first], first[last > first], last[last > first]
+    if not len(order):
+        return []
+    row_bytes = max(row_bytes, 1)
+    gap_rows = read_overhead_bytes // row_bytes
+    max_rows = (max_read_bytes if max_bytes is None else max_bytes) // row_bytes
+
+    reads = []
+    read_start, read_stop, held = first[0], last[0], [0]
+    for j in range(1, len(order)):
+        if first[j] - read_stop > gap_rows or max(read_stop, last[j]) - read_start > max_rows:
+            reads.append((int(read_start), int(read_stop), order[held]))
+            read_start, read_stop, held = first[j], last[j], []
+        read_stop = max(read_stop, last[j])
+        held.append(j)
+    reads.append((int(read_start), int(read_stop), order[held]))
+    return reads
+
+
+def read_columns(data, istart, istop, columns) -> np.ndarray:
+    """Rows istart to istop of the given columns of 2-D data, in the order requested
+
+    Reads of h5py datasets follow `plan_column_read` instead of h5py fancy indexing, which is slow along a second axis
+    and reads chunks shared by scattered columns again for each of them.
+
+    Parameters
+    ----------
+    data: numpy.ndarray or h5py.Dataset
+    istart: int
+    istop: int
+    columns: array-like
+        column indices, in any order, possibly repeated
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    columns = np.asarray(columns, dtype=int)
+    if not isinstance(data, h5py.Dataset):
+        return np.asarray(data[istart:istop])[:, columns]
+    istart, istop, _ = slice(istart, istop).indices(data.shape[0])
+    unique_columns, inverse = np.unique(columns, return_inverse=True)
+    if not len(unique_columns):
+        return np.empty((max(istop - istart, 0), 0), dtype=data.dtype)
+    plan = plan_column_read(data.shape, data.chunks, data.dtype.itemsize, istart, istop, unique_columns)
+
+    out = np.empty((max(istop - istart, 0), len(unique_columns)), dtype=data.dtype)
+    for i, (start, stop) in enumerate(plan['ranges']):
+        check_cancelled()
+        selected = np.flatnonzero((unique_columns >= start) & (unique_columns < stop))
+        out[:, selected] = data[istart:istop, start:stop][:, unique_columns[selected] - start]
+        report_progress(i + 1, len(plan['ranges']))
+    return out[:, inverse]
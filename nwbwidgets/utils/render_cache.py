@@ -0,0 +1,134 @@
+import threading
+from collections import OrderedDict
+
+import h5py
+from hdmf.container import AbstractContainer
+
+from .widgets import estimate_widget_size
+
+
+def get_node_key(node):
+    """Identify a node that was read from a file by the file it belongs to and its location in that file
+
+    Parameters
+    ----------
+    node: NWB container or h5py.Dataset
+
+    Returns
+    -------
+    tuple or None
+        (file identity, location in the file, object owning the file identity) or None if the node does not come
+        from a file. In-memory containers can still be modified, so they should not be cached.
+    """
+    if isinstance(node, h5py.Dataset):
+        return (node.file.filename, node.file.id.id), node.name, node.file
+    if isinstance(node, AbstractContainer) and node.container_source is not None:
+        root = node
+        names = []
+        while root.parent is not None:
+            names.append(root.name)
+            root = root.parent
+        # object_id is unique within a file. Files written before NWB 2.1 do not have it; fall back to the names of
+        # the ancestors.
+        location = node.object_id if node.object_id is not None else '/'.join(names[::-1])
+        return (node.container_source, id(root)), location, root
+
+
+def is_closed(widget) -> bool:
+    return getattr(widget, 'comm', None) is None
+
+
+class RenderCache:
+    """Bounded LRU cache of the widgets rendered by `nwb2widget`
+
+    Widgets are keyed by the identity of the open file, the location of the node in the file, the resolved spec and
+    the registry it was resolved from (the registry passes itself on to the children of the widget), so that
+    navigating back to an object that was already rendered (e.g. re-displaying a ProcessingModule in a new cell)
+    returns the existing widget instead of rebuilding it. Displaying it again creates a new view of the same widget
+    model, which is the cheapest possible clone: the views share their state (controllers, time window, ...).
+
+    The least recently used widgets are evicted when the estimated memory of all cached widgets exceeds `max_bytes`.
+    Sizes are estimated when a widget is stored and refreshed when it is used again, since lazy tabs grow as they are
+    opened.
+    """
+
+    def __init__(self, max_bytes=500e6, max_entries=256):
+        """
+        Parameters
+        ----------
+        max_bytes: float, optional
+            ceiling on the estimated memory of the cached widgets
+        max_entries: int, optional
+            ceiling on the number of cached widgets
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (widget, estimated bytes, objects kept alive so ids are not reused)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(node, spec, neurodata_vis_spec=None):
+        """Returns (key, objects to keep alive while the entry exists) or (None, None) if the node cannot be cached
+
+        A VisSpecRegistry is identified with its `version`, so that widgets rendered before a type was registered or
+        overridden are not reused.
+        """
+        node_key = get_node_key(node)
+        if node_key is None:
+            return None, None
+        file_identity, location, owner = node_key
+        registry_key = id(neurodata_vis_spec), getattr(neurodata_vis_spec, 'version', None)
+        return (file_identity, location, id(spec), registry_key), (owner, spec, neurodata_vis_spec)
+
+    def get(self, node, spec, neurodata_vis_spec=None):
+        """Return the cached widget of `node` rendered with `spec` from `neurodata_vis_spec`, or None"""
+        key, _ = self.make_key(node, spec, neurodata_vis_spec)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            widget, _, keep_alive = entry
+            if is_closed(widget):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries[key] = (widget, estimate_widget_size(widget), keep_alive)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.evict()
+            return widget
+
+    def put(self, node, spec, widget, neurodata_vis_spec=None):
+        key, keep_alive = self.make_key(node, spec, neurodata_vis_spec)
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (widget, estimate_widget_size(widget), keep_alive)
+            self._entries.move_to_end(key)
+            self.evict()
+
+    def holds(self, widget) -> bool:
+        """Whether a widget is cached, and so should not be closed by views that drop it"""
+        with self._lock:
+            return any(entry[0] is widget for entry in self._entries.values())
+
+    def evict(self):
+        with self._lock:
+            while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(nbytes for _, nbytes, _ in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
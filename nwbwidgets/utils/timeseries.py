@@ -1,7 +1,180 @@
-from pynwb import TimeSeries
+import threading
+import weakref
+from collections import OrderedDict
 
+import h5py
 import numpy as np
-from bisect import bisect
+from pynwb import TimeSeries
+
+from .cancellation import check_cancelled, report_progress
+from .read_plan import read_columns, plan_row_reads
+
+# floating point type of data converted to units. Integer data is converted to the smallest type of at least this
+# precision that holds it, floating point data keeps its precision.
+unit_dtype = np.float32
+
+_time_indices = dict()  # id(TimeSeries) -> TimeIndex
+_time_indices_lock = threading.Lock()
+
+
+class TimeIndex:
+    """Time to sample index lookups of a TimeSeries, without a read per bisection step
+
+    For timestamps, the index holds one timestamp per `stride` samples (by default one per chunk of the dataset) and
+    the last one. A lookup searches this sample in memory, then reads the one block of timestamps that contains the
+    answer. Stretches of the sample that lie on a line, within `tolerance` of a sampling period, are kept as regular
+    segments, which give the typical sampling rate. Regularity is only checked at the sampled timestamps, so the times
+    of samples are always read rather than computed from the segments.
+
+    For starting_time and rate, the whole series is a single regular segment and nothing is read.
+    """
+
+    max_blocks = 8
+
+    def __init__(self, timestamps=None, rate=None, starting_time=None, n=None, stride=None, tolerance=.01):
+        """
+        Parameters
+        ----------
+        timestamps: array-like, optional
+            numpy array or h5py.Dataset
+        rate: float, optional
+            used if there are no timestamps
+        starting_time: float, optional
+        n: int, optional
+            number of samples, used with rate
+        stride: int, optional
+            samples between the timestamps held in memory. Default is the chunk length of a chunked dataset, 4096
+            otherwise.
+        tolerance: float, optional
+            in sampling periods
+        """
+        self.timestamps = timestamps
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()  # lookups run on the kernel and on prefetch threads
+        if timestamps is None:
+            self.n = n
+            self.rate = rate
+            self.starting_time = starting_time if starting_time is not None and np.isfinite(starting_time) else 0.
+            self.segments = np.array([[0, n - 1, self.starting_time, rate]])
+            return
+
+        if not isinstance(timestamps, h5py.Dataset):
+            self.timestamps = timestamps = np.asarray(timestamps)
+        self.n = n = len(timestamps)
+        if stride is None:
+            chunks = getattr(timestamps, 'chunks', None)
+            stride = chunks[0] if chunks else 4096
+        self.stride = stride
+        self.sample_index = np.arange(0, n, stride)
+        sample = np.asarray(timestamps[::stride], dtype=float)
+        if n and self.sample_index[-1] != n - 1:
+            self.sample_index = np.append(self.sample_index, n - 1)
+            sample = np.append(sample, timestamps[n - 1])
+        self.sample = sample
+        self.segments = self._find_segments(tolerance)
+
+    def _find_segments(self, tolerance):
+        """Rows of (first index, last index, first time, rate) of the regular stretches of the sample"""
+        index, sample = self.sample_index, self.sample
+        segments = []
+        j0 = 0
+        while j0 + 2 < len(sample):
+            if sample[j0 + 1] <= sample[j0]:
+                j0 += 1
+                continue
+            rate = (index[j0 + 1] - index[j0]) / (sample[j0 + 1] - sample[j0])
+            j = j0 + 2
+            while j < len(sample) and abs(sample[j] - sample[j0] - (index[j] - index[j0]) / rate) <= tolerance / rate:
+                rate = (index[j] - index[j0]) / (sample[j] - sample[j0])
+                j += 1
+            if j - j0 >= 3:
+                segments.append([index[j0], index[j - 1], sample[j0], rate])
+                j0 = j - 1
+            else:
+                j0 += 1
+        return np.array(segments, dtype=float).reshape(-1, 4)
+
+    def _block(self, i):
+        """Timestamps strictly between sample points i - 1 and i"""
+        with self._lock:
+            if i not in self._blocks:
+                self._blocks[i] = np.asarray(self.timestamps[self.sample_index[i - 1] + 1:self.sample_index[i]])
+                while len(self._blocks) > self.max_blocks:
+                    self._blocks.popitem(last=False)
+            self._blocks.move_to_end(i)
+            return self._blocks[i]
+
+    def time_to_index(self, time, ind_min=None, ind_max=None) -> int:
+        """Number of timestamps <= time, as `bisect.bisect`, or the first sample at or after time for a rate"""
+        if self.timestamps is None:
+            return int(np.ceil((time - self.starting_time) * self.rate))
+        i = int(np.searchsorted(self.sample, time, side='right'))
+        if i == 0:
+            ind = 0
+        elif i == len(self.sample):
+            ind = self.n
+        else:
+            ind = int(self.sample_index[i - 1]) + 1 + int(np.searchsorted(self._block(i), time, side='right'))
+        if ind_min is not None:
+            ind = max(ind, ind_min)
+        if ind_max is not None:
+            ind = min(ind, ind_max)
+        return ind
+
+    def times_to_indices(self, times) -> np.ndarray:
+        """`time_to_index` of an array of times at once, reading each block of timestamps at most once"""
+        times = np.asarray(times, dtype=float)
+        if self.timestamps is None:
+            return np.ceil((times - self.starting_time) * self.rate).astype(int)
+        i = np.searchsorted(self.sample, times, side='right')
+        out = np.where(i == 0, 0, self.n)
+        inner = (i > 0) & (i < len(self.sample))
+        for block in np.unique(i[inner]):
+            selected = inner & (i == block)
+            out[selected] = self.sample_index[block - 1] + 1 + np.searchsorted(self._block(block), times[selected],
+                                                                               side='right')
+        return out
+
+    @property
+    def typical_rate(self) -> float:
+        """Sampling rate of the longest regular segment, or the mean rate of the series if there is none"""
+        if len(self.segments):
+            return float(self.segments[np.argmax(self.segments[:, 1] - self.segments[:, 0]), 3])
+        if self.n > 1 and self.sample[-1] > self.sample[0]:
+            return (self.n - 1) / (self.sample[-1] - self.sample[0])
+        return 1.
+
+    def times(self, istart=0, istop=None) -> np.ndarray:
+        """Times of the samples istart to istop"""
+        istop = self.n if istop is None else istop
+        if self.timestamps is None:
+            return np.arange(istart, istop) / self.rate + self.starting_time
+        istart, istop, _ = slice(istart, istop).indices(self.n)
+        return np.asarray(self.timestamps[istart:istop])
+
+    def times_at(self, index) -> np.ndarray:
+        """Times of the samples at sorted indices, reading each timestamp once"""
+        index = np.asarray(index)
+        if self.timestamps is None:
+            return index / self.rate + self.starting_time
+        if not len(index):
+            return np.empty(0)
+        unique_index, inverse = np.unique(index, return_inverse=True)
+        return np.asarray(self.timestamps[list(unique_index)], dtype=float)[inverse]
+
+
+def get_time_index(node: TimeSeries) -> TimeIndex:
+    """TimeIndex of a TimeSeries, built on first use"""
+    with _time_indices_lock:
+        time_index = _time_indices.get(id(node))
+        if time_index is None:
+            if node.timestamps is not None:
+                time_index = TimeIndex(node.timestamps)
+            else:
+                time_index = TimeIndex(rate=node.rate, starting_time=node.starting_time, n=len(node.data))
+            _time_indices[id(node)] = time_index
+            weakref.finalize(node, _time_indices.pop, id(node), None)
+        return time_index
 
 
 def get_timeseries_tt(node: TimeSeries, istart=0, istop=None) -> np.ndarray:
@@ -23,7 +196,7 @@ def get_timeseries_tt(node: TimeSeries, istart=0, istop=None) -> np.ndarray:
 
     """
     if node.timestamps is not None:
-        return node.timestamps[istart:istop]
+        return get_time_index(node).times(istart, istop)
     else:
         if not np.isfinite(node.starting_time):
             starting_time = 0
@@ -79,34 +252,83 @@ def get_timeseries_mint(node: TimeSeries) -> float:
         return node.starting_time
 
 
-def get_timeseries_in_units(node: TimeSeries, istart=None, istop=None):
+def convert_to_units(node: TimeSeries, data, columns=None, dtype=None):
+    """
+    Scale raw data of a TimeSeries, e.g. a window that has already been sliced, reordered or decimated, into its units
+
+    The data is multiplied by `conversion` and by the `channel_conversion` of its channels, if any, and `offset` is
+    added. The result is of the floating point type of at least the precision of `dtype` that holds the raw type,
+    e.g. float32 for int16 data and float64 for float64 data.
+
+    Parameters
+    ----------
+    node: pynwb.TimeSeries
+    data: array-like
+        raw data, with time on the first axis
+    columns: array-like, optional
+        channels of the columns of data. Default is all channels.
+    dtype: numpy.dtype, optional
+        default is `unit_dtype`
+
+    Returns
+    -------
+    numpy.ndarray, str
+        data and unit. If the conversion is not valid, the data is returned as is, and the unit is None.
+    """
+    if not node.conversion or not np.isfinite(node.conversion):
+        return data, None
+    data = np.asarray(data)
+    scale = node.conversion
+    channel_conversion = getattr(node, 'channel_conversion', None)
+    if channel_conversion is not None and data.ndim > 1:
+        channel_conversion = np.asarray(channel_conversion[:])
+        scale = scale * (channel_conversion if columns is None else channel_conversion[columns])
+    offset = getattr(node, 'offset', 0.) or 0.
+
+    dtype = np.promote_types(data.dtype, unit_dtype if dtype is None else dtype)
+    if not np.issubdtype(dtype, np.floating):
+        dtype = np.float64
+    out = data.astype(dtype)
+    if np.any(scale != 1):
+        out *= np.asarray(scale, dtype=dtype)
+    if offset:
+        out += dtype.type(offset)
+    return out, node.unit
+
+
+def get_timeseries_in_units(node: TimeSeries, istart=None, istop=None, columns=None, dtype=None):
     """
     Convert data into the designated units
 
+    The raw data is sliced first, and only the window is converted, see `convert_to_units`.
+
     Parameters
     ----------
     node: pynwb.TimeSeries
     istart: int
     istop: int
+    columns: array-like, optional
+        channels to return, in any order. Default is all channels.
+    dtype: numpy.dtype, optional
+        floating point type of the output, default is `unit_dtype`
 
     Returns
     -------
     numpy.ndarray, str
 
     """
-    data = node.data[istart:istop]
-    if node.conversion and np.isfinite(node.conversion):
-        data = data * node.conversion
-        unit = node.unit
+    if columns is None:
+        data = node.data[istart:istop]
     else:
-        unit = None
-    return data, unit
+        data = read_columns(node.data, istart, istop, columns)
+    return convert_to_units(node, data, columns, dtype)
 
 
 def timeseries_time_to_ind(node: TimeSeries, time, ind_min=None, ind_max=None) -> int:
     """
-    Get the index of a certain time for any TimeSeries. For TimeSeries that use timestamps, bisect is used. You can
-    optionally provide ind_min and ind_max to constrain the search.
+    Get the index of a certain time for any TimeSeries. For TimeSeries that use timestamps, the result is that of
+    bisect, looked up with the TimeIndex of the series. You can optionally provide ind_min and ind_max to constrain
+    the search.
 
     Parameters
     ----------
@@ -119,19 +341,7 @@ def timeseries_time_to_ind(node: TimeSeries, time, ind_min=None, ind_max=None) -
     -------
 
     """
-    if node.timestamps is not None:
-        kwargs = dict()
-        if ind_min is not None:
-            kwargs.update(lo=ind_min)
-        if ind_max is not None:
-            kwargs.update(hi=ind_max)
-        return bisect(node.timestamps, time, **kwargs)
-    else:
-        if np.isnan(node.starting_time):
-            starting_time = 0
-        else:
-            starting_time = node.starting_time
-        return int(np.ceil((time - starting_time) * node.rate))
+    return get_time_index(node).time_to_index(time, ind_min, ind_max)
 
 
 def align_by_times(timeseries: TimeSeries, starts, stops):
@@ -141,16 +351,90 @@ def align_by_times(timeseries: TimeSeries, starts, stops):
         starts: array-like
         stops: array-like
     Returns:
-        np.array(shape=(n_trials, n_time, ...))
+        np.array(shape=(n_trials, n_time, ...)), or a list of the windows if their lengths differ. See
+        `align_samples` for windows of equal length on a common time grid.
     """
-    out = []
-    for istart, istop in zip(starts, stops):
-        ind_start = timeseries_time_to_ind(timeseries, istart)
-        ind_stop = timeseries_time_to_ind(timeseries, istop, ind_min=ind_start)
-        out.append(timeseries.data[ind_start:ind_stop])
+    time_index = get_time_index(timeseries)
+    ind_starts = time_index.times_to_indices(starts)
+    ind_stops = np.maximum(time_index.times_to_indices(stops), ind_starts)
+    out = [timeseries.data[ind_start:ind_stop] for ind_start, ind_stop in zip(ind_starts, ind_stops)]
+    if len(set(ind_stops - ind_starts)) > 1:
+        return [np.asarray(x) for x in out]
     return np.array(out)
 
 
+def get_sampling_rate(node: TimeSeries) -> float:
+    """The rate of a TimeSeries, or the typical rate of its timestamps"""
+    if node.timestamps is None:
+        return node.rate
+    return get_time_index(node).typical_rate
+
+
+def align_samples(node: TimeSeries, times, before=0., after=1., columns=None, step=1, rate=None, dtype=None):
+    """
+    Windows of a TimeSeries around many events, in its units, as one dense array on a common time grid
+
+    The sample of every event is looked up at once, by index arithmetic for series with a rate, and its window holds
+    the `round(before * rate)` samples before it and the `round(after * rate)` samples from it. The windows are then
+    read in one pass over the dataset, sorted by start, with overlapping and nearby windows sharing a read (see
+    `plan_row_reads`). Samples beyond the ends of the series are NaN.
+
+    Parameters
+    ----------
+    node: pynwb.TimeSeries
+    times: array-like
+        event times, in seconds
+    before: float, optional
+        seconds before each event (positive goes back in time)
+    after: float, optional
+        seconds after each event
+    columns: array-like, optional
+        channels to return. Default is all channels.
+    step: int, optional
+        keep every `step`-th sample of the windows, counted from the event, e.g. to display long windows of a fast
+        series
+    rate: float, optional
+        sampling rate that converts `before` and `after` to samples. Default is that of the series, see
+        `get_sampling_rate`.
+    dtype: numpy.dtype, optional
+        floating point type of the output, default is `unit_dtype`
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray, str
+        data (n_trials, n_samples, n_channels), times of the samples relative to the events (n_samples,), and unit
+    """
+    times = np.asarray(times, dtype=float)
+    rate = get_sampling_rate(node) if rate is None else rate
+    n_before = int(round(before * rate))
+    n_after = int(round(after * rate))
+    offsets = np.concatenate([-np.arange(step, n_before + 1, step)[::-1], np.arange(0, n_after, step)])
+    n_samples = len(offsets)
+    tt = offsets / rate
+
+    data = node.data
+    shape = data.shape
+    n_channels = int(np.prod(shape[1:])) if columns is None else len(columns)
+    out_dtype = np.promote_types(data.dtype, unit_dtype if dtype is None else dtype)
+    if not np.issubdtype(out_dtype, np.floating):
+        out_dtype = np.dtype(np.float64)
+    out = np.full((len(times), n_samples, n_channels), np.nan, dtype=out_dtype)
+    unit = node.unit if node.conversion and np.isfinite(node.conversion) else None
+
+    events = get_time_index(node).times_to_indices(times)
+    row_bytes = n_channels * np.dtype(data.dtype).itemsize
+    reads = plan_row_reads(events - n_before, n_before + n_after, shape[0], row_bytes)
+    for i, (read_start, read_stop, trials) in enumerate(reads):
+        check_cancelled()
+        block, _ = get_timeseries_in_units(node, read_start, read_stop, columns, dtype)
+        block = np.asarray(block, dtype=out_dtype).reshape(read_stop - read_start, n_channels)
+        rows = events[trials, None] - read_start + offsets
+        inside = (rows >= 0) & (rows < len(block))
+        out[trials] = np.where(inside[..., None], block[np.clip(rows, 0, len(block) - 1)], np.nan)
+        report_progress(i + 1, len(reads))
+    return out, tt, unit
+
+
 def align_by_trials(timeseries: TimeSeries, start_label='start_time',
                     stop_label=None, before=0., after=1.):
     """
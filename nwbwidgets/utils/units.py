@@ -4,6 +4,8 @@ import pynwb
 from bisect import bisect_right, bisect_left
 from numpy import searchsorted
 
+from .cancellation import check_cancelled, report_progress
+
 
 def get_spike_times(units: pynwb.misc.Units, index, in_interval):
     """Use bisect methods to efficiently retrieve spikes from a given unit in a given interval
@@ -29,6 +31,26 @@ def get_spike_times(units: pynwb.misc.Units, index, in_interval):
     return np.asarray(st.target[ind_start:ind_stop])
 
 
+def spike_times_request(units: pynwb.misc.Units, order, time_window):
+    """Key and reader of the spike times of units in a time window, for `prefetch.window_cache`
+
+    The key holds the number of units and of spike times, so that adding units does not serve spikes read before.
+    """
+    order = np.asarray(order).tolist()
+    key = ('spike_times', units.object_id, len(units), len(units['spike_times'].target.data), tuple(order),
+           tuple(time_window))
+
+    def load():
+        spike_times = []
+        for i, unit in enumerate(order):
+            check_cancelled()
+            spike_times.append(get_spike_times(units, unit, time_window))
+            report_progress(i + 1, len(order))
+        return spike_times
+
+    return key, load
+
+
 def get_min_spike_time(units: pynwb.misc.Units):
     """Efficiently retrieve the first spike time across all units
 
@@ -0,0 +1,260 @@
+import importlib
+import sys
+import threading
+from collections.abc import MutableMapping
+
+
+def import_object(path: str):
+    """Import an object from its dotted path, e.g. 'pynwb.ophys.TwoPhotonSeries'
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    object
+    """
+    module_name, _, attr = path.rpartition('.')
+    if not module_name:
+        return importlib.import_module(attr)
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        # the path points to an attribute of an object, e.g. 'package.module.Class.method'
+        return getattr(import_object(module_name), attr)
+    return getattr(module, attr)
+
+
+def load_spec(spec):
+    """Import the functions of a spec that are given as dotted-path strings
+
+    Parameters
+    ----------
+    spec: str, callable or dict
+
+    Returns
+    -------
+    callable or dict
+    """
+    if isinstance(spec, str):
+        return import_object(spec)
+    if isinstance(spec, dict) and any(isinstance(val, str) for val in spec.values()):
+        return type(spec)((key, load_spec(val)) for key, val in spec.items())
+    return spec
+
+
+class VisSpecRegistry(MutableMapping):
+    """
+    Mapping of neurodata types to visualizations that memoizes type resolution.
+
+    A spec value is either a callable (returns a widget or figure) or a dict of such callables, which is rendered as
+    lazy tabs. `resolve` walks the MRO of a type to find the most specific registered type and caches the answer per
+    type. The cache is cleared whenever a spec is registered, overridden or removed, so the registry can be extended
+    at runtime (e.g. `load_allen_widgets`).
+
+    Types and functions may be given as dotted-path strings (e.g. 'pynwb.ophys.TwoPhotonSeries' and
+    'nwbwidgets.ophys.TwoPhotonSeriesWidget') so that registering them does not import anything. A type key is only
+    imported once its top-level package has been imported by someone else, since no instance of it can exist before
+    that. A function is only imported the first time a matching node is rendered.
+
+    Types can be registered with a priority. When several registered types match a node, the one with the highest
+    priority wins; ties are broken by MRO order, i.e. the most specific type wins. This lets extensions override the
+    visualization of a whole family of types (e.g. a mixin) without listing every subclass.
+    """
+
+    def __init__(self, spec=None, priorities=None):
+        """
+        Parameters
+        ----------
+        spec: dict, optional
+            keys are neurodata types and values are visualization functions or dicts of functions
+        priorities: dict, optional
+            keys are neurodata types and values are int priorities. Default priority is 0.
+        """
+        self._specs = dict()
+        self._priorities = dict()
+        self._cache = dict()
+        self._lazy_keys = set()
+        self._names = dict()  # dotted path -> key of _specs, which is the path itself until the type is imported
+        # specs are resolved from the threads that build lazy tabs, and resolving imports keys and functions in place
+        self._lock = threading.RLock()
+        self.version = 0  # bumped whenever the resolution of some type may change
+        if isinstance(spec, VisSpecRegistry):
+            # copy without importing anything that is still lazy
+            with spec._lock:
+                self._specs.update(spec._specs)
+                self._priorities.update(spec._priorities)
+                self._lazy_keys.update(spec._lazy_keys)
+                self._names.update(spec._names)
+        elif spec is not None:
+            for neurodata_type, value in spec.items():
+                self.register(neurodata_type, value)
+        if priorities is not None:
+            for neurodata_type, priority in priorities.items():
+                self._priorities[self._key(neurodata_type)] = priority
+
+    def register(self, neurodata_type, spec, priority=0):
+        """Register (or override) the visualization of a neurodata type
+
+        Parameters
+        ----------
+        neurodata_type: type or str
+            type or dotted path to the type
+        spec: callable, str or dict
+            function, dotted path to a function, or dict of those (rendered as tabs)
+        priority: int, optional
+            Types with higher priority are preferred over more specific types with lower priority.
+        """
+        if not (callable(spec) or isinstance(spec, (str, dict))):
+            raise TypeError('spec for {} must be callable, a dotted path or a dict of those, got {}'.format(
+                neurodata_type, type(spec)))
+        with self._lock:
+            if isinstance(neurodata_type, str):
+                key = self._names.get(neurodata_type, neurodata_type)
+                if key == neurodata_type:
+                    self._lazy_keys.add(key)
+            else:
+                # an explicitly registered type overrides a pending dotted path to the same type
+                self._load_keys()
+                key = neurodata_type
+            if key not in self._names.values():
+                self._names[_dotted_path(neurodata_type)] = key
+            self._specs[key] = spec
+            self._priorities[key] = priority
+            self.invalidate()
+
+    def unregister(self, neurodata_type):
+        with self._lock:
+            if not isinstance(neurodata_type, str):
+                self._load_keys()
+            key = self._key(neurodata_type)
+            del self._specs[key]
+            del self._priorities[key]
+            self._lazy_keys.discard(key)
+            for name in [name for name, value in self._names.items() if value == key]:
+                del self._names[name]
+            self.invalidate()
+
+    def invalidate(self):
+        """Clear the memoized type resolution. Call this if a registered dict spec is mutated in place."""
+        with self._lock:
+            self._cache.clear()
+            self.version += 1
+
+    def priority(self, neurodata_type) -> int:
+        return self._priorities[self._key(neurodata_type)]
+
+    def resolve(self, neurodata_type):
+        """Find the spec that should be used to visualize instances of `neurodata_type`
+
+        Parameters
+        ----------
+        neurodata_type: type
+
+        Returns
+        -------
+        callable, dict or None
+            None if no registered type matches
+        """
+        try:
+            return self._cache[neurodata_type]
+        except KeyError:
+            pass
+
+        with self._lock:
+            self._load_keys()
+            best_type = None
+            for ndtype in neurodata_type.__mro__:
+                if ndtype in self._specs and \
+                        (best_type is None or self._priorities[ndtype] > self._priorities[best_type]):
+                    best_type = ndtype
+            spec = None if best_type is None else self._load_spec(best_type)
+            self._cache[neurodata_type] = spec
+            return spec
+
+    def _key(self, neurodata_type):
+        """Key of _specs of a type or of a dotted path, which may have been imported since it was registered"""
+        if isinstance(neurodata_type, str):
+            return self._names.get(neurodata_type, neurodata_type)
+        return neurodata_type
+
+    def _load_keys(self):
+        """Replace dotted-path keys by their types if their package has already been imported"""
+        with self._lock:
+            for key in [key for key in self._lazy_keys if key.split('.')[0] in sys.modules]:
+                self._lazy_keys.discard(key)
+                spec = self._specs.pop(key)
+                priority = self._priorities.pop(key)
+                neurodata_type = import_object(key)
+                if neurodata_type not in self._specs:
+                    self._specs[neurodata_type] = spec
+                    self._priorities[neurodata_type] = priority
+                    self._names[key] = neurodata_type
+                else:
+                    del self._names[key]
+
+    def _load_spec(self, key):
+        with self._lock:
+            spec = self._specs[key]
+            loaded = load_spec(spec)
+            if loaded is not spec:
+                self._specs[key] = loaded
+            return loaded
+
+    def copy(self):
+        return type(self)(self)
+
+    def __getitem__(self, neurodata_type):
+        with self._lock:
+            if not isinstance(neurodata_type, str) and neurodata_type not in self._specs:
+                self._load_keys()
+            return self._load_spec(self._key(neurodata_type))
+
+    def __contains__(self, neurodata_type):
+        with self._lock:
+            if not isinstance(neurodata_type, str) and neurodata_type not in self._specs:
+                self._load_keys()
+            return self._key(neurodata_type) in self._specs
+
+    def __setitem__(self, neurodata_type, spec):
+        self.register(neurodata_type, spec)
+
+    def __delitem__(self, neurodata_type):
+        self.unregister(neurodata_type)
+
+    def __iter__(self):
+        """Dotted paths of the registered types, whether or not they have been imported"""
+        with self._lock:
+            return iter(list(self._names))
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __repr__(self):
+        return '{}({} types)'.format(type(self).__name__, len(self))
+
+
+def _dotted_path(neurodata_type) -> str:
+    if isinstance(neurodata_type, str):
+        return neurodata_type
+    return '{}.{}'.format(neurodata_type.__module__, neurodata_type.__qualname__)
+
+
+def resolve_spec(neurodata_vis_spec, neurodata_type):
+    """Find the spec for a type in either a VisSpecRegistry or a plain dict
+
+    Parameters
+    ----------
+    neurodata_vis_spec: VisSpecRegistry or dict
+    neurodata_type: type
+
+    Returns
+    -------
+    callable, dict or None
+    """
+    if isinstance(neurodata_vis_spec, VisSpecRegistry):
+        return neurodata_vis_spec.resolve(neurodata_type)
+    for ndtype in neurodata_type.__mro__:
+        if ndtype in neurodata_vis_spec:
+            return load_spec(neurodata_vis_spec[ndtype])
@@ -1,6 +1,14 @@
-from ipywidgets import Output
+from ipywidgets import Output, Widget
 from ipywidgets.widgets.interaction import show_inline_matplotlib_plots, clear_output
 import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from .cancellation import CancelToken, UpdateCancelled, current_token
+from .profiling import profile
 
 
 def unpack_controls(controls, process_controls=lambda x: x):
@@ -15,29 +23,123 @@ def unpack_controls(controls, process_controls=lambda x: x):
     return kwargs
 
 
-def interactive_output(f, controls, process_controls=lambda x: x):
+def interactive_output(f, controls, process_controls=lambda x: x, load=None, status=None):
     """Connect widget controls to a function.
 
     This function does not generate a user interface for the widgets (unlike `interact`).
     This enables customisation of the widget user interface layout.
     The user interface layout must be defined and displayed manually.
+
+    Changes of the controls are handed to `update_scheduler`, so that a burst of changes is plotted once, with the
+    last values.
+
+    Parameters
+    ----------
+    f: function
+    controls: dict
+    process_controls: function, optional
+    load: function, optional
+        called with the same arguments as `f` on `load_executor` before `f` when the controls change, e.g. to read the
+        data that `f` plots into a cache. The kernel keeps handling other widgets meanwhile, and `f` runs when it is
+        done.
+    status: nwbwidgets.controllers.LoadingStatus, optional
+        greys out the previous figure and shows the progress of `load`
     """
 
     out = Output()
+    if status is not None:
+        status.views.append(out)
 
-    def observer(change):
+    def draw(kwargs):
         show_inline_matplotlib_plots()
         with out:
             clear_output(wait=True)
-            f(**unpack_controls(controls, process_controls))
+            with profile(getattr(f, '__name__', type(f).__name__), 'plotter'):
+                try:
+                    f(**kwargs)
+                except UpdateCancelled:
+                    return  # a later update is coming
             show_inline_matplotlib_plots()
+
+    async def load_and_draw(kwargs):
+        if status is not None:
+            await status.load(load, **kwargs)
+        else:
+            await load_async(load, **kwargs)
+        draw(kwargs)
+
+    def update():
+        kwargs = unpack_controls(controls, process_controls)
+        if load is not None and can_load_async():
+            return load_and_draw(kwargs)
+        draw(kwargs)
+
+    def observer(change):
+        update_scheduler.request(out, update)
+
     for k, w in controls.items():
         w.observe(observer, 'value')
     show_inline_matplotlib_plots()
-    observer(None)
+    draw(unpack_controls(controls, process_controls))
     return out
 
 
+def iter_widget_tree(widget, skip=None):
+    """Iterate over a widget and all the widgets it holds in its traits (children, layout, ...)
+
+    Widgets for which `skip(widget)` is true are left out, with the widgets they hold.
+    """
+    seen = set()
+    stack = [widget]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, Widget):
+            if skip is not None and skip(obj):
+                continue
+            yield obj
+            stack.extend(obj._trait_values.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(x for x in obj if isinstance(x, (Widget, list, tuple)))
+
+
+def estimate_widget_size(widget) -> int:
+    """Roughly estimate the memory held by a widget and the widgets it contains, in bytes
+
+    Only the data held in traits is counted (arrays, lists, strings and serialized outputs), which is what dominates
+    for figures and tables.
+    """
+    nbytes = 0
+    seen = set()
+    stack = [w._trait_values for w in iter_widget_tree(widget)]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, Widget):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            nbytes += obj.nbytes
+        elif isinstance(obj, (str, bytes, memoryview)):
+            nbytes += len(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            nbytes += 8 * len(obj)
+            stack.extend(x for x in obj if not isinstance(x, (int, float)))
+    return nbytes
+
+
+def close_widget_tree(widget, keep=None):
+    """Close a widget and all the widgets it contains so the kernel and the frontend can free them
+
+    Widgets for which `keep(widget)` is true are left open, with the widgets they hold.
+    """
+    for w in list(iter_widget_tree(widget, keep)):
+        w.close()
+
+
 class Timer:
     def __init__(self, timeout, callback):
         self._timeout = timeout
@@ -66,4 +168,104 @@ def debounce(wait):
                 timer.cancel()
             timer = Timer(wait, call_it)
         return debounced
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def _loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class UpdateScheduler:
+    """Run widget updates latest-wins
+
+    An update is requested for a target, e.g. the widget it redraws. A request replaces the update of the same target
+    that is waiting to run and cancels the one that is running, so that a burst of controller changes results in one
+    update with the last values, and reads for superseded windows stop at their next `check_cancelled`. On the kernel
+    event loop updates wait `delay` seconds for more requests; without a running loop, e.g. in scripts and tests,
+    they run immediately.
+
+    An update may return an awaitable, e.g. when it is a coroutine function that waits for `load_async`. It is then
+    run as a task on the event loop, with its token current, and the task is cancelled when the update is superseded.
+    """
+
+    def __init__(self, delay=.05):
+        self.delay = delay
+        self._timers = dict()  # id(target) -> Timer of the update waiting to run
+        self._tokens = dict()  # id(target) -> CancelToken of the latest update
+        self._tasks = dict()  # id(target) -> asyncio task of an update that is waiting for data
+
+    def request(self, target, update) -> CancelToken:
+        """Run `update()` for `target` once requests stop coming, superseding earlier requests for it"""
+        target = id(target)  # widgets such as FigureWidget are not hashable
+        previous = self._tokens.get(target)
+        if previous is not None:
+            previous.cancel()
+        for pending in (self._timers.pop(target, None), self._tasks.pop(target, None)):
+            if pending is not None:
+                pending.cancel()
+        token = self._tokens[target] = CancelToken()
+
+        def done(task=None):
+            if self._tasks.get(target) is task:
+                self._tasks.pop(target, None)
+            if self._tokens.get(target) is token:
+                del self._tokens[target]
+
+        def run():
+            self._timers.pop(target, None)
+            if token.cancelled:
+                return done()
+            with token.active():
+                try:
+                    result = update()
+                except UpdateCancelled:
+                    result = None
+                if inspect.isawaitable(result):
+                    if not _loop_running():
+                        asyncio.run(_finish(result))
+                    else:
+                        # the task runs in a copy of this context, where the token is current
+                        task = self._tasks[target] = asyncio.ensure_future(_finish(result))
+                        task.add_done_callback(done)
+                        return
+            done()
+
+        if self.delay is None or not _loop_running():
+            run()
+        else:
+            self._timers[target] = Timer(self.delay, run)
+        return token
+
+
+async def _finish(update):
+    try:
+        await update
+    except (UpdateCancelled, asyncio.CancelledError):
+        pass
+
+
+update_scheduler = UpdateScheduler()
+
+# Trace widgets read the data of a new window on this executor, so that the kernel keeps handling other widgets
+# meanwhile. Set to None to read on the kernel thread.
+load_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='nwbwidgets-load')
+
+
+def can_load_async() -> bool:
+    """Whether `load_async` can read off the kernel thread, i.e. there is an executor and a running event loop"""
+    return load_executor is not None and _loop_running()
+
+
+async def load_async(func, *args, **kwargs):
+    """Call a function on `load_executor`, with the token of the current update, without blocking the event loop"""
+    if load_executor is None:
+        return func(*args, **kwargs)
+    call = partial(func, *args, **kwargs)
+    token = current_token()
+    if token is not None:
+        call = partial(token.run, call)
+    return await asyncio.wrap_future(load_executor.submit(call))
@@ -1,65 +1,67 @@
 from collections import OrderedDict
 
-import h5py
-import hdmf
-import ndx_grayscalevolume
-import pynwb
-import zarr
 from ipywidgets import widgets
-from ndx_icephys_meta.icephys import SweepSequences
-from nwbwidgets import behavior, misc, base, ecephys, image, ophys, icephys, timeseries, file
+from nwbwidgets import base
+from nwbwidgets.utils.vis_spec import VisSpecRegistry
 
 
 # def show_dynamic_table(node: DynamicTable, **kwargs):
 def show_dynamic_table(node, **kwargs) -> widgets.Widget:
     if node.name == 'electrodes':
+        from nwbwidgets import ecephys
         return ecephys.show_electrodes(node)
     return base.render_dataframe(node)
 
 
-default_neurodata_vis_spec = {
-    pynwb.NWBFile: file.show_nwbfile,
-    SweepSequences: icephys.show_sweep_sequences,
-    pynwb.behavior.BehavioralEvents: behavior.show_behavioral_events,
-    pynwb.ecephys.LFP: ecephys.show_lfp,
-    pynwb.misc.Units: OrderedDict({
-        'Session Raster': misc.RasterWidgetPlotly,
-        'Grouped PSTH': misc.PSTHWidget,
-        'Raster Grid': misc.RasterGridWidget,
+# Types and widgets are given as dotted paths so that `import nwbwidgets` does not import every widget module and its
+# dependencies. They are imported the first time a matching node is rendered.
+default_neurodata_vis_spec = VisSpecRegistry({
+    'pynwb.file.NWBFile': 'nwbwidgets.file.show_nwbfile',
+    'ndx_icephys_meta.icephys.SweepSequences': 'nwbwidgets.icephys.show_sweep_sequences',
+    'pynwb.behavior.BehavioralEvents': 'nwbwidgets.behavior.show_behavioral_events',
+    'pynwb.ecephys.LFP': 'nwbwidgets.ecephys.show_lfp',
+    'pynwb.misc.Units': OrderedDict({
+        'Session Raster': 'nwbwidgets.misc.RasterWidgetPlotly',
+        'Grouped PSTH': 'nwbwidgets.misc.PSTHWidget',
+        'Raster Grid': 'nwbwidgets.misc.RasterGridWidget',
         'table': show_dynamic_table}),
-    pynwb.misc.DecompositionSeries: misc.show_decomposition_series,
-    pynwb.file.Subject: base.show_fields,
-    pynwb.ophys.ImagingPlane: base.show_fields,
-    pynwb.ecephys.SpikeEventSeries: ecephys.show_spike_event_series,
-    pynwb.ophys.ImageSegmentation: ophys.show_image_segmentation,
-    pynwb.ophys.TwoPhotonSeries: ophys.TwoPhotonSeriesWidget,
-    ndx_grayscalevolume.GrayscaleVolume: ophys.show_grayscale_volume,
-    pynwb.ophys.PlaneSegmentation: ophys.route_plane_segmentation,
-    pynwb.ophys.DfOverF: ophys.show_df_over_f,
-    pynwb.ophys.RoiResponseSeries: ophys.RoiResponseSeriesWidget,
-    pynwb.misc.AnnotationSeries: OrderedDict({
+    'pynwb.misc.DecompositionSeries': 'nwbwidgets.misc.show_decomposition_series',
+    'pynwb.file.Subject': base.show_fields,
+    'pynwb.ophys.ImagingPlane': base.show_fields,
+    'pynwb.ecephys.SpikeEventSeries': 'nwbwidgets.ecephys.show_spike_event_series',
+    'pynwb.ophys.ImageSegmentation': 'nwbwidgets.ophys.show_image_segmentation',
+    'pynwb.ophys.TwoPhotonSeries': 'nwbwidgets.ophys.TwoPhotonSeriesWidget',
+    'ndx_grayscalevolume.GrayscaleVolume': 'nwbwidgets.ophys.show_grayscale_volume',
+    'pynwb.ophys.PlaneSegmentation': 'nwbwidgets.ophys.route_plane_segmentation',
+    'pynwb.ophys.DfOverF': 'nwbwidgets.ophys.show_df_over_f',
+    'pynwb.ophys.RoiResponseSeries': OrderedDict({
+        'traces': 'nwbwidgets.ophys.RoiResponseSeriesWidget',
+        'trial average': 'nwbwidgets.timeseries.TrialAverageWidget'}),
+    'pynwb.misc.AnnotationSeries': OrderedDict({
         'text': base.show_text_fields,
-        'times': misc.show_annotations}),
-    pynwb.core.LabelledDict: base.dict2accordion,
-    pynwb.ProcessingModule: base.processing_module,
-    hdmf.common.DynamicTable: show_dynamic_table,
-    pynwb.ecephys.ElectricalSeries: ecephys.ElectricalSeriesWidget,
-    pynwb.behavior.Position: behavior.show_position,
-    pynwb.behavior.SpatialSeries: OrderedDict({
-        'over time': timeseries.SeparateTracesPlotlyWidget,
-        'trace': behavior.plotly_show_spatial_trace}),
-    pynwb.image.GrayscaleImage: image.show_grayscale_image,
-    pynwb.image.RGBImage: image.show_rbga_image,
-    pynwb.image.RGBAImage: image.show_rbga_image,
-    pynwb.base.Image: image.show_rbga_image,
-    pynwb.image.ImageSeries: image.show_image_series,
-    pynwb.image.IndexSeries: image.show_index_series,
-    pynwb.TimeSeries: timeseries.show_timeseries,
-    pynwb.core.NWBContainer: base.show_neurodata_base,
-    pynwb.core.NWBDataInterface: base.show_neurodata_base,
-    h5py.Dataset: base.show_dset,
-    zarr.core.Array: base.show_dset
-}
+        'times': 'nwbwidgets.misc.show_annotations'}),
+    'pynwb.core.LabelledDict': base.dict2accordion,
+    'pynwb.ProcessingModule': base.processing_module,
+    'hdmf.common.DynamicTable': show_dynamic_table,
+    'pynwb.ecephys.ElectricalSeries': OrderedDict({
+        'traces': 'nwbwidgets.ecephys.ElectricalSeriesWidget',
+        'trial average': 'nwbwidgets.timeseries.TrialAverageWidget'}),
+    'pynwb.behavior.Position': 'nwbwidgets.behavior.show_position',
+    'pynwb.behavior.SpatialSeries': OrderedDict({
+        'over time': 'nwbwidgets.timeseries.SeparateTracesPlotlyWidget',
+        'trace': 'nwbwidgets.behavior.plotly_show_spatial_trace'}),
+    'pynwb.image.GrayscaleImage': 'nwbwidgets.image.show_grayscale_image',
+    'pynwb.image.RGBImage': 'nwbwidgets.image.show_rbga_image',
+    'pynwb.image.RGBAImage': 'nwbwidgets.image.show_rbga_image',
+    'pynwb.base.Image': 'nwbwidgets.image.show_rbga_image',
+    'pynwb.image.ImageSeries': 'nwbwidgets.image.show_image_series',
+    'pynwb.image.IndexSeries': 'nwbwidgets.image.show_index_series',
+    'pynwb.TimeSeries': 'nwbwidgets.timeseries.show_timeseries',
+    'pynwb.core.NWBContainer': base.show_neurodata_base,
+    'pynwb.core.NWBDataInterface': base.show_neurodata_base,
+    'h5py.Dataset': base.show_dset,
+    'zarr.core.Array': base.show_dset
+})
 
 
 def nwb2widget(node, neurodata_vis_spec=default_neurodata_vis_spec):
@@ -29,7 +29,6 @@ setup(
                       'scikit-image',
                       'tqdm>=4.36.0',
                       'ndx-icephys-meta',
-                      'ipysheet',
                       'zarr',
                       'ccfwidget',
                       'tifffile'],
@@ -39,6 +38,7 @@ setup(
     long_description_content_type='text/markdown',
     name='nwbwidgets',
     packages=['nwbwidgets', 'nwbwidgets/utils', 'nwbwidgets/analysis'],
+    entry_points={'console_scripts': ['nwbwidgets-export=nwbwidgets.export:main']},
     python_requires='>=2.7',
     setup_requires=['setuptools>=38.6.0', 'setuptools_scm'],
     url='https://github.com/NeurodataWithoutBorders/nwb-jupyter-widgets')